@@ -14,9 +14,12 @@ cams.reset(ports[0])
 v1 = cams.get_instances()[0]
 print('available parameters : ')
 print('-------------------------')
-prop_list = [p for p in dir(Camera) if isinstance(getattr(Camera, p),property)]
-for prop in prop_list:
-	print(prop, v1._query(prop))
+# all the inquiries are sent in one batch
+snapshot = v1.snapshot()
+for prop in sorted(snapshot):
+	print(prop, snapshot[prop])
+for prop in sorted(snapshot.errors):
+	print(prop, 'ERROR', snapshot.errors[prop])
 
 
 """
@@ -10,10 +10,10 @@ This module allows you to control video camera through Visca protocol
 -------------------------------------------------------------------------------
 Changelog:
 -------------------------------------------------------------------------------
-- todo - 
-	- Python 3 compatibility
-	- Threading for ack / completion
-	- a real pythonic debug system
+- unreleased -
+    - Python 3 only (3.7 for pyviscam.aio)
+    - Replies are routed to their request, commands and inquiries to several
+      cameras are in flight at the same time (see pyviscam.demux)
 
 - v0.0.5  - Oct. 9th 2019
     - Many Bug Fixes
@@ -25,4 +25,13 @@ Changelog:
     - First draft
 """
 
-debug = 1
+import logging
+
+# level of the frames dumps, below logging.DEBUG
+TRACE = 5
+logging.addLevelName(TRACE, 'TRACE')
+# pyviscam says nothing until the application configures logging
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+# kept for the applications setting it, pyviscam logs with the logging module
+debug = 0
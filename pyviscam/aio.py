@@ -0,0 +1,580 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Aio module contains the asyncio flavour of pyviscam
+AsyncBus is the counterpart of v_cams, AsyncCamera the counterpart of Camera.
+Nothing blocks the event loop, so one loop can drive many cameras at once.
+
+Typically, it can be done with :
+
+import asyncio
+from pyviscam.aio import AsyncBus, AsyncUDP
+
+async def main():
+    bus = AsyncBus(AsyncUDP())
+    await bus.reset('192.168.0.100')
+    cam = bus.get_instances()[0]
+    await cam.set('zoom', 2000)
+    print(await cam.query('pan_tilt'))
+    await cam.home()
+
+asyncio.run(main())
+
+AsyncSerial needs a platform where serial ports can be watched
+by the event loop (posix).
+"""
+
+import asyncio
+import logging
+import serial
+from binascii import hexlify
+
+from pyviscam.cache import MISSING, QueryCache, monotonic
+from pyviscam.camera import Camera, Snapshot
+from pyviscam.constants import queries, block_queries
+from pyviscam.convert import to_bytes
+from pyviscam.demux import Router
+from pyviscam.exceptions import AckTimeout, CompletionTimeout, ViscaError, ViscaTimeout
+from pyviscam.port import pop_packet, detect_baudrate, BAUDRATES, _detected
+from pyviscam.udp import header, parse_address, payload_type, \
+                         CONTROL_COMMAND, CONTROL_REPLY, CONTROL_RESET
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTransport(object):
+    """
+    Base class for asyncio transports
+    Received packets are given to the router of the bus
+    """
+    def __init__(self):
+        self.router = None
+
+    async def open(self, address):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def write_packet(self, packet):
+        raise NotImplementedError
+
+    def _received(self, packet):
+        if self.router:
+            self.router.feed(packet)
+
+
+class AsyncSerial(AsyncTransport):
+    """
+    Serial transport, the port is watched by the event loop
+        :baudrate is the speed of the port, 'auto' to find it (see pyviscam.port.Serial)
+    """
+    def __init__(self, baudrate=9600):
+        super(AsyncSerial, self).__init__()
+        self.baudrate = baudrate
+        self.port = None
+        self._buffer = bytearray()
+
+    async def open(self, portname):
+        if self.port is None:
+            auto = self.baudrate == 'auto'
+            rate = _detected.get(portname, BAUDRATES[0]) if auto else self.baudrate
+            try:
+                self.port = serial.Serial(portname, rate, timeout=0, stopbits=1, \
+                                          bytesize=8, rtscts=False, dsrdtr=False)
+            except (OSError, ValueError, serial.SerialException):
+                self.port = None
+                return False
+            if auto and portname not in _detected:
+                # the probe blocks, the port is not watched yet
+                rate = await asyncio.get_running_loop().run_in_executor(None, detect_baudrate, self.port)
+                if rate is None:
+                    logger.error('ERROR 13 - no camera answers on %s', portname)
+                    self.port.baudrate = BAUDRATES[0]
+                else:
+                    logger.info('cameras of %s talk at %i bauds', portname, rate)
+                    _detected[portname] = rate
+            self.port.reset_input_buffer()
+            asyncio.get_running_loop().add_reader(self.port.fileno(), self._readable)
+        return True
+
+    def close(self):
+        if self.port:
+            asyncio.get_running_loop().remove_reader(self.port.fileno())
+            self.port.close()
+            self.port = None
+
+    def _readable(self):
+        self._buffer += self.port.read(self.port.in_waiting or 1)
+        packet = pop_packet(self._buffer)
+        while packet:
+            self._received(packet)
+            packet = pop_packet(self._buffer)
+
+    def write_packet(self, packet):
+        if not self.port:
+            logger.error('ERROR 15 - no serial port')
+            return False
+        self.port.write(to_bytes(packet))
+        return True
+
+
+class AsyncUDP(AsyncTransport, asyncio.DatagramProtocol):
+    """
+    VISCA over IP transport
+        :timeout is the time to wait for a reply (seconds)
+        :retransmit is the time to wait before sending a message again
+        :retries is the number of times a message is sent again
+    """
+    def __init__(self, timeout=1, retransmit=0.1, retries=5):
+        super(AsyncUDP, self).__init__()
+        self.timeout = timeout
+        self.retransmit = retransmit
+        self.retries = retries
+        self.port = None
+        self.sequence = 0
+        # sequence -> [message, tries]
+        self._unanswered = {}
+        self._reset = None
+
+    async def open(self, address):
+        loop = asyncio.get_running_loop()
+        if self.port is None:
+            self.port, _ = await loop.create_datagram_endpoint(
+                lambda: self, remote_addr=parse_address(address))
+        # ask the camera to reset its sequence number
+        self._reset = loop.create_future()
+        self.sequence = 0
+        self._send(CONTROL_COMMAND, CONTROL_RESET)
+        try:
+            await asyncio.wait_for(self._reset, self.timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._unanswered.clear()
+        return True
+
+    def close(self):
+        if self.port:
+            self.port.close()
+            self.port = None
+        self._unanswered.clear()
+
+    def _send(self, payload_type, payload):
+        message = header.pack(payload_type, len(payload), self.sequence) + payload
+        self._unanswered[self.sequence] = [message, 0]
+        self.port.sendto(message)
+        asyncio.get_running_loop().call_later(self.retransmit, self._retransmit, self.sequence)
+
+    def _retransmit(self, sequence):
+        pending = self._unanswered.get(sequence)
+        if pending is None or self.port is None:
+            return
+        if pending[1] >= self.retries:
+            del self._unanswered[sequence]
+            logger.error('ERROR 17 - message %i has not been answered', sequence)
+            return
+        pending[1] += 1
+        self.port.sendto(pending[0])
+        asyncio.get_running_loop().call_later(self.retransmit, self._retransmit, sequence)
+
+    def write_packet(self, packet):
+        if not self.port:
+            logger.error('ERROR 15 - no udp socket')
+            return False
+        packet = to_bytes(packet)
+        self.sequence = (self.sequence + 1) & 0xffffffff
+        self._send(payload_type(packet), packet)
+        return True
+
+    def datagram_received(self, message, address):
+        if len(message) < header.size:
+            return
+        kind, length, sequence = header.unpack(message[:header.size])
+        payload = message[header.size:header.size + length]
+        self._unanswered.pop(sequence, None)
+        if kind == CONTROL_REPLY:
+            if payload == CONTROL_RESET and self._reset and not self._reset.done():
+                self._reset.set_result(True)
+            return
+        self._received(payload)
+
+
+class AsyncCamera(Camera):
+    """
+    asyncio visca camera
+    Commands and queries return awaitables :
+
+    await cam.home()
+    await cam.set('zoom', 2000)
+    await cam.query('pan_tilt')
+    await cam.snapshot()
+
+    Properties cannot be assigned, use set() instead.
+    The commands returning as soon as they are acked (send_command, send_value,
+    concurrent, drive) are not available, gather the awaitables instead :
+    await asyncio.gather(cam.set('zoom', 2000), cam.set('focus', 1000))
+    """
+    def __init__(self, bus, address=1, cache=None, estimator=None):
+        super(AsyncCamera, self).__init__(bus, address, cache, estimator)
+        self.bus = bus
+        self._pending = None
+        # a camera executes up to two commands at the same time
+        self._slots = asyncio.Semaphore(2)
+
+    def _cmd_packet(self, packet):
+        self._pending = self._command(packet)
+        return self._pending
+
+    def _query(self, function=None, fresh=False):
+        return self._inquire(function, fresh=fresh)
+
+    def _blocking(self, name):
+        raise TypeError('%s is not available on AsyncCamera, gather the awaitables instead' % name)
+
+    def send_command(self, message):
+        self._blocking('send_command')
+
+    def send_value(self, name, *values):
+        self._blocking('send_value')
+
+    def concurrent(self):
+        self._blocking('concurrent')
+
+    def drive(self, pan, tilt):
+        self._blocking('drive')
+
+    @property
+    def pan(self):
+        """
+        Return an awaitable of the pan, in degrees
+        """
+        return self._axis(0)
+
+    @property
+    def tilt(self):
+        """
+        Return an awaitable of the tilt, in degrees
+        """
+        return self._axis(1)
+
+    async def _axis(self, index):
+        position = await self._inquire('pan_tilt')
+        if not position:
+            return position
+        return position[index]
+
+    async def _command(self, packet):
+        """
+        Send a command packet, wait for ack + completion
+            :Return True if the command has been completed
+            :Raise AckTimeout or CompletionTimeout if it is not over in time
+        """
+        # wait for a free socket
+        async with self._slots:
+            request = await self.bus.submit(packet)
+            self._watch(request, packet)
+            self._commanded(request, packet)
+            reply = await self.bus.wait(request, request.ack)
+            if reply and reply[1] & 0xf0 == 0x40:
+                reply = await self.bus.wait(request, request.done)
+                if reply and reply[1] & 0xf0 == 0x50:
+                    return True
+        if reply:
+            logger.warning('-------- COMMAND ERROR %s ------------', hexlify(reply))
+        return False
+
+    async def _inquire(self, function=None, retries=2, fresh=False):
+        """
+        Send a query, wait for the answer
+            :retries is the number of times the query is sent again when the buffer is full
+            :fresh asks the camera even if the cache has the value
+            :Return the translated value, False on error
+            :Raise AckTimeout if the camera does not answer in time
+        """
+        if not function:
+            return False
+        function, query = self._inquiry(function)
+        if not query:
+            return False
+        cache = self.cache
+        if cache is not None and not fresh:
+            value = cache.get(function)
+            if value is not MISSING:
+                return value
+        since = monotonic()
+        reply = await self._ask(query, function, retries)
+        if not reply:
+            return False
+        value = self._translate(function, reply)
+        self._answered(function, value, since)
+        return value
+
+    async def _ask(self, query, name, retries=2):
+        """
+        Send a query packet, wait for the answer
+            :Return the answer, False on error
+            :Raise AckTimeout if the camera does not answer in time
+        """
+        for attempt in range(retries + 1):
+            request = await self.bus.submit(query)
+            self._watch(request, query, name)
+            reply = await self.bus.wait(request, request.done)
+            if not reply:
+                return False
+            if reply[1:2] == b'\x50':
+                return reply
+            if reply[1:3] != b'\x60\x03':
+                break
+            # buffer is full, send it again
+        logger.warning('-------- QUERY ERROR %s ------------', hexlify(reply))
+        return False
+
+    async def block(self, name):
+        """
+        Query a block of parameters with a single inquiry (see Camera.block)
+            :Return a dict parameter -> value, False on error
+        """
+        if name not in block_queries or 'block_' + name not in self._inquiries:
+            logger.error('ERROR 42 - block %s has not yet been implemented', name)
+            return False
+        since = monotonic()
+        reply = await self._ask(self._inquiries['block_' + name], 'block_' + name)
+        if not reply:
+            return False
+        values = self._block_values(name, reply)
+        if values:
+            for function, value in values.items():
+                self._answered(function, value, since)
+        return values
+
+    async def snapshot(self, params=None):
+        """
+        Query many parameters at once, every inquiry is in flight at the same time
+            :params is a list of parameters, every parameter of the profile (or constants.queries) by default
+            :Return a Snapshot (a dict parameter -> value),
+                    its errors attribute gives the parameters without value
+        """
+        if params is None:
+            params = sorted(self.profile.params if self.profile else queries)
+        snapshot = Snapshot()
+        functions = []
+        for param in params:
+            function, query = self._inquiry(param)
+            if query:
+                functions.append(function)
+            else:
+                snapshot.errors[param] = 'not implemented'
+        values = await asyncio.gather(*[self._inquire(function) for function in functions],
+                                      return_exceptions=True)
+        for function, value in zip(functions, values):
+            if isinstance(value, ViscaTimeout):
+                snapshot.errors[function] = 'no reply'
+            elif isinstance(value, (ViscaError, ValueError, IndexError, TypeError)):
+                snapshot.errors[function] = 'cannot translate'
+            elif isinstance(value, BaseException):
+                raise value
+            elif value is False:
+                snapshot.errors[function] = 'error'
+            else:
+                snapshot[function] = value
+        return snapshot
+
+    async def query(self, name):
+        """
+        Return the value of a parameter
+        """
+        return await self._query(name)
+
+    async def identify(self):
+        """
+        Ask the version of the camera and use the profile of its model
+        The default profile is used if the camera does not answer in time
+        """
+        try:
+            version = await self._query('version')
+        except ViscaTimeout as error:
+            logger.error('%s, camera %i uses the default profile', error, self.address)
+            version = None
+        return self._identify(version)
+
+    async def set(self, name, value):
+        """
+        Set a parameter, same as the Camera property setter
+            :Return True if the command has been completed
+        """
+        if name in ('pan', 'tilt'):
+            position = await self.query('pan_tilt')
+            if not position:
+                return False
+            pan, tilt = position
+            if name == 'pan':
+                pan = value
+            else:
+                tilt = value
+        self._pending = None
+        if name in ('pan', 'tilt'):
+            self.move_to(pan, tilt)
+        else:
+            setattr(self, name, value)
+        command, self._pending = self._pending, None
+        if command is None:
+            return False
+        return await command
+
+
+class AsyncBus(object):
+    """
+    asyncio visca bus, the counterpart of v_cams
+    Every reply is routed to its request, so packets to several cameras
+    (or several sockets of a camera) can be in flight at the same time
+        :timeouts replaces some of the TIMEOUTS of the requests (see pyviscam.demux)
+        :baudrate is the speed of the default AsyncSerial transport, 'auto' to find it
+        :cache_ttl gives a QueryCache to each camera, answers are kept cache_ttl seconds
+    """
+    def __init__(self, transport=None, timeouts=None, baudrate=9600, cache_ttl=None):
+        super(AsyncBus, self).__init__()
+        if transport is None:
+            transport = AsyncSerial(baudrate)
+        self.transport = transport
+        self.timeouts = timeouts
+        self.cache_ttl = cache_ttl
+        self.router = None
+        # address -> lock held while a packet to this camera is not acked
+        self._gates = {}
+        self.viscams = []
+        # Instruments timing the requests of the cameras (see pyviscam.instrument)
+        self.instruments = None
+
+    def get_instances(self):
+        """
+        Get instances of AsyncCamera Objects
+        """
+        return self.viscams
+
+    async def reset(self, port):
+        """
+        Open the transport, enumerate the cameras and clear the interfaces
+        """
+        self.router = Router(asyncio.get_running_loop().create_future, self.timeouts)
+        self._gates = {}
+        self.transport.router = self.router
+        if not await self.transport.open(port):
+            logger.error("ERROR 34 - cannot open %s", port)
+            return []
+        self.viscams = await self._cmd_adress_set()
+        await self._if_clear()
+        for cam in self.viscams:
+            await cam.identify()
+        return self.viscams
+
+    def close(self):
+        self.transport.close()
+        if self.router:
+            self.router.fail(IOError('bus closed'))
+
+    async def submit(self, packet):
+        """
+        Write a packet when its camera can take it and return its Request (see pyviscam.demux)
+        Like the Scheduler, a camera gets a packet only when its previous packet
+        has been acked and no late reply of a packet given up is expected
+        """
+        request = self.router.request(packet)
+        gate = self._gates.get(request.address)
+        if gate is None:
+            gate = self._gates[request.address] = asyncio.Lock()
+        await gate.acquire()
+        try:
+            late = self.router.late_until(request.address)
+            while late is not None:
+                await asyncio.sleep(max(0, late - monotonic()))
+                late = self.router.late_until(request.address)
+        except BaseException:
+            gate.release()
+            raise
+        # the camera takes the next packet once this one is acked or given up
+        request.ack.add_done_callback(lambda future: gate.release())
+        asyncio.get_running_loop().call_later(request.ack_timeout, self._expire, request)
+        self._write(request)
+        return request
+
+    def _write(self, request):
+        self.router.register(request)
+        request.written = monotonic()
+        if not self.transport.write_packet(request.packet):
+            # never on the wire, no late reply to expect
+            request.written = None
+            self.router.forget(request)
+        request.sent.set()
+
+    def _expire(self, request):
+        """
+        Give up a request not acked in time, even if nobody waits for it
+        """
+        if not request.ack.done():
+            self.router.forget(request, AckTimeout(request, request.ack_timeout))
+            for future in (request.ack, request.done):
+                if not future.cancelled():
+                    # retrieved, asyncio does not complain if nobody waits for it
+                    future.exception()
+
+    async def wait(self, request, future):
+        """
+        Wait for a reply of a request, until its deadline
+            :future is request.ack or request.done
+            :Return None if the request has been forgotten
+            :Raise AckTimeout or CompletionTimeout after the deadline
+        """
+        if future.cancelled():
+            # forgotten after a timeout
+            return None
+        if future is request.ack:
+            timeout, error = request.ack_timeout, AckTimeout
+        elif request.socket is None:
+            # an inquiry or a broadcast, answered at once
+            timeout, error = request.timeout, AckTimeout
+        else:
+            timeout, error = request.timeout, CompletionTimeout
+        timeout = request.remaining(timeout)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self.router.forget(request)
+            raise error(request, timeout)
+
+    async def _send_broadcast(self, data):
+        request = await self.submit(b'\x88' + data + b'\xff')
+        try:
+            return await self.wait(request, request.done) or b''
+        except ViscaTimeout:
+            return b''
+
+    async def _cmd_adress_set(self):
+        """
+        starts enumerating devices, sends the first adress to use on the bus
+        reply is the same packet with the next free adress to use
+        """
+        first = 1
+        reply = await self._send_broadcast(b'\x30' + bytes([first]))
+        if len(reply) != 4 or reply[0:2] != b'\x88\x30':
+            logger.error('ERROR 36 - enumerating devices')
+            return []
+        devices_count = reply[2] - first
+        logger.debug("found %i devices on the bus", devices_count)
+        viscams = []
+        for device in range(first, reply[2]):
+            cache = None
+            if self.cache_ttl:
+                cache = QueryCache(self.cache_ttl)
+            viscams.append(AsyncCamera(self, device, cache))
+        return viscams
+
+    async def _if_clear(self):
+        """
+        clear the interfaces on the bus
+        """
+        reply = await self._send_broadcast(b'\x01\x00\x01')
+        if reply[1:] != b'\x01\x00\x01\xff':
+            logger.error("ERROR 39 - when clearing interfaces on the bus!")
+            return False
+        return True
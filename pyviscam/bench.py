@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Bench module measures the throughput of the bus and the latency of the commands
+Against the simulator by default, or against the cameras of a serial port.
+
+python -m pyviscam.bench --cameras 7 --baudrate 9600 --latency 0.03 --output bench.json
+python -m pyviscam.bench --port /dev/ttyUSB0
+
+The results are written as JSON :
+    - command, query : round trip latency of _cmd_cam and _query (seconds)
+    - inquiries : inquiries per second, queued on every camera at once
+    - snapshot : time to snapshot every parameter of every camera
+    - drive : joystick vectors posted and drive commands sent per second
+"""
+
+import argparse
+import json
+import sys
+import threading
+from time import sleep
+
+from pyviscam.broadcast import v_cams
+from pyviscam.cache import monotonic
+from pyviscam.exceptions import ViscaTimeout
+from pyviscam.simulator import Simulator
+
+
+def percentiles(values):
+    """
+    Return the count, mean, p50, p99 and max of a list of durations
+    """
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+
+    def rank(percent):
+        return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+    return {'count': len(values), 'mean': sum(values) / len(values),
+            'p50': rank(50), 'p99': rank(99), 'max': values[-1]}
+
+
+def _timed(function, count):
+    durations = []
+    for index in range(count):
+        start = monotonic()
+        function()
+        durations.append(monotonic() - start)
+    return percentiles(durations)
+
+
+def bench_command(cam, count):
+    """
+    Round trip of a command : white balance auto, ack and completion
+    """
+    return _timed(lambda: cam._cmd_cam(b'\x35\x00'), count)
+
+
+def bench_query(cam, count):
+    """
+    Round trip of an inquiry : power
+    """
+    return _timed(lambda: cam._query('power'), count)
+
+
+def bench_inquiries(cams, count):
+    """
+    Queue count inquiries on every camera at once
+        :Return the inquiries answered per second
+    """
+    dispatcher = cams[0].parent.dispatcher
+    start = monotonic()
+    requests = [dispatcher.submit(cam._inquiries['power']) for index in range(count) for cam in cams]
+    answered = 0
+    for request in requests:
+        try:
+            if request.wait_ack():
+                answered += 1
+        except ViscaTimeout:
+            pass
+    elapsed = monotonic() - start
+    return {'inquiries': answered, 'seconds': elapsed, 'per_second': answered / elapsed}
+
+
+def bench_snapshot(cams):
+    """
+    Snapshot every parameter of every camera, a thread per camera
+    """
+    snapshots = [None] * len(cams)
+
+    def snapshot(index):
+        snapshots[index] = cams[index].snapshot()
+
+    threads = [threading.Thread(target=snapshot, args=(index,)) for index in range(len(cams))]
+    start = monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = monotonic() - start
+    return {'cameras': len(cams), 'seconds': elapsed,
+            'values': sum(len(snapshot) for snapshot in snapshots),
+            'errors': sum(len(snapshot.errors) for snapshot in snapshots)}
+
+
+def bench_drive(cam, rate, duration):
+    """
+    Post joystick vectors at rate per second for duration seconds
+        :Return the vectors posted and the drive commands sent per second
+    """
+    posted = 0
+    start = monotonic()
+    while monotonic() - start < duration:
+        cam.drive((posted % 48) - 24, 0)
+        posted += 1
+        sleep(1.0 / rate)
+    cam.drive(0, 0)
+    posted += 1
+    channel = cam._drive
+    # let the stop go
+    sleep(0.2)
+    elapsed = monotonic() - start
+    sent = posted - channel.dropped
+    return {'posted': posted, 'sent': sent, 'dropped': channel.dropped,
+            'per_second': sent / elapsed}
+
+
+def run(cameras=1, baudrate=9600, latency=0.03, inquiry_latency=0.005, count=50,
+        joystick_rate=100, duration=2, port=None):
+    """
+    Run the benchmarks
+        :port is a serial port, the simulator is used if None
+        :baudrate of the simulator, or of the port (None to detect it)
+        :Return the results as a dict
+    """
+    config = {'cameras': cameras, 'baudrate': baudrate, 'latency': latency,
+              'inquiry_latency': inquiry_latency, 'count': count, 'joystick_rate': joystick_rate,
+              'duration': duration, 'port': port}
+    if port is None:
+        chain = v_cams('sim', transport=Simulator(cameras, latency, inquiry_latency, baudrate))
+    else:
+        chain = v_cams(port, baudrate=baudrate or 'auto')
+        config['cameras'] = len(chain.get_instances())
+    cams = chain.get_instances()
+    try:
+        results = {'config': config,
+                   'command': bench_command(cams[0], count),
+                   'query': bench_query(cams[0], count),
+                   'inquiries': bench_inquiries(cams, count),
+                   'snapshot': bench_snapshot(cams),
+                   'drive': bench_drive(cams[0], joystick_rate, duration)}
+    finally:
+        chain.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pyviscam.bench', description=__doc__.split('\n')[1])
+    parser.add_argument('--port', help='serial port of real cameras, the simulator by default')
+    parser.add_argument('--cameras', type=int, default=1, help='simulated cameras')
+    parser.add_argument('--baudrate', type=int, default=9600, help='baudrate of the port or of the simulator, 0 to detect it or for no pacing')
+    parser.add_argument('--latency', type=float, default=0.03, help='simulated completion time (s)')
+    parser.add_argument('--inquiry-latency', type=float, default=0.005, help='simulated answer time (s)')
+    parser.add_argument('--count', type=int, default=50, help='commands and inquiries measured')
+    parser.add_argument('--joystick-rate', type=float, default=100, help='joystick vectors per second')
+    parser.add_argument('--duration', type=float, default=2, help='joystick duration (s)')
+    parser.add_argument('--output', help='JSON file, stdout by default')
+    args = parser.parse_args(argv)
+    results = run(args.cameras, args.baudrate or None, args.latency, args.inquiry_latency, args.count,
+                  args.joystick_rate, args.duration, args.port)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+    return results
+
+
+if __name__ == '__main__':
+    main()
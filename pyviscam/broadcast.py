@@ -22,13 +22,43 @@ cams[0].AE = 'auto'
 # ask about the White Balance
 cams[0].query('WB')
 
+For a VISCA over IP camera, give an UDP transport and the camera address :
+
+from pyviscam.udp import UDP
+cams = v_cams('192.168.0.100', transport=UDP())
+
+Keep the answers to the queries for half a second :
+
+cams = v_cams(port, cache_ttl=0.5)
+
+Talk faster, or find the baud rate the cameras are set to :
+
+cams = v_cams(port, baudrate=38400)
+cams = v_cams(port, baudrate='auto')
+
+Give the cameras more time to complete the long moves (see pyviscam.demux.TIMEOUTS) :
+
+cams = v_cams(port, timeouts={'long': 60})
+
+Watch some parameters, the changes are given to a callback :
+
+cams.subscribe(cams[0], 'zoom', 0.5, callback)
+
 """
 
+import logging
 import sys
 from pyviscam.port import Serial
+from pyviscam.cache import QueryCache
 from pyviscam.camera import Camera
+from pyviscam.convert import i2b
+from pyviscam.exceptions import ViscaTimeout
+from pyviscam.packets import frame
+from pyviscam.poller import Poller
+from pyviscam.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
 
-from pyviscam import debug
 
 
 class v_cams(object):
@@ -36,21 +66,39 @@ class v_cams(object):
     v_cams is a chain of Visca camera
     v_cams is a broadcast command relative to a Serial port
     v_cams initialisation call _cmd_address_set and _if_clear
+
+    port is the serial port name, or the camera address for VISCA over IP
+    transport defaults to pyviscam.port.Serial, use pyviscam.udp.UDP
+    for VISCA over IP cameras
+    cache_ttl gives a QueryCache to each camera, answers are kept cache_ttl seconds
+    poll_budget is the number of inquiries per second the Poller of the subscriptions can send
+    baudrate is the speed of the default Serial transport, 'auto' to find it
+    timeouts replaces some of the time the requests have to be answered (see pyviscam.demux.TIMEOUTS)
     """
-    def __init__(self, port=None):
+    def __init__(self, port=None, transport=None, cache_ttl=None, poll_budget=20, baudrate=9600,
+                 timeouts=None):
         super(v_cams, self).__init__()
-        # create a serial port communication
-        serial = Serial()
+        self.cache_ttl = cache_ttl
+        self.timeouts = timeouts
+        self.poller = Poller(poll_budget)
+        # Instruments timing the requests of the cameras (see pyviscam.instrument)
+        self.instruments = None
+        if transport is None:
+            # create a serial port communication
+            transport = Serial(baudrate)
         # make it available from everywhere
-        self.serial = serial
+        self.transport = transport
+        # serial is the historical name of the transport
+        self.serial = transport
+        self.dispatcher = None
+        self.viscams = []
         self.port = port
         if port:
             self.reset(port)
         else:
             # please make a simulation in case you don't have
             # a serial port with a visca camera available
-            if debug:
-                print("ERROR 34 - no serial port selected")
+            logger.error('ERROR 34 - no serial port selected')
 
     def get_instances(self):
         """
@@ -63,12 +111,52 @@ class v_cams(object):
         Reset the visca communication
         Notice that it release and re-create Visca objects
         """
+        # nothing reads the transport while it is opened again
+        if self.dispatcher:
+            self.dispatcher.stop()
+            self.dispatcher = None
+        for cam in self.viscams:
+            cam.close()
+        self.viscams = []
         # if there is a port, open it
-        self.serial.open(port)
+        if not self.transport.open(port):
+            logger.error('ERROR 34 - cannot open %s', port)
+            return
+        # the scheduler shares the bus between the cameras
+        # and gives every reply to its request
+        self.dispatcher = Scheduler(self.transport, self.timeouts)
+        self.dispatcher.start()
         # Give me the list of available cameras
         self.viscams = self._cmd_adress_set()
         # Clear the buffers from any packet stuck anywhere
         self._if_clear()
+        # use the profile of each model
+        for cam in self.viscams:
+            cam.identify()
+
+    def subscribe(self, camera, param, max_staleness, callback):
+        """
+        Watch a parameter of a camera, the Poller reads it for every subscriber
+            :max_staleness is the maximum age of the value (seconds)
+            :callback is called with (camera, param, value) when the value changes
+            :Return a Subscription
+        """
+        return self.poller.subscribe(camera, param, max_staleness, callback)
+
+    def unsubscribe(self, subscription):
+        self.poller.unsubscribe(subscription)
+
+    def close(self):
+        """
+        Stop reading replies, close the transport and the drive channels of the cameras
+        """
+        self.poller.stop()
+        self.transport.close()
+        if self.dispatcher:
+            self.dispatcher.stop()
+            self.dispatcher = None
+        for cam in self.viscams:
+            cam.close()
 
     def _send_broadcast(self, data):
         """
@@ -86,34 +174,31 @@ class v_cams(object):
         #address of first device. should be 1:
         first = 1
 
-        reply = self._send_broadcast('\x30'+chr(first)) # set address
+        reply = self._send_broadcast(b'\x30' + i2b(first)) # set address
         if isinstance(reply, type(None)):
-            if debug:
-                print("ERROR 35 - No reply from the bus")
+            logger.error('ERROR 35 - No reply from the bus')
             sys.exit(1)
-        if len(reply) != 4 or reply[-1:] != '\xff':
-            if debug:
-                print("ERROR 36 - enumerating devices")
+        if len(reply) != 4 or reply[-1:] != b'\xff':
+            logger.error('ERROR 36 - enumerating devices')
             sys.exit(1)
-        if reply[0] != '\x88':
-            if debug:
-                print("ERROR 37 - expecting broadcast answer to an enumeration request")
+        if reply[0:1] != b'\x88':
+            logger.error('ERROR 37 - expecting broadcast answer to an enumeration request')
             sys.exit(1)
-        address = ord(reply[2])
+        address = bytearray(reply)[2]
 
         devices_count = address - first
         if devices_count == 0:
-            if debug:
-                print('ERROR 38 - unexpected answer : someone reply, but no Camera found')
+            logger.error('ERROR 38 - unexpected answer : someone reply, but no Camera found')
             sys.exit(1)
         else:
-            if debug:
-                print("found %i devices on the bus" % devices_count)
-            device = 1
+            logger.debug("found %i devices on the bus", devices_count)
             viscams = []
-            while device <= devices_count:
-                device = device + 1
-                cam = Camera(self)
+            # each device takes the next address on the chain
+            for device in range(first, address):
+                cache = None
+                if self.cache_ttl:
+                    cache = QueryCache(self.cache_ttl)
+                cam = Camera(self, device, cache)
                 viscams.append(cam)
             return viscams
 
@@ -122,12 +207,11 @@ class v_cams(object):
         clear the interfaces on the bys
         """
         # interface clear all
-        reply = self._send_broadcast('\x01\x00\x01')
-        if not reply[1:] == '\x01\x00\x01\xff':
-            print("ERROR 39 - when clearing interfaces on the bus!")
+        reply = self._send_broadcast(b'\x01\x00\x01')
+        if not reply or not reply[1:] == b'\x01\x00\x01\xff':
+            logger.error("ERROR 39 - when clearing interfaces on the bus!")
             sys.exit(1)
-        if debug:
-            print("all interfaces clear")
+        logger.debug('all interfaces clear')
         return reply
 
     def _send_packet(self, data, recipient=1):
@@ -150,28 +234,8 @@ class v_cams(object):
 
         we use -1 as recipient to send a broadcast!
         """
-        # we are the controller with id=0
-        sender = 0
-        if recipient == -1:
-            #broadcast:
-            rbits = 0x8
-        else:
-            # the recipient (address = 3 bits)
-            rbits = recipient & 0b111
-
-        sbits = (sender & 0b111)<<4
-        header = 0b10000000 | sbits | rbits
-        terminator = 0xff
-        packet = chr(header)+data+chr(terminator)
-        self.serial.mutex.acquire()
-        self.serial._write_packet(packet)
-        reply = self.serial.recv_packet()
-        if reply:
-            if reply[-1:] != '\xff':
-                if debug:
-                    print("received packet not terminated correctly: %s" % reply.encode('hex'))
-                reply = None
-            self.serial.mutex.release()
-            return reply
-        else:
+        request = self.dispatcher.submit(frame(recipient, data))
+        try:
+            return request.wait_ack()
+        except ViscaTimeout:
             return None
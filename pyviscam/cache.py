@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Cache module contains the QueryCache Class
+A QueryCache keeps the answers to the queries of a camera for a while,
+so reading the same property again does not go to the wire.
+
+An answer is forgotten :
+    - when its time to live is over
+    - when a command setting this parameter is sent and when it is completed
+    - while the camera moves (pan_tilt, zoom and focus drives)
+
+cam.cache = QueryCache(ttl=0.5, ttls={'pan_tilt': 0.1})
+"""
+
+import threading
+from time import monotonic
+
+from pyviscam.constants import queries, invalidations
+
+
+def _command_table():
+    """
+    Return the parameters changed by a command, indexed by its first bytes
+    A command setting a parameter starts like its query : 0x01 instead of 0x09
+    """
+    table = {}
+    for name, query in queries.items():
+        table.setdefault(b'\x01' + query.encode('latin-1'), []).append(name)
+    for prefix, names in invalidations.items():
+        table.setdefault(prefix, [])
+        if names is None:
+            table[prefix] = None
+        elif table[prefix] is not None:
+            table[prefix].extend(names)
+    return table
+
+commands = _command_table()
+
+# drive commands (prefix, stop), the parameter moves until the stop is sent
+drives = {b'\x01\x04\x07': ('zoom', b'\x00'),
+          b'\x01\x04\x08': ('focus', b'\x00'),
+          b'\x01\x06\x01': ('pan_tilt', b'\x03\x03')}
+
+MISSING = object()
+
+
+class QueryCache(object):
+    """
+    Answers of the queries of a camera
+        :ttl is the default time to live of an answer (seconds)
+        :ttls gives the time to live of some parameters
+    """
+    def __init__(self, ttl=1, ttls=None):
+        super(QueryCache, self).__init__()
+        self.ttl = ttl
+        self.ttls = dict(ttls or {})
+        self.mutex = threading.Lock()
+        # parameter -> (value, expiry)
+        self._values = {}
+        # parameter -> time of the last invalidation
+        self._invalidated = {}
+        self._all_invalidated = 0
+        # parameters moving, not cached until they stop
+        self._moving = set()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name):
+        """
+        Return the cached value of a parameter, or MISSING
+        """
+        entry = self._values.get(name)
+        if entry is None or entry[1] < monotonic():
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return entry[0]
+
+    def put(self, name, value, since):
+        """
+        Cache the answer to a query sent at since (monotonic time)
+        The answer is dropped if the parameter has changed in the meantime
+        """
+        with self.mutex:
+            if name in self._moving:
+                return
+            if self._invalidated.get(name, 0) >= since or self._all_invalidated >= since:
+                return
+            self._values[name] = (value, monotonic() + self.ttls.get(name, self.ttl))
+
+    def invalidate(self, names=None):
+        """
+        Forget some parameters, None forgets every parameter
+        """
+        now = monotonic()
+        with self.mutex:
+            if names is None:
+                self._values.clear()
+                self._all_invalidated = now
+                return
+            for name in names:
+                self._values.pop(name, None)
+                self._invalidated[name] = now
+
+    def command(self, message):
+        """
+        Forget the parameters changed by a command message (without header)
+            :Return the parameters forgotten, None for every parameter
+        """
+        message = bytes(message)
+        drive = drives.get(message[:3])
+        if drive is not None:
+            name, stop = drive
+            with self.mutex:
+                if message.endswith(stop):
+                    self._moving.discard(name)
+                else:
+                    self._moving.add(name)
+        names = commands.get(message[:4], MISSING)
+        if names is MISSING:
+            names = commands.get(message[:3], ())
+        self.invalidate(names)
+        return names
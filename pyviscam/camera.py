@@ -8,27 +8,124 @@ that answers to a broadcast message.
 
 """
 
-from pyviscam.convert import hex_to_int, i2v, scale
-from pyviscam.pan_tilt_utils import degree_to_visca, visca_to_degree
-from pyviscam.constants import queries, answers, high_res_params, very_high_res_params
+import logging
+import threading
+from binascii import hexlify
+from contextlib import contextmanager
 
-from pyviscam import debug
+from pyviscam.cache import MISSING, monotonic
+from pyviscam.codec import decoder, encoder
+from pyviscam.convert import i2b
+from pyviscam.drive import DriveChannel
+from pyviscam.exceptions import ViscaTimeout
+from pyviscam.instrument import command_name
+from pyviscam.packets import frame, inquiries, commands, templates
+from pyviscam.pan_tilt_utils import degree_to_visca, delta_to_visca
+from pyviscam.profile import find
+from pyviscam.constants import queries, block_queries, block_values, block_flags
+
+from pyviscam import TRACE
+
+logger = logging.getLogger(__name__)
+
+
+class Command(object):
+    """
+    A command sent to a camera, returned as soon as it is acked
+        :socket is the socket of the camera executing the command (1 or 2)
+        :accepted is False if the camera refused the command
+        :Raise AckTimeout if the camera does not ack it in time
+    """
+    def __init__(self, request):
+        self.request = request
+        self.ack = request.wait_ack()
+        self.socket = request.socket
+        self.accepted = bool(self.ack) and bytearray(self.ack)[1] & 0xf0 == 0x40
+        if self.accepted and logger.isEnabledFor(TRACE):
+            logger.log(TRACE, '-----------ACK %i-------------------', self.socket)
+
+    def done(self):
+        """
+        Return True when the command is over
+        """
+        return not self.accepted or self.request.done.done()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the completion of the command
+            :timeout replaces the deadline of the command (seconds from now)
+            :Return True if the command has been completed
+            :Raise CompletionTimeout if it is not completed in time
+        """
+        if not self.accepted:
+            return self._error(self.ack)
+        reply = self.request.wait(timeout)
+        if reply and bytearray(reply)[1] & 0xf0 == 0x50:
+            if logger.isEnabledFor(TRACE):
+                logger.log(TRACE, '--------COMPLETION %i---------------', self.socket)
+            return True
+        return self._error(reply)
+
+    def _error(self, reply):
+        if not reply:
+            return None
+        reply = bytearray(reply)
+        if reply[1:3] == b'\x60\x02':
+            logger.warning('--------Syntax Error------------')
+        elif reply[1:3] == b'\x60\x03':
+            logger.warning('-------- FULL BUFFER ---------------')
+        elif reply[2] == 0x41:
+            logger.error('-----------ERROR %i (not in this mode)------------', reply[1] & 0x0f)
+        elif reply[2] == 0x04:
+            logger.error('-----------ERROR %i (cancelled)------------', reply[1] & 0x0f)
+        return False
+
+
+class Snapshot(dict):
+    """
+    The values of the parameters of a camera, returned by Camera.snapshot()
+        :errors gives the reason why a parameter has no value
+    """
+    def __init__(self, *args, **kwargs):
+        super(Snapshot, self).__init__(*args, **kwargs)
+        self.errors = {}
 
 
 class Camera(object):
     """
     create a visca camera
+        :cache is an optional QueryCache (see pyviscam.cache)
+        :estimator is an optional Estimator (see pyviscam.estimator)
     """
-    def __init__(self, parent):
+    def __init__(self, parent, address=1, cache=None, estimator=None):
         """the constructor"""
-        self.serial = parent.serial
+        self.transport = parent.transport
         self.parent = parent
+        # address of the camera on the bus (1..7)
+        self.address = address
         self._pan_speed = 0x05
         self._tilt_speed = 0x05
-        if debug:
-            print("new visca camera")
-
-    def _send_packet(self, data, recipient=1):
+        self._local = threading.local()
+        self._mutex = threading.Lock()
+        self._drive = None
+        self.cache = cache
+        self.estimator = estimator
+        # called with (camera, message) for each command sent
+        self.listeners = []
+        # packets compiled for this address
+        self._inquiries = inquiries.get(address, {})
+        self._commands = commands.get(address, {})
+        self._templates = templates(address)
+        # translates the replies to the queries, and the values of the setters
+        self.decoder = decoder
+        self.encoder = encoder
+        # model of the camera (see pyviscam.profile), None until identified
+        self.profile = None
+        # parameter -> (min, max) accepted by the model
+        self.ranges = {}
+        logger.debug('new visca camera')
+
+    def _packet(self, data, recipient=None):
         """
         according to the documentation:
 
@@ -49,191 +146,420 @@ class Camera(object):
         we use -1 as recipient to send a broadcast!
 
         """
-        # we are the controller with id=0
-        sender = 0
-        if recipient == -1:
-            # broadcast
-            rbits = 0x8
-        else:
-            # the recipient (address = 3 bits)
-            rbits = recipient & 0b111
-        sbits = (sender & 0b111)<<4
-        header = 0b10000000 | sbits | rbits
-        terminator = 0xff
-        packet = chr(header)+data+chr(terminator)
-        self.serial.mutex.acquire()
-        self.serial._write_packet(packet)
-        reply = self.serial.recv_packet()
-        if reply:
-            if reply[-1:] != '\xff':
-                if debug:
-                    print("ERROR 41 - received packet not terminated correctly: %s" % reply.encode('hex'))
-                reply = None
-            self.serial.mutex.release()
-            return reply
-        else:
-            return None
+        if recipient is None:
+            recipient = self.address
+        return frame(recipient, data)
+
+    def _send_packet(self, data, recipient=None):
+        """
+        Send a packet
+            :Return its request (see pyviscam.demux)
+        """
+        packet = self._packet(data, recipient)
+        request = self.parent.dispatcher.submit(packet)
+        self._watch(request, packet)
+        return request
+
+    def _watch(self, request, packet, name=None):
+        """
+        Time a request if the parent has instruments (see pyviscam.instrument)
+        """
+        instruments = self.parent.instruments
+        if instruments is not None:
+            instruments.watch(request, name or command_name(packet[1:-1]))
 
     def _cmd_cam_alt(self, subcmd):
         """
         shortcut to send command with alternative prefix
         """
-        prefix = '\x01\x06'
-        self._cmd_cam(subcmd, prefix)
+        prefix = b'\x01\x06'
+        return self._cmd_cam(subcmd, prefix)
 
-    def _cmd_cam(self, subcmd, prefix='\x01\x04'):
+    def _cmd_cam(self, subcmd, prefix=b'\x01\x04'):
         """
         Send a command to the camera and return the answer
         The camera answer first an acceptation of the command, and then a completion
         If the command cannot be send or is not a valide command
         => the camera will answers an error code
+
+        Inside a concurrent() block, return the Command as soon as it is acked
         """
-        packet = prefix + subcmd
-        reply = self._send_packet(packet)
-        if reply == '\x90'+'\x41'+'\xFF':
-            if debug == 4:
-                print('-----------ACK 1-------------------')
-            reply = self.serial.recv_packet()
-            if reply == '\x90'+'\x51'+'\xFF':
-                if debug == 4:
-                    print('--------COMPLETION 1---------------')
-                return True
-        elif reply == '\x90'+'\x42'+'\xFF':
-            if debug == 4:
-                print('-----------ACK 2-------------------')
-            reply = self.serial.recv_packet()
-            if reply == '\x90'+'\x52'+'\xFF':
-                if debug == 4:
-                    print('--------COMPLETION 2---------------')
-                return True
-        elif reply == '\x90'+'\x60'+'\x02'+'\xFF':
-            if debug:
-                print('--------Syntax Error------------')
-            return False
-        elif reply == '\x90'+'\x61'+'\x41'+'\xFF':
-            if debug:
-                print('-----------ERROR 1 (not in this mode)------------')
-            return False
-        elif reply == '\x90'+'\x62'+'\x41'+'\xFF':
-            if debug:
-                print('-----------ERROR 2 (not in this mode)------------')
-            return False
+        return self._cmd_packet(self._command_packet(prefix + subcmd))
 
-    def _come_back(self, query):
+    def _cmd_value(self, name, *values):
         """
-        Send a query and wait for (ack + completion + answer)
-            :Accepts a visca query (hexadeciaml)
-            :Return a visca answer if ack and completion (hexadeciaml)
+        shortcut to send a command with parameters (see pyviscam.packets.templates)
+            :Return False if the model does not support it
         """
-        # send the query and wait for feedback
-        reply = self._send_packet(query)
-        if reply == '\x90'+'\x60'+'\x03'+'\xFF':
-            if debug:
-                print('-------- FULL BUFFER ---------------')
-            # buffer is full, send it again
-            self._come_back(query)
-        elif reply.startswith('\x90'+'\x50'):
-            if debug == 4:
-                print('-------- QUERY COMPLETION ---------------')
-            # We know this is a valid query request, please send it back
-            return reply
-        elif reply == '\x90'+'\x60'+'\x02'+'\xFF':
-            if debug:
-                print('-------- QUERY SYNTAX ERROR ---------------')
+        template = self._templates.get(name)
+        if template is None or (len(values) == 1 and not self._in_range(name, values[0])):
+            logger.error('ERROR 45 - %s cannot be set to %s', name, values)
             return False
+        return self._cmd_packet(template.packet(*values))
+
+    def _in_range(self, name, value):
+        limits = self.ranges.get(name)
+        return limits is None or limits[0] <= value <= limits[1]
+
+    def use_profile(self, profile):
+        """
+        Use the tables of a model of camera (see pyviscam.profile)
+        """
+        profile.compile()
+        self.profile = profile
+        self._inquiries = profile.inquiries(self.address)
+        self._templates = profile.templates(self.address)
+        self.decoder = profile.decoder
+        self.encoder = profile.encoder
+        self.ranges = profile.ranges
+
+    def identify(self):
+        """
+        Ask the version of the camera and use the profile of its model
+            :Return the profile, None if there is none
+            :The default profile is used if the camera does not answer in time
+        """
+        try:
+            version = self._query('version')
+        except ViscaTimeout as error:
+            logger.error('%s, camera %i uses the default profile', error, self.address)
+            version = None
+        return self._identify(version)
+
+    def _identify(self, version):
+        # vendor (2 bytes), model (2 bytes), rom version (2 bytes), sockets
+        vendor = model = None
+        if isinstance(version, list) and len(version) >= 4:
+            vendor = int(''.join(version[0:2]), 16)
+            model = int(''.join(version[2:4]), 16)
+        profile = find(vendor, model)
+        if profile is not None:
+            logger.debug('camera %i is a %s', self.address, profile.name)
+            self.use_profile(profile)
+        return profile
+
+    def _cmd_setting(self, name, value, raw=False):
+        """
+        shortcut to set a parameter from its real life value (see pyviscam.codec.Encoder)
+            :raw is True if value is already a code of the parameter
+            :Return False if the parameter cannot take this value
+        """
+        if name in self._templates:
+            code = self.encoder.code(name, value, raw)
+            if code is not None:
+                return self._cmd_value(name, code)
+        else:
+            message = self.encoder.message(name, value, raw)
+            if message is not None:
+                return self._cmd_packet(self._command_packet(message))
+        logger.error('ERROR 45 - %s cannot be set to %s', name, value)
+        return False
+
+    def _cmd_packet(self, packet):
+        command = self._send_command(packet)
+        batch = getattr(self._local, 'batch', None)
+        if batch is not None:
+            batch.append(command)
+            return command
+        return command.wait()
+
+    def send_command(self, message):
+        """
+        Send a command and return as soon as the camera acks it
+            :message is the command without header and terminator
+            :Return a Command, call its wait() method to wait for the completion
+            :Block while both sockets of the camera are busy
+        """
+        return self._send_command(self._command_packet(message))
+
+    def send_value(self, name, *values):
+        """
+        Send a command with parameters and return as soon as the camera acks it
+            :name is a template of pyviscam.packets ('zoom', 'pan_tilt'...)
+            :values are the raw visca values
+            :Return a Command
+        """
+        return self._send_command(self._templates[name].packet(*values))
+
+    def _command_packet(self, message):
+        """
+        Return the packet of a command, compiled if it has no parameter
+        """
+        packet = self._commands.get(message)
+        if packet is None:
+            packet = self._packet(message)
+        return packet
+
+    def _send_command(self, packet):
+        # the scheduler holds the packet until a socket is free
+        request = self.parent.dispatcher.submit(packet)
+        self._watch(request, packet)
+        self._commanded(request, packet)
+        return Command(request)
+
+    def _commanded(self, request, packet):
+        """
+        Tell the cache, the estimator and the listeners about a command sent
+        """
+        if self.cache is not None:
+            names = self.cache.command(packet[1:-1])
+            if names != ():
+                # forget again what has been read while the command was executing
+                request.done.add_done_callback(lambda future: self.cache.invalidate(names))
+        estimator = self.estimator
+        if estimator is not None:
+            message = packet[1:-1]
+            estimator.command(message)
+            def completed(future):
+                # completion is y0 5z FF, errors are y0 6z .. FF
+                if not future.cancelled() and future.exception() is None \
+                   and bytearray(future.result())[1] & 0xf0 == 0x50:
+                    estimator.completed(message)
+            request.done.add_done_callback(completed)
+        for listener in self.listeners:
+            listener(self, packet[1:-1])
+
+    @contextmanager
+    def concurrent(self):
+        """
+        Commands sent inside the block return as soon as they are acked,
+        so a second command can run while the first one is executing.
+        The block waits for the completion of every command on exit.
+
+        with cam.concurrent() as commands:
+            cam.pan = 30
+            cam.zoom = 2000
+        """
+        commands = []
+        self._local.batch = commands
+        try:
+            yield commands
+        finally:
+            self._local.batch = None
+        for command in commands:
+            command.wait()
+
+    def _come_back(self, query, name=None, retries=2):
+        """
+        Send a query and wait for (ack + completion + answer)
+            :Accepts a visca query packet (see pyviscam.packets.inquiries)
+            :name is the parameter queried, for the instruments
+            :retries is the number of times the query is sent again when the buffer is full
+            :Return a visca answer if ack and completion (hexadeciaml)
+            :Return False on error, None if the buffer stays full
+            :Raise AckTimeout if the camera does not answer in time
+        """
+        for attempt in range(retries + 1):
+            # send the query and wait for feedback
+            request = self.parent.dispatcher.submit(query)
+            self._watch(request, query, name)
+            reply = request.wait_ack()
+            if not reply:
+                return None
+            elif reply[1:] == b'\x60\x03\xff':
+                # buffer is full, send it again
+                logger.warning('-------- FULL BUFFER ---------------')
+            elif reply[1:2] == b'\x50':
+                if logger.isEnabledFor(TRACE):
+                    logger.log(TRACE, '-------- QUERY COMPLETION ---------------')
+                # We know this is a valid query request, please send it back
+                return reply
+            elif reply[1:] == b'\x60\x02\xff':
+                logger.warning('-------- QUERY SYNTAX ERROR ---------------')
+                return False
+            else:
+                logger.warning('-------- QUERY ERROR %s ------------', hexlify(reply))
+                return False
+        return None
 
-    def _query(self, function=None):
+    def _query(self, function=None, fresh=False):
         """
         Query method needs a parameter as argument
+            :fresh asks the camera even if the cache has the value, the answer is cached
             :Return False if no parameter is provided
             :Return False if parameter provided does not exist
-            :Return
+            :Return None if the camera cannot answer
+            :Raise AckTimeout if the camera does not answer in time
         """
         if not function:
             # maybe we could dump all functions if no function value is present
             # or maybe add a 'all' function?
             return False
-        if debug == 4:
-            print('QUERY', function)
-        if function == 'pan' or function == 'tilt':
-            # pan and tilt are separate properties.
-            # If we want to automatically query all properties, we must catch it here
-            function = 'pan_tilt'
-        # transform the property into its code (located in the __init__file of the package)
-        if function in queries:
-            subcmd = queries.get(function)
-        else:
-            if debug:
-                # there is no code for this function
-                dbg = 'ERROR 42 - function {function} has not yet been implemented'
-                print(dbg.format(function=function))
+        function, query = self._inquiry(function)
+        if not query:
             return False
-        # query starts with '\x09'
-        query = '\x09' + subcmd
-        if debug == 4:
-            dbg = 'send {function} query : {query}'
-            print(dbg.format(function=function, query=query.encode('hex')))
+        cache = self.cache
+        if cache is not None and not fresh:
+            value = cache.get(function)
+            if value is not MISSING:
+                return value
+        since = monotonic()
         # wait for the reply
-        reply = self._come_back(query)
-        if reply == None:
-            return self._query(function)
+        reply = self._come_back(query, function)
         if reply:
-            if debug == 4:
-                dbg = 'receive reply : {function} is {reply}'
-                print(dbg.format(function=function, reply=reply.encode('hex')))
-            # remove 2 first packets and the last terminator
-            # FIX ME : We must remove the first hex number elsewhere if we use multiples camera
-            reply = reply[2:-1].encode('hex')
-            # transform to a list of int
-            # FIX ME : found a nicer solution please, it's ugly !!
-            def hex_unpack(value, listt, size=2):
-                part = value[:size]
-                value = value[size:]
-                listt.append(part)
-                if value:
-                    hex_unpack(value, listt)
-                    return listt
-            if len(reply) > 2:
-                # it's a long answer, convert it to a list
-                reply = hex_unpack(reply, [])
-            else:
-                # it's a single value, just convert it to a valid base 10 integer
-                reply = int(reply, 16)
-            if function in high_res_params:
-                # parameter value is coded on 2 hexa numbers
-                reply = hex_to_int(reply)
-            elif function in very_high_res_params:
-                # parameter value is coded on 4 hexa numbers
-                reply = hex_to_int(reply)
-            # Check if the function has a special value to be translated
-            if function in answers:
-                # translate visca code to real life value
-                if reply in answers[function]:
-                    reply = answers[function][reply]
-            elif function == 'NR' or function == 'gamma' or function == 'chromasuppress':
-                reply = reply
-            elif function == 'color_gain' or function == 'color_hue':
-                reply = int(reply[3], 16)
-                reply = str(scale(reply, 0, 14, 60, 200))
-                if function == 'color_gain':
-                    reply = reply + '%'
+            value = self._translate(function, reply)
+            self._answered(function, value, since)
+            return value
+
+    def snapshot(self, params=None, retries=2):
+        """
+        Query many parameters at once
+        Every inquiry is queued at once : the scheduler writes the next one
+        as soon as the camera answers, the replies are matched as they arrive.
+            :params is a list of parameters, every parameter of the profile (or constants.queries) by default
+            :retries is the number of times an inquiry is sent again when the buffer is full
+            :Return a Snapshot (a dict parameter -> value),
+                    its errors attribute gives the parameters without value
+        """
+        if params is None:
+            params = sorted(self.profile.params if self.profile else queries)
+        snapshot = Snapshot()
+        pending = []
+        cache = self.cache
+        since = monotonic()
+        for param in params:
+            function, query = self._inquiry(param)
+            if not query:
+                snapshot.errors[param] = 'not implemented'
+                continue
+            if cache is not None:
+                value = cache.get(function)
+                if value is not MISSING:
+                    snapshot[function] = value
+                    continue
+            pending.append((function, query))
+        while pending:
+            requests = [(function, query, self.parent.dispatcher.submit(query)) for function, query in pending]
+            for function, query, request in requests:
+                self._watch(request, query, function)
+            pending = []
+            for function, query, request in requests:
+                try:
+                    reply = request.wait_ack()
+                except ViscaTimeout:
+                    reply = None
+                if reply and reply[1:2] == b'\x50':
+                    try:
+                        value = self._translate(function, reply)
+                    except (ValueError, IndexError, TypeError):
+                        snapshot.errors[function] = 'cannot translate %s' % hexlify(reply).decode('ascii')
+                        continue
+                    snapshot[function] = value
+                    snapshot.errors.pop(function, None)
+                    self._answered(function, value, since)
+                elif reply and reply[1:3] == b'\x60\x03' and retries:
+                    snapshot.errors[function] = 'buffer full'
+                    pending.append((function, query))
+                elif reply:
+                    snapshot.errors[function] = 'error %s' % hexlify(reply[1:-1]).decode('ascii')
                 else:
-                    reply = reply + '°'
-            elif function == 'pan_tilt':
-                pan = reply[0:4]
-                tilt = reply[4:8]
-                pan = hex_to_int(pan)
-                tilt = hex_to_int(tilt)
-                pan = visca_to_degree(pan, 'pan')
-                tilt = visca_to_degree(tilt, 'tilt')
-                reply = [pan, tilt]
+                    snapshot.errors[function] = 'no reply'
+            retries -= 1
+        return snapshot
+
+    def block(self, name):
+        """
+        Query a block of parameters with a single inquiry
+        The values are the same as the ones given by the single queries
+            :name is 'lens' (zoom, focus...) or 'camera' (white balance, exposure...)
+            :Return a dict parameter -> value, False on error
+        """
+        if name not in block_queries or 'block_' + name not in self._inquiries:
+            logger.error('ERROR 42 - block %s has not yet been implemented', name)
+            return False
+        since = monotonic()
+        reply = self._come_back(self._inquiries['block_' + name], 'block_' + name)
+        if not reply:
+            return False
+        values = self._block_values(name, reply)
+        if values:
+            for function, value in values.items():
+                self._answered(function, value, since)
+        return values
+
+    def _block_values(self, name, reply):
+        """
+        Return the values of the reply to a block inquiry, False if it is too short
+        """
+        data = bytearray(reply[2:-1])
+        if len(data) < 13:
+            logger.error("ERROR 44 - block reply too short: %s", hexlify(reply))
+            return False
+        values = {}
+        for function, offset, size, shift in block_values[name]:
+            if size == 1:
+                code = data[offset]
             else:
-                if debug == 4:
-                    print('FIX ME : is it normal that :', function, 'has no translation??' )
-            if debug:
-                dbg = '{function} is {reply}'
-                print(dbg.format(function=function, reply=reply))
-            return reply
+                # a nibble per byte
+                code = 0
+                for byte in data[offset:offset + size]:
+                    code = (code << 4) | (byte & 0x0f)
+            values[function] = self._value(function, code << (4 * shift))
+        for function, offset, mask, codes in block_flags[name]:
+            bits = data[offset] & mask
+            while not mask & 1:
+                mask >>= 1
+                bits >>= 1
+            if codes is not None:
+                bits = codes[bits]
+            values[function] = self._value(function, bits)
+        return values
+
+    def _answered(self, function, value, since):
+        """
+        Keep the value read from the camera (query sent at since)
+        """
+        if self.cache is not None:
+            self.cache.put(function, value, since)
+        if self.estimator is not None:
+            self.estimator.correct(function, value, since)
+
+    @property
+    def estimated_position(self):
+        """
+        Return the position estimated from the commands sent, without any inquiry
+            :Return a dict axis -> (value, uncertainty), None without estimator
+        """
+        if self.estimator is None:
+            return None
+        return self.estimator.position()
+
+    def _inquiry(self, function):
+        """
+        Return the parameter name and its visca query
+            :Return False as query if parameter provided does not exist
+        """
+        if logger.isEnabledFor(TRACE):
+            logger.log(TRACE, 'QUERY %s', function)
+        if function == 'pan' or function == 'tilt':
+            # pan and tilt are separate properties.
+            # If we want to automatically query all properties, we must catch it here
+            function = 'pan_tilt'
+        # the query packets are compiled in pyviscam.packets
+        query = self._inquiries.get(function)
+        if query is None:
+            # there is no code for this function
+            logger.error('ERROR 42 - function %s has not yet been implemented', function)
+            return function, False
+        if logger.isEnabledFor(TRACE):
+            logger.log(TRACE, 'send %s query : %s', function, hexlify(query))
+        return function, query
+
+    def _translate(self, function, reply):
+        """
+        Translate the reply to a query into a real life value
+        """
+        if logger.isEnabledFor(TRACE):
+            logger.log(TRACE, 'receive reply : %s is %s', function, hexlify(reply))
+        reply = self.decoder.decode(function, reply)
+        logger.debug('%s is %s', function, reply)
+        return reply
+
+    def _value(self, function, code):
+        """
+        Translate the code of a parameter into a real life value
+        """
+        return self.decoder.value(function, code)
 
     # ----------------------------------------------------
     # ---------------------- POWER -----------------------
@@ -246,13 +572,8 @@ class Camera(object):
         return self._query('power')
     @power.setter
     def power(self, state):
-        if debug:
-            print('power', state)
-        if state:
-            subcmd = '\x00\x02'
-        else:
-            subcmd = '\x00\x03'
-        return self._cmd_cam(subcmd)
+        logger.debug('power %s', state)
+        return self._cmd_setting('power', state)
 
     @property
     def power_auto(self):
@@ -265,10 +586,8 @@ class Camera(object):
         return self._query('power_auto')
     @power.setter
     def power_auto(self, time):
-        subcmd = '\x40' + i2v(time)
-        if debug:
-            print('power_auto', time)
-        return self._cmd_cam(subcmd)
+        logger.debug('power_auto %s', time)
+        return self._cmd_value('power_auto', time)
 
     # ----------------------------------------------------
     # ---------------------- ZOOM ------------------------
@@ -277,9 +596,8 @@ class Camera(object):
         """
         Stop the zoom movement
         """
-        if debug:
-            print('zoom_stop')
-        subcmd = "\x07\x00"
+        logger.debug('zoom_stop')
+        subcmd = b"\x07\x00"
         return self._cmd_cam(subcmd)
 
     def zoom_tele(self, speed=3):
@@ -288,12 +606,11 @@ class Camera(object):
             :speed is from 0 to 7 (default=3)
         """
         if speed == 3:
-            subcmd = "\x07\x02"
+            subcmd = b"\x07\x02"
         else:
             sbyte = 0x20 + (speed&0b111)
-            subcmd = "\x07" + chr(sbyte)
-        if debug:
-            print('zoom_tele', speed)
+            subcmd = b"\x07" + i2b(sbyte)
+        logger.debug('zoom_tele %s', speed)
         return self._cmd_cam(subcmd)
 
     def zoom_wide(self, speed=3):
@@ -302,12 +619,11 @@ class Camera(object):
             :speed is from 0 to 7 (default=3)
         """
         if speed == 3:
-            subcmd = "\x07\x03"
+            subcmd = b"\x07\x03"
         else:
             sbyte = 0x30 + (speed&0b111)
-            subcmd = "\x07" + chr(sbyte)
-        if debug:
-            print('zoom_wide', speed)
+            subcmd = b"\x07" + i2b(sbyte)
+        logger.debug('zoom_wide %s', speed)
         return self._cmd_cam(subcmd)
 
     @property
@@ -320,10 +636,8 @@ class Camera(object):
         return self._query('zoom')
     @zoom.setter
     def zoom(self, value):
-        if debug:
-            print('zoom', value)
-        subcmd = "\x47" + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('zoom %s', value)
+        return self._cmd_value('zoom', value)
 
     @property
     def zoom_digital(self):
@@ -333,21 +647,15 @@ class Camera(object):
         """
         Digital zoom ON/OFF
         """
-        if debug:
-            print('zoom_digital', state)
-        if state:
-            subcmd = "\x06\x02"
-        else:
-            subcmd = "\x06\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('zoom_digital %s', state)
+        return self._cmd_setting('zoom_digital', state)
 
     # ----------------------------------------------------
     # ---------------------- FOCUS -----------------------
     # ----------------------------------------------------
     def focus_stop(self):
-        if debug:
-            print('focus_stop')
-        subcmd = "\x08\x00"
+        logger.debug('focus_stop')
+        subcmd = b"\x08\x00"
         return self._cmd_cam(subcmd)
 
     def focus_far(self, speed=3):
@@ -356,12 +664,11 @@ class Camera(object):
         default is 3
         """
         if speed == 3:
-            subcmd = "\x08\x03"
+            subcmd = b"\x08\x03"
         else:
             sbyte = 0x30 + (speed&0b111)
-            subcmd = "\x08" + chr(sbyte)
-        if debug:
-            print('focus_far', speed)
+            subcmd = b"\x08" + i2b(sbyte)
+        logger.debug('focus_far %s', speed)
         return self._cmd_cam(subcmd)
 
     def focus_near(self, speed=3):
@@ -370,12 +677,11 @@ class Camera(object):
         default = 3
         """
         if speed == 3:
-            subcmd = "\x08\x02"
+            subcmd = b"\x08\x02"
         else:
             sbyte = 0x20 + (speed&0b111)
-            subcmd = "\x08" + chr(sbyte)
-        if debug:
-            print('focus_near', speed)
+            subcmd = b"\x08" + i2b(sbyte)
+        logger.debug('focus_near %s', speed)
         return self._cmd_cam(subcmd)
 
     @property
@@ -389,10 +695,8 @@ class Camera(object):
 
     @focus.setter
     def focus(self, value):
-        if debug:
-            print('focus', value)
-        subcmd = "\x48" + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('focus %s', value)
+        return self._cmd_value('focus', value)
 
     @property
     def focus_auto(self):
@@ -402,28 +706,22 @@ class Camera(object):
         return self._query('focus_auto')
     @focus_auto.setter
     def focus_auto(self, state):
-        if debug:
-            print('focus_auto', state)
-        if state:
-            return self._cmd_cam("\x38\x02")
-        else:
-            return self._cmd_cam("\x38\x03")
+        logger.debug('focus_auto %s', state)
+        return self._cmd_setting('focus_auto', state)
 
     def focus_trigger(self):
         """
         One Push AF Trigger
         """
-        if debug:
-            print('focus_trigger')
-        return self._cmd_cam("\x18\x01")
+        logger.debug('focus_trigger')
+        return self._cmd_cam(b"\x18\x01")
 
     def focus_infinity(self):
         """
         Forced infinity
         """
-        if debug:
-            print('focus_infinity')
-        return self._cmd_cam("\x18\x02")
+        logger.debug('focus_infinity')
+        return self._cmd_cam(b"\x18\x02")
 
     @property
     def focus_nearlimit(self):
@@ -433,69 +731,50 @@ class Camera(object):
         """
         Can be set in a range from 1000 (∞) to F000 (10 mm)
         """
-        if debug:
-            print('focus_nearlimit', value)
-        subcmd = "\x28" + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('focus_nearlimit %s', value)
+        return self._cmd_value('focus_nearlimit', value)
 
     def focus_auto_sensitivity(self, state):
         """
         AF Sensitivity High/Low
         'normal or low'
         """
-        if debug:
-            print('focus_auto_sensitivity', state)
-        if state == 'normal':
-            return self._cmd_cam("\x58\x02")
-        elif state == 'low':
-            return self._cmd_cam("\x58\x03")
+        logger.debug('focus_auto_sensitivity %s', state)
+        return self._cmd_setting('focus_auto_sensitivity', state)
 
     def focus_auto_mode(self, state):
         """
         AF Movement Mode
             :state = normal / interval / zoom trigger / active-interval
         """
-        if debug:
-            print('focus_movement_mode', state)
-        if state == 'normal':
-            subcmd = "\x57\x00"
-        elif state == 'interval':
-            subcmd = "\x57\x01"
-        elif state == 'zoom_trigger':
-            subcmd = "\x57\x02"
-        if 'subcmd' in locals():
-        	return self._cmd_cam(subcmd)
-        else:
-        	return False
+        logger.debug('focus_movement_mode %s', state)
+        return self._cmd_setting('focus_auto_mode', state)
 
     def focus_auto_active(self, value):
         """
         pq: Movement Time, rs: Interval
         """
-        if debug:
-            print('focus_auto_active', value)
-            print('this function has never been tested')
-        subcmd = "\x27" + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('focus_auto_active %s', value)
+        logger.debug('this function has never been tested')
+        return self._cmd_value('focus_auto_active', value)
 
     def focus_ir(self, state):
         """
         FOCUS IR compensation data switching
         0/1
         """
-        if debug:
-            print('IR', state)
+        logger.debug('IR %s', state)
         if state:
-            subcmd = "\x11" + "\x00"
+            subcmd = b"\x11" + b"\x00"
         else:
-            subcmd = "\x11" + "\x01"
+            subcmd = b"\x11" + b"\x01"
         return self._cmd_cam(subcmd)
 
     def zoom_focus(self, zoom, focus):
         """
         Zoom & Focus in the same command
         """
-        print('Needs to be done')
+        logger.warning('zoom_focus needs to be done')
 
     # ----------------------------------------------------
     # ---------------- WHITE BALANCE ---------------------
@@ -505,27 +784,11 @@ class Camera(object):
         return self._query('WB')
     @WB.setter
     def WB(self, mode):
-        if debug:
-            print('WB', mode)
-        if mode == 'auto':
-            subcmd = '\x00'
-        elif mode == 'indoor':
-            subcmd = '\x01'
-        elif mode == 'outdoor':
-            subcmd = '\x02'
-        elif mode == 'trigger':
-            subcmd = '\x03'
-        elif mode == 'manual':
-            subcmd = '\x05'
-        if 'subcmd' in locals():
-        	prefix = '\x35'
-        	subcmd = prefix + subcmd
-        	return self._cmd_cam(subcmd)
-        else:
-        	return False
+        logger.debug('WB %s', mode)
+        return self._cmd_setting('WB', mode)
 
     def WB_trigger(self):
-        return self._cmd_cam('\x10\x05')
+        return self._cmd_cam(b'\x10\x05')
 
     @property
     def RGain(self):
@@ -536,16 +799,14 @@ class Camera(object):
         Manual Control of R Gain
             :0..255 set the red gain
         """
-        if debug:
-            print('RGain', value)
-        subcmd = "\x43" + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('RGain %s', value)
+        return self._cmd_value('RGain', value)
 
     def RGain_reset(self):
         """
         Reset the Red Gain
         """
-        return self._cmd_cam('\x03\x00')
+        return self._cmd_cam(b'\x03\x00')
 
     @property
     def BGain(self):
@@ -556,16 +817,14 @@ class Camera(object):
         Manual Control of B Gain
             :0..255 set the blue gain
         """
-        if debug:
-            print('BGain', value)
-        subcmd = "\x44" + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('BGain %s', value)
+        return self._cmd_value('BGain', value)
 
     def BGain_reset(self):
         """
         Reset the Blue Gain
         """
-        return self._cmd_cam('\x04\x00')
+        return self._cmd_cam(b'\x04\x00')
 
     # ----------------------------------------------------
     # ----------------------  EXPOSURE -------------------
@@ -584,22 +843,8 @@ class Camera(object):
         return self._query('AE')
     @AE.setter
     def AE(self, mode):
-        if debug:
-            print('AE', mode)
-        if mode == 'auto':
-            subcmd = "\x39\x00"
-        elif mode == 'shutter':
-            subcmd = "\x39\x0A"
-        elif mode == 'manual':
-            subcmd = "\x39\x03"
-        elif mode == 'iris':
-            subcmd = "\x39\x0B"
-        elif mode == 'bright':
-            subcmd = "\x39\x0D"
-        if 'subcmd' in locals():
-        	return self._cmd_cam(subcmd)
-        else:
-        	return False
+        logger.debug('AE %s', mode)
+        return self._cmd_setting('AE', mode)
 
     @property
     def slowshutter(self):
@@ -609,13 +854,8 @@ class Camera(object):
         return self._query('slowshutter')
     @slowshutter.setter
     def slowshutter(self, state):
-        if debug:
-            print('slowshutter', state)
-        if state:
-            subcmd = "\x5A\x02"
-        else:
-            subcmd = "\x5A\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('slowshutter %s', state)
+        return self._cmd_setting('slowshutter', state)
 
     @property
     def shutter(self):
@@ -625,10 +865,8 @@ class Camera(object):
         """
         Set shutter speed
         """
-        if debug:
-            print('shutter', value)
-        subcmd = '\x4A' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('shutter %s', value)
+        return self._cmd_setting('shutter', value)
 
     @property
     def iris(self):
@@ -638,10 +876,8 @@ class Camera(object):
         """
         Set iris aperture
         """
-        if debug:
-            print('iris', value)
-        subcmd = '\x4B' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('iris %s', value)
+        return self._cmd_setting('iris', value)
 
     @property
     def gain(self):
@@ -651,19 +887,16 @@ class Camera(object):
         return self._query('gain')
     @gain.setter
     def gain(self, value):
-        if debug:
-            print('gain', value)
-        subcmd = '\x4C' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('gain %s', value)
+        return self._cmd_setting('gain', value)
 
-    def gain_limit(self, value):
+    def gain_limit(self, value, raw=False):
         """
-        AE Gain Limit (4-F)
+        AE Gain Limit, in dB (6-28)
+            :raw is True if value is the code (4-F)
         """
-        if debug:
-            print('gain_limit', value)
-        subcmd = '\x2C' + value
-        return self._cmd_cam(subcmd)
+        logger.debug('gain_limit %s', value)
+        return self._cmd_setting('gain_limit', value, raw)
 
     @property
     def bright(self):
@@ -673,10 +906,8 @@ class Camera(object):
         return self._query('bright')
     @bright.setter
     def bright(self, value):
-        if debug:
-            print('bright', value)
-        subcmd = '\x4D\x00\x00' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('bright %s', value)
+        return self._cmd_value('bright', value)
 
     @property
     def expo_compensation(self):
@@ -686,39 +917,28 @@ class Camera(object):
         return self._query('expo_compensation')
     @expo_compensation.setter
     def expo_compensation(self, state):
-        if debug:
-            print('expo_compensation', state)
-        if state:
-            subcmd = "\x3E\x02"
-        else:
-            subcmd = "\x3E\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('expo_compensation %s', state)
+        return self._cmd_setting('expo_compensation', state)
 
     @property
     def expo_compensation_amount(self):
         """
-        exposure compensation amount
+        exposure compensation amount, in dB (-10.5..10.5 by 1.5)
+        send_value('expo_compensation_amount', code) sends a raw code (0-E)
         """
         return self._query('expo_compensation_amount')
     @expo_compensation_amount.setter
     def expo_compensation_amount(self, value):
-        if debug:
-            print('expo_compensation_amount', value)
-        subcmd = '\x4E\x00\x00' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('expo_compensation_amount %s', value)
+        return self._cmd_setting('expo_compensation_amount', value)
 
     @property
     def backlight(self):
         return self._query('backlight')
     @backlight.setter
     def backlight(self, state):
-        if debug:
-            print('backlight', state)
-        if state:
-            subcmd = "\x33\x02"
-        else:
-            subcmd = "\x33\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('backlight %s', state)
+        return self._cmd_setting('backlight', state)
 
     @property
     def WD(self):
@@ -728,13 +948,8 @@ class Camera(object):
         return self._query('WD')
     @WD.setter
     def WD(self, state):
-        if debug:
-            print('WD', state)
-        if state:
-            subcmd = "\x3D\x02"
-        else:
-            subcmd = "\x3D\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('WD %s', state)
+        return self._cmd_setting('WD', state)
 
     # todo : implement WD params
 
@@ -748,10 +963,8 @@ class Camera(object):
         return self._query('aperture')
     @aperture.setter
     def aperture(self, value):
-        if debug:
-            print('aperture', value)
-        subcmd = '\x42' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('aperture %s', value)
+        return self._cmd_value('aperture', value)
 
     @property
     def HR(self):
@@ -764,13 +977,8 @@ class Camera(object):
         return self._query('HR')
     @HR.setter
     def HR(self, state):
-        if debug:
-            print('HR', state)
-        if state:
-            subcmd = "\x52\x02"
-        else:
-            subcmd = "\x52\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('HR %s', state)
+        return self._cmd_setting('HR', state)
 
     @property
     def NR(self):
@@ -782,9 +990,8 @@ class Camera(object):
         return self._query('NR')
     @NR.setter
     def NR(self, value):
-        if debug:
-            print('NR', value)
-        subcmd = "\x53" + chr(value)
+        logger.debug('NR %s', value)
+        subcmd = b"\x53" + i2b(value)
         return self._cmd_cam(subcmd)
 
     @property
@@ -803,10 +1010,8 @@ class Camera(object):
         return self._query('gamma')
     @gamma.setter
     def gamma(self, value):
-        if debug:
-            print('gamma', value)
-        subcmd = '\x5B' + chr(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('gamma %s', value)
+        return self._cmd_setting('gamma', value)
 
     @property
     def high_sensitivity(self):
@@ -816,13 +1021,8 @@ class Camera(object):
         return self._query('high_sensitivity')
     @high_sensitivity.setter
     def high_sensitivity(self, state):
-        if debug:
-            print('high_sensitivity', state)
-        if state:
-            subcmd = "\x5E\x02"
-        else:
-            subcmd = "\x5E\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('high_sensitivity %s', state)
+        return self._cmd_setting('high_sensitivity', state)
 
     @property
     def FX(self):
@@ -833,18 +1033,8 @@ class Camera(object):
         return self._query('FX')
     @FX.setter
     def FX(self, mode):
-        if debug:
-            print('FX', mode)
-        if mode == 'Normal':
-            subcmd = "\x63" + "\x00"
-        if mode == 'NegArt':
-            subcmd = "\x63" + "\x02"
-        if mode == 'B&W':
-            subcmd = "\x63" + "\x04"
-        if 'subcmd' in locals():
-        	return self._cmd_cam(subcmd)
-        else:
-        	return False
+        logger.debug('FX %s', mode)
+        return self._cmd_setting('FX', mode)
 
     @property
     def IR(self):
@@ -854,13 +1044,8 @@ class Camera(object):
         return self._query('IR')
     @IR.setter
     def IR(self, state):
-        if debug:
-            print('IR', state)
-        if state:
-            subcmd = "\x01" + "\x02"
-        else:
-            subcmd = "\x01" + "\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('IR %s', state)
+        return self._cmd_setting('IR', state)
 
     @property
     def IR_auto(self):
@@ -870,13 +1055,8 @@ class Camera(object):
         return self._query('IR_auto')
     @IR_auto.setter
     def IR_auto(self, state):
-        if debug:
-            print('IR_auto', state)
-        if state:
-            subcmd = "\x51" + "\x02"
-        else:
-            subcmd = "\x51" + "\x03"
-        return self._cmd_cam(subcmd)
+        logger.debug('IR_auto %s', state)
+        return self._cmd_setting('IR_auto', state)
 
     @property
     def IR_auto_threshold(self):
@@ -887,23 +1067,19 @@ class Camera(object):
         return self._query('IR_auto_threshold')
     @IR_auto_threshold.setter
     def IR_auto_threshold(self, level):
-        if debug:
-            print('IR_auto_threshold', level)
-        subcmd = '\x21\x00\x00' + i2v(value)
-        return self._cmd_cam(subcmd)
+        logger.debug('IR_auto_threshold %s', level)
+        return self._cmd_value('IR_auto_threshold', level)
 
     # ----------- MEMORY -------------
     def _memory(self, func, num):
-        if debug:
-            print('memory', func, num)
+        logger.debug('memory %s %s', func, num)
         if num > 5:
             num = 5
         if func < 0 or func > 2:
             return False
-        if debug:
-            print("memory")
+        logger.debug('memory')
         num = int(num)
-        subcmd = "\x3f" + chr(func) + chr(0b0111 & num)
+        subcmd = b"\x3f" + i2b(func) + i2b(0b0111 & num)
         return self._cmd_cam(subcmd)
 
     def memory_reset(self, num):
@@ -928,9 +1104,8 @@ class Camera(object):
         return self._query('chromasuppress')
     @chromasuppress.setter
     def chromasuppress(self, level):
-        if debug:
-            print('chromasuppress', level)
-        subcmd = "\x5F" + chr(level)
+        logger.debug('chromasuppress %s', level)
+        subcmd = b"\x5F" + i2b(level)
         return self._cmd_cam(subcmd)
 
     @property
@@ -941,9 +1116,8 @@ class Camera(object):
         return self._query('color_gain')
     @color_gain.setter
     def color_gain(self, value):
-        if debug:
-            print('color_gain', value)
-        subcmd = "\x49\x00\x00\x00" + value
+        logger.debug('color_gain %s', value)
+        subcmd = b"\x49\x00\x00\x00" + i2b(value)
         return self._cmd_cam(subcmd)
 
 
@@ -955,9 +1129,8 @@ class Camera(object):
         return self._query('color_hue')
     @color_hue.setter
     def color_hue(self, value):
-        if debug:
-            print('color_hue', value)
-        subcmd = "\x4F\x00\x00\x00" + value
+        logger.debug('color_hue %s', value)
+        subcmd = b"\x4F\x00\x00\x00" + i2b(value)
         return self._cmd_cam(subcmd)
 
     # ----------------------------------------------------
@@ -967,9 +1140,8 @@ class Camera(object):
         """
         Turns off the menu screen
         """
-        if debug:
-            print('menu_off')
-        subcmd = '\x06' + '\x03'
+        logger.debug('menu_off')
+        subcmd = b'\x06' + b'\x03'
         return self._cmd_cam_alt(subcmd)
 
     @property
@@ -979,36 +1151,13 @@ class Camera(object):
         720:50
         """
         return self._query('video_next')
-        print('need reboot')
     @video.setter
     def video(self, resfreq):
-        if debug:
-            print('video', resfreq)
-        if resfreq == '1080PsF29.97':
-            subcmd = "\x35" + "\x00" + "\x00"
-        elif resfreq == '1080p29.97':
-            subcmd = "\x35" + "\x00" + "\x01"
-        elif resfreq == '720p59.94':
-            subcmd = "\x35" + "\x00" + "\x02"
-        elif resfreq == '720p29.97':
-            subcmd = "\x35" + "\x00" + "\x03"
-        elif resfreq == 'NTSC':
-            subcmd = "\x35" + "\x00" + "\x04"
-        elif resfreq == '1080PsF25':
-            subcmd = "\x35" + "\x00" + "\x08"
-        elif resfreq == '720p50':
-            subcmd = "\x35" + "\x00" + "\x09"
-        elif resfreq == '720p25':
-            subcmd = "\x35" + "\x00" + "\x0A"
-        elif resfreq == '1080i50':
-            subcmd = "\x35" + "\x00" + "\x0B"
-        elif resfreq == 'PAL':
-            subcmd = "\x35" + "\x00" + "\x0C"
-        if 'subcmd' in locals():
-            print('need reboot')
-            return self._cmd_cam_alt(subcmd)
-        else:
-            return False
+        logger.debug('video %s', resfreq)
+        result = self._cmd_setting('video', resfreq)
+        if result:
+            logger.info('video %s needs a reboot', resfreq)
+        return result
 
     @property
     def IR_receive(self):
@@ -1018,14 +1167,8 @@ class Camera(object):
         return self._query('IR_receive')
     @IR_receive.setter
     def IR_receive(self, state):
-        if debug:
-            print('IR_receive', state)
-        if state:
-            subcmd = "\x02"
-        else:
-            subcmd = "\x03"
-            prefix = '\x01\x06\x08'
-        return self._cmd_cam(subcmd, prefix)
+        logger.debug('IR_receive %s', state)
+        return self._cmd_setting('IR_receive', state)
 
     # ----------- INFO DISPLAY-------------
     @property
@@ -1037,14 +1180,8 @@ class Camera(object):
         return self._query('info_display')
     @info_display.setter
     def info_display(self, state):
-        if debug:
-            print('info_display', state)
-        if state:
-            subcmd = '\x02'
-        else:
-            subcmd = '\x03'
-        prefix = '\x01\x7E\x01\x18'
-        return self._cmd_cam(subcmd, prefix)
+        logger.debug('info_display %s', state)
+        return self._cmd_setting('info_display', state)
 
     # ----------------------------------------------------
     # ----------------------  PAN TILT -------------------
@@ -1056,7 +1193,7 @@ class Camera(object):
         """
         simple shortcut to send _cmd_cam with pan_tilt_speed
         """
-        subcmd = '\x01'+chr(self.pan_speed)+chr(self.tilt_speed)+chr(lr)+chr(ud)
+        subcmd = b'\x01'+i2b(self.pan_speed)+i2b(self.tilt_speed)+i2b(lr)+i2b(ud)
         return self._cmd_cam_alt(subcmd)
 
     @property
@@ -1073,49 +1210,61 @@ class Camera(object):
     def tilt_speed(self, speed):
         self._tilt_speed = speed
 
+    def drive(self, pan, tilt):
+        """
+        Drive pan/tilt from a joystick, without blocking
+        Only the latest vector is sent (see pyviscam.drive)
+            :pan -24..24, negative is left, positive is right, 0 is stop
+            :tilt -20..20, negative is down, positive is up, 0 is stop
+        """
+        with self._mutex:
+            if self._drive is None:
+                self._drive = DriveChannel(self)
+        self._drive.post(pan, tilt)
+
+    def close(self):
+        """
+        Stop the drive channel, v_cams closes its cameras
+        """
+        with self._mutex:
+            drive, self._drive = self._drive, None
+        if drive is not None:
+            drive.close()
+
     def up(self):
-        if debug:
-            print('up')
+        logger.debug('up')
         return self._cmd_ptd(0x03, 0x01)
 
     def down(self):
-        if debug:
-            print('down')
+        logger.debug('down')
         return self._cmd_ptd(0x03, 0x02)
 
     def left(self):
-        if debug:
-            print('left')
+        logger.debug('left')
         return self._cmd_ptd(0x01, 0x03)
 
     def right(self):
-        if debug:
-            print('right')
+        logger.debug('right')
         return self._cmd_ptd(0x02, 0x03)
 
     def upleft(self):
-        if debug:
-            print('upleft')
+        logger.debug('upleft')
         return self._cmd_ptd(0x01, 0x01)
 
     def upright(self):
-        if debug:
-            print('upright')
+        logger.debug('upright')
         return self._cmd_ptd(0x02, 0x01)
 
     def downleft(self):
-        if debug:
-            print('downleft')
+        logger.debug('downleft')
         return self._cmd_ptd(0x01, 0x02)
 
     def downright(self):
-        if debug:
-            print('downright')
+        logger.debug('downright')
         return self._cmd_ptd(0x02, 0x02)
 
     def stop(self):
-        if debug:
-            print('stop')
+        logger.debug('stop')
         return self._cmd_ptd(0x03, 0x03)
 
     @property
@@ -1127,14 +1276,11 @@ class Camera(object):
         return self._query('pan_tilt')[0]
     @pan.setter
     def pan(self, pan):
-        if debug:
-            print('pan', pan)
-        pan = degree_to_visca(pan, 'pan')
-        pan = i2v(pan)
-        tilt = degree_to_visca(self.tilt, 'tilt')
-        tilt = i2v(tilt)
-        subcmd = '\x02' + chr(self.pan_speed) + chr(self.tilt_speed) + pan + tilt
-        self._cmd_cam_alt(subcmd)
+        """
+        the tilt is queried first, use move_to() to set both axes
+        """
+        logger.debug('pan %s', pan)
+        self.move_to(pan, self.tilt)
 
     @property
     def tilt(self):
@@ -1147,23 +1293,49 @@ class Camera(object):
         return self._query('pan_tilt')[1]
     @tilt.setter
     def tilt(self, tilt):
-        if debug:
-            print('tilt', tilt)
-        pan = degree_to_visca(self.pan, 'pan')
-        pan = i2v(pan)
-        tilt = degree_to_visca(tilt, 'tilt')
-        tilt = i2v(tilt)
-        subcmd = '\x02' + chr(self.pan_speed) + chr(self.tilt_speed) + pan + tilt
-        self._cmd_cam_alt(subcmd)
+        """
+        the pan is queried first, use move_to() to set both axes
+        """
+        logger.debug('tilt %s', tilt)
+        self.move_to(self.pan, tilt)
+
+    def move_to(self, pan, tilt, pan_speed=None, tilt_speed=None):
+        """
+        Move to an absolute position, in a single command
+            :pan, tilt in degrees
+            :pan_speed 1..24, tilt_speed 1..20, default to pan_speed / tilt_speed
+        """
+        logger.debug('move_to %s %s', pan, tilt)
+        if not self._in_range('pan', pan) or not self._in_range('tilt', tilt):
+            logger.error('ERROR 45 - pan_tilt cannot be set to %s, %s', pan, tilt)
+            return False
+        return self._pan_tilt('pan_tilt', degree_to_visca(pan, 'pan'), degree_to_visca(tilt, 'tilt'),
+                              pan_speed, tilt_speed)
+
+    def move_by(self, pan, tilt, pan_speed=None, tilt_speed=None):
+        """
+        Move from the current position, in a single command
+            :pan, tilt in degrees, negative is left / down
+            :pan_speed 1..24, tilt_speed 1..20, default to pan_speed / tilt_speed
+        """
+        logger.debug('move_by %s %s', pan, tilt)
+        # the same counts per degree on both sides, as 16 bits two's complement
+        return self._pan_tilt('pan_tilt_relative', delta_to_visca(pan, 'pan'),
+                              delta_to_visca(tilt, 'tilt'), pan_speed, tilt_speed)
+
+    def _pan_tilt(self, name, pan, tilt, pan_speed, tilt_speed):
+        if pan_speed is None:
+            pan_speed = self.pan_speed
+        if tilt_speed is None:
+            tilt_speed = self.tilt_speed
+        return self._cmd_value(name, pan_speed, tilt_speed, pan, tilt)
 
     def home(self):
-        if debug:
-            print('home')
-        subcmd = '\x04'
+        logger.debug('home')
+        subcmd = b'\x04'
         return self._cmd_cam_alt(subcmd)
 
     def reset(self):
-        if debug:
-            print('reset')
-        subcmd = '\x05'
+        logger.debug('reset')
+        subcmd = b'\x05'
         return self._cmd_cam_alt(subcmd)
@@ -0,0 +1,165 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Codec module contains the Decoder and Encoder Classes
+A Decoder translates the replies to the queries into real life values,
+an Encoder translates real life values into the commands of the setters.
+
+Their tables are compiled once from the constants (answers, high_res_params,
+very_high_res_params, settings) : decoding a reply is a dict lookup, a read
+of the nibbles straight from the reply bytes and a dict lookup of the answer,
+encoding a value is a lookup in the inverse of the answers.
+Real life values and raw codes are kept apart : some parameters have numbers
+as values (gain_limit 6 is the code 4), raw codes need raw=True.
+
+decoder.decode('WB', b'\\x90\\x50\\x00\\xff')     # 'auto'
+decoder.decode('zoom', b'\\x90\\x50\\x01\\x02\\x03\\x04\\xff')     # 0x1234
+encoder.message('WB', 'auto')     # b'\\x01\\x04\\x35\\x00'
+encoder.code('gain_limit', 6)     # 4
+encoder.code('gain_limit', 6, raw=True)     # 6
+"""
+
+from pyviscam.constants import queries, answers, high_res_params, very_high_res_params, settings
+from pyviscam.convert import scale, to_bytes
+from pyviscam.pan_tilt_utils import visca_to_degree
+
+
+def read_nibbles(data):
+    """
+    Return the value written a nibble per byte (0p 0q 0r 0s), msb first
+    """
+    value = 0
+    for byte in data:
+        value = (value << 4) | (byte & 0x0f)
+    return value
+
+
+def read_code(data):
+    """
+    Return the code of a single byte reply
+    Longer replies are given as a list of hexadecimal strings
+    """
+    if len(data) == 1:
+        return data[0]
+    return ['%02x' % byte for byte in data]
+
+
+def read_pan_tilt(data):
+    """
+    Return [pan, tilt] in degrees
+    """
+    return [visca_to_degree(read_nibbles(data[0:4]), 'pan'),
+            visca_to_degree(read_nibbles(data[4:8]), 'tilt')]
+
+
+def read_color_gain(data):
+    return str(scale(data[3] & 0x0f, 0, 14, 60, 200)) + '%'
+
+
+def read_color_hue(data):
+    return str(scale(data[3] & 0x0f, 0, 14, 60, 200)) + '°'
+
+
+class Decoder(object):
+    """
+    Translate the replies to the queries
+        :answers gives the real life value of the codes of a parameter
+        :high_res_params and very_high_res_params are coded on 4 nibbles
+    """
+    def __init__(self, answers=answers, high_res_params=high_res_params,
+                 very_high_res_params=very_high_res_params, params=queries):
+        super(Decoder, self).__init__()
+        self.answers = answers
+        # parameter -> (read the code, size of the reply data, answers)
+        self._table = {}
+        for name in params:
+            if name in high_res_params or name in very_high_res_params:
+                entry = (read_nibbles, 4)
+            else:
+                entry = (read_code, None)
+            self._table[name] = entry + (answers.get(name),)
+        self._table['pan_tilt'] = (read_pan_tilt, 8, None)
+        self._table['color_gain'] = (read_color_gain, 4, None)
+        self._table['color_hue'] = (read_color_hue, 4, None)
+        self._default = (read_code, None, None)
+
+    def decode(self, function, reply):
+        """
+        Return the value of a parameter from the reply to its query
+            :reply is the whole packet (y0 50 ... FF)
+            :Raise ValueError if the reply has not the size of the answer
+        """
+        read, size, codes = self._table.get(function, self._default)
+        data = bytearray(reply[2:-1])
+        if size is not None and len(data) != size:
+            raise ValueError('%s reply has %i bytes, expecting %i' % (function, len(data), size))
+        value = read(data)
+        if codes is not None:
+            return codes.get(value, value)
+        return value
+
+    def value(self, function, code):
+        """
+        Return the real life value of the code of a parameter
+        """
+        codes = self.answers.get(function)
+        if codes is not None:
+            return codes.get(code, code)
+        return code
+
+decoder = Decoder()
+
+
+class Encoder(object):
+    """
+    Translate real life values into the codes of the setters,
+    the inverse of the answers of the Decoder
+        :settings gives the command setting each enumerated parameter
+    """
+    def __init__(self, answers=answers, settings=settings):
+        super(Encoder, self).__init__()
+        # parameter -> value -> code
+        self._codes = {}
+        # parameter -> code -> code, the raw codes
+        self._raw = {}
+        # parameter -> command prefix
+        self._prefixes = {}
+        # on/off parameters, they take any truth value
+        self._switches = set()
+        for name, codes in answers.items():
+            self._codes[name] = dict((value, code) for code, value in codes.items())
+            self._raw[name] = dict((code, code) for code in codes)
+            if set(codes.values()) == set([True, False]):
+                self._switches.add(name)
+            if name in settings:
+                self._prefixes[name] = to_bytes(settings[name])
+
+    def code(self, function, value, raw=False):
+        """
+        Return the code of a value, None if the parameter has no such value
+            :raw is True if value is already a code of the parameter
+        """
+        if raw:
+            return self._raw.get(function, {}).get(value)
+        table = self._codes.get(function)
+        if table is None:
+            return None
+        if function in self._switches:
+            value = bool(value)
+        return table.get(value)
+
+    def message(self, function, value, raw=False):
+        """
+        Return the command setting a parameter, None if the parameter has no such value
+            :raw is True if value is already a code of the parameter
+        """
+        prefix = self._prefixes.get(function)
+        if prefix is None:
+            return None
+        code = self.code(function, value, raw)
+        if code is None:
+            return None
+        return prefix + bytes(bytearray([code]))
+
+encoder = Encoder()
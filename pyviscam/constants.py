@@ -3,8 +3,8 @@
 
 """
 This file contains the constants value for camera
-For now, these are EVI H 100, but we need a better system
-to choose the model of camera, and the constants and features only for this one
+These are EVI H 100, the other models tell what they support
+and how they differ in their profiles (see pyviscam.profile)
 """
 
 queries = {'power':"\x04\x00", 'zoom':"\x04\x47", 'zoom_digital':"\x04\x06",'focus_auto':"\x04\x38", 'focus':"\x04\x48", \
@@ -38,4 +38,51 @@ answers = {'focus_auto':{2:True,3:False}, 'zoom_digital':{2:True,3:False}, 'WD':
 
 high_res_params = ['shutter', 'iris', 'gain', 'gain_limit', 'RGain', 'BGain', 'bright', 'expo_compensation_amount', 'aperture', 'IR_auto_threshold']
 
-very_high_res_params = ['zoom', 'focus', 'focus_nearlimit', 'focus_auto_interval', 'ID']
\ No newline at end of file
+very_high_res_params = ['zoom', 'focus', 'focus_nearlimit', 'focus_auto_interval', 'ID']
+
+# commands changing other parameters than the one they set
+# first bytes of the command -> parameters changed, None for every parameter
+invalidations = {b'\x01\x04\x00':None, b'\x01\x04\x3F':None, b'\x01\x04\x19':['zoom', 'focus'], \
+                 b'\x01\x04\x07':['zoom'], b'\x01\x04\x08':['focus'], b'\x01\x04\x18':['focus', 'focus_auto'], \
+                 b'\x01\x04\x10':['RGain', 'BGain'], b'\x01\x04\x03':['RGain'], b'\x01\x04\x04':['BGain'], \
+                 b'\x01\x06\x01':['pan_tilt'], b'\x01\x06\x02':['pan_tilt'], b'\x01\x06\x03':['pan_tilt'], \
+                 b'\x01\x06\x04':['pan_tilt'], b'\x01\x06\x05':['pan_tilt'], b'\x01\x06\x35':['video_next']}
+
+# block inquiries answer many parameters in one reply (y0 50 + 13 bytes + FF)
+block_queries = {'lens':"\x7E\x7E\x00", 'camera':"\x7E\x7E\x01"}
+
+# parameter, offset in the reply data, number of bytes, nibbles shifted
+# one byte is read as a whole, many bytes are read as a nibble each
+block_values = {'lens':[('zoom', 0, 4, 0), ('focus_nearlimit', 4, 2, 2), ('focus', 6, 4, 0)], \
+                'camera':[('RGain', 0, 2, 0), ('BGain', 2, 2, 0), ('WB', 4, 1, 0), ('aperture', 5, 1, 0), \
+                          ('AE', 6, 1, 0), ('shutter', 8, 1, 0), ('iris', 9, 1, 0), ('gain', 10, 1, 0), \
+                          ('bright', 11, 1, 0), ('expo_compensation_amount', 12, 1, 0)]}
+
+# parameter, offset in the reply data, bit mask, codes of the single inquiry (None keeps the bits)
+block_flags = {'lens':[('focus_auto', 11, 0x01, {1:2, 0:3}), ('zoom_digital', 11, 0x02, {1:2, 0:3}), \
+                       ('focus_auto_sensitivity', 11, 0x04, {0:2, 1:3}), ('focus_auto_mode', 11, 0x18, None)], \
+               'camera':[('slowshutter', 7, 0x01, {1:2, 0:3}), ('expo_compensation', 7, 0x02, {1:2, 0:3}), \
+                         ('backlight', 7, 0x04, {1:2, 0:3})]}
+
+# commands setting an enumerated parameter, followed by a code of answers
+settings = {'power':"\x01\x04\x00", 'zoom_digital':"\x01\x04\x06", 'focus_auto':"\x01\x04\x38", \
+            'focus_auto_sensitivity':"\x01\x04\x58", 'focus_auto_mode':"\x01\x04\x57", 'WB':"\x01\x04\x35", \
+            'AE':"\x01\x04\x39", 'slowshutter':"\x01\x04\x5A", 'expo_compensation':"\x01\x04\x3E", \
+            'backlight':"\x01\x04\x33", 'WD':"\x01\x04\x3D", 'HR':"\x01\x04\x52", 'high_sensitivity':"\x01\x04\x5E", \
+            'FX':"\x01\x04\x63", 'IR':"\x01\x04\x01", 'IR_auto':"\x01\x04\x51", 'gamma':"\x01\x04\x5B", \
+            'IR_receive':"\x01\x06\x08", 'info_display':"\x01\x7E\x01\x18", 'video':"\x01\x06\x35\x00", 'gain_limit':"\x01\x04\x2C"}
+
+# commands without parameter
+fixed_commands = ["\x01\x04\x07\x00", "\x01\x04\x07\x02", "\x01\x04\x07\x03", \
+                  "\x01\x04\x08\x00", "\x01\x04\x08\x02", "\x01\x04\x08\x03", \
+                  "\x01\x04\x18\x01", "\x01\x04\x18\x02", "\x01\x04\x11\x00", "\x01\x04\x11\x01", \
+                  "\x01\x04\x10\x05", "\x01\x04\x03\x00", "\x01\x04\x04\x00", \
+                  "\x01\x06\x06\x03", "\x01\x06\x04", "\x01\x06\x05"]
+
+# commands setting a value, written on 4 nibbles after these bytes
+value_commands = {'power_auto':"\x01\x04\x40", 'zoom':"\x01\x04\x47", 'focus':"\x01\x04\x48", \
+                  'focus_nearlimit':"\x01\x04\x28", 'focus_auto_active':"\x01\x04\x27", \
+                  'RGain':"\x01\x04\x43", 'BGain':"\x01\x04\x44", 'shutter':"\x01\x04\x4A", \
+                  'iris':"\x01\x04\x4B", 'gain':"\x01\x04\x4C", 'bright':"\x01\x04\x4D\x00\x00", \
+                  'expo_compensation_amount':"\x01\x04\x4E\x00\x00", 'aperture':"\x01\x04\x42", \
+                  'IR_auto_threshold':"\x01\x04\x21\x00\x00"}
@@ -1,6 +1,10 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import logging
+
+logger = logging.getLogger(__name__)
+
 def hex_to_int(value):
     if len(value) == 4:
         a=int(value[3],16)
@@ -15,8 +19,7 @@ def hex_to_int(value):
         d=int(value[1],16)
         value = ((((((16*d)+c)*16)+b)*16)+a)
     else:
-        print('error length is :', len(value))
-        print("don't understand this reply - this have to be implemented")
+        logger.error("don't understand this reply of length %i - this have to be implemented", len(value))
     return value
 
 def i2v(value):
@@ -26,7 +29,7 @@ def i2v(value):
     so for numbers the first nibble is 0000
     and 0xfd gets encoded into 0x0f 0x0xd
     """
-    if type(value) == unicode:
+    if not isinstance(value, int):
         value = int(value)
     ms = (value &  0b1111111100000000) >> 8
     ls = (value &  0b0000000011111111)
@@ -34,7 +37,22 @@ def i2v(value):
     r = (ls&0b11110000)>>4
     q = ms&0b1111
     s = ls&0b1111
-    return chr(p)+chr(q)+chr(r)+chr(s)
+    return bytes(bytearray([p, q, r, s]))
+
+def i2b(value):
+    """
+    return a byte (0..255) as a one byte packet
+    """
+    return bytes(bytearray([value]))
+
+def to_bytes(packet):
+    """
+    return a packet as bytes, ready to be written on the wire
+    text packets are encoded byte per character
+    """
+    if isinstance(packet, bytes):
+        return packet
+    return packet.encode('latin-1')
 
 def scale(value, old_min, old_max, new_min, new_max):
     return (float(((value - old_min) * (new_max - new_min))) / (old_max - old_min)) + new_min
\ No newline at end of file
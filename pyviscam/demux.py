@@ -0,0 +1,383 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Demux module routes the replies received on a transport
+to the requests waiting for them.
+
+The header of a reply tells which camera sends it (high nibble - 8),
+acks, completions and errors tell which socket they are about
+(low nibble of 0x4y / 0x5y / 0x6y).
+
+A camera answers its packets in the order it receives them, so the first
+reply of a camera goes to the oldest request that has not been acked yet.
+Completions go to the request that has been acked on the same socket.
+The late reply of a request given up after it has been written is dropped,
+it must not go to the next request of the camera.
+
+Router only matches replies and resolves futures. Dispatcher adds a reader
+thread that owns the transport, pyviscam.aio does the same from the event loop.
+
+Every request has a deadline, counted from the time it is written, given by
+its kind (see TIMEOUTS) : the waits raise AckTimeout or CompletionTimeout
+(see pyviscam.exceptions) once it is over.
+"""
+
+import logging
+import threading
+from binascii import hexlify
+from collections import deque
+from concurrent.futures import Future, TimeoutError, CancelledError
+
+from pyviscam.cache import monotonic
+from pyviscam.exceptions import AckTimeout, CompletionTimeout
+
+logger = logging.getLogger(__name__)
+
+BROADCAST = -1
+
+# seconds to wait for the replies of a request, from the time it is written
+#   - ack : the ack (or the error) of a command
+#   - inquiry : the answer of an inquiry
+#   - broadcast : the reply of a broadcast, through the whole chain
+#   - command : the completion of a command
+#   - long : the completion of a move, a preset recall or a power on
+#   - queue : the turn of a request in a Scheduler, before it is written
+TIMEOUTS = {'ack': 0.5, 'inquiry': 0.5, 'broadcast': 1, 'command': 5, 'long': 30, 'queue': 30}
+
+# first bytes of the commands that take long to complete
+LONG_COMMANDS = (b'\x01\x06\x02', b'\x01\x06\x03', b'\x01\x06\x04', b'\x01\x06\x05',
+                 b'\x01\x04\x3f\x02', b'\x01\x04\x00\x02')
+
+
+def kind(packet):
+    """
+    Return the kind of a packet : 'broadcast', 'inquiry', 'long' or 'command'
+    """
+    if packet[0:1] == b'\x88':
+        return 'broadcast'
+    elif packet[1:2] == b'\x09':
+        return 'inquiry'
+    elif packet[1:4] in LONG_COMMANDS or packet[1:5] in LONG_COMMANDS:
+        return 'long'
+    return 'command'
+
+
+class Request(object):
+    """
+    A packet sent to a camera, waiting for its replies
+        :ack is resolved with the first reply (ack, inquiry answer or error)
+        :done is resolved with the last reply (completion, inquiry answer or error)
+        :socket is the socket number given by the ack
+        :ack_timeout and timeout are the time it has for its first and last reply (seconds)
+        :queue_timeout is the time it can wait for its turn before it is written (seconds)
+    """
+    def __init__(self, router, packet, ack, done):
+        self.router = router
+        self.packet = packet
+        header = bytearray(packet[0:1])[0]
+        if header == 0x88:
+            self.address = BROADCAST
+        else:
+            self.address = header & 0b111
+        self.kind = kind(packet)
+        self.inquiry = self.kind == 'inquiry'
+        self.timeout = router.timeouts[self.kind]
+        if self.kind in ('command', 'long'):
+            self.ack_timeout = router.timeouts['ack']
+        else:
+            self.ack_timeout = self.timeout
+        self.queue_timeout = router.timeouts['queue']
+        self.socket = None
+        self.ack = ack
+        self.done = done
+        # set once the packet has been written
+        self.sent = threading.Event()
+        # time it has been written (monotonic)
+        self.written = None
+
+    def remaining(self, timeout):
+        """
+        Return the time left before the deadline of a reply (seconds)
+        """
+        if self.written is None:
+            return timeout
+        return max(0, self.written + timeout - monotonic())
+
+    def wait_ack(self, timeout=None):
+        """
+        Block until the first reply (threads only)
+        The deadline starts when the packet is written,
+        a packet may wait for its turn in a Scheduler before
+            :timeout replaces the deadline of the request (seconds from now)
+            :Return None if the request has been forgotten
+            :Raise AckTimeout after the deadline, or if it is not written in time
+        """
+        self._wait_sent()
+        if timeout is None:
+            timeout = self.remaining(self.ack_timeout)
+        return self._result(self.ack, timeout, AckTimeout)
+
+    def wait(self, timeout=None):
+        """
+        Block until the last reply (threads only)
+            :timeout replaces the deadline of the request (seconds from now)
+            :Return None if the request has been forgotten
+            :Raise AckTimeout or CompletionTimeout after the deadline
+        """
+        if timeout is None:
+            self._wait_sent()
+            timeout = self.remaining(self.timeout)
+        # an inquiry or a broadcast has no socket, it is answered at once
+        error = AckTimeout if self.socket is None else CompletionTimeout
+        return self._result(self.done, timeout, error)
+
+    def _wait_sent(self):
+        if not self.sent.wait(self.queue_timeout):
+            # still waiting for its turn
+            self.router.forget(self)
+            raise AckTimeout(self, self.queue_timeout)
+
+    def expired(self, now):
+        """
+        Return the timeout to raise if the deadline of the request is over, None otherwise
+        """
+        if self.written is None:
+            return None
+        if not self.ack.done():
+            if now >= self.written + self.ack_timeout:
+                return AckTimeout(self, self.ack_timeout)
+        elif now >= self.written + self.timeout:
+            return CompletionTimeout(self, self.timeout)
+        return None
+
+    def deadline(self):
+        """
+        Return the time of the next deadline of the request (monotonic)
+        """
+        if self.ack.done():
+            return self.written + self.timeout
+        return self.written + self.ack_timeout
+
+    def _result(self, future, timeout, error):
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            self.router.forget(self)
+            raise error(self, timeout)
+        except CancelledError:
+            return None
+
+
+class Router(object):
+    """
+    Match replies with pending requests
+        :future is the factory of futures (concurrent or asyncio)
+        :timeouts replaces some of the TIMEOUTS of the requests
+    """
+    def __init__(self, future=Future, timeouts=None):
+        self.future = future
+        self.timeouts = dict(TIMEOUTS)
+        self.timeouts.update(timeouts or {})
+        self.mutex = threading.Lock()
+        # address -> requests waiting for their first reply
+        self._unacked = {}
+        # (address, socket) -> request waiting for its completion
+        self._sockets = {}
+        # address -> [late replies to drop, time they are given up (monotonic)]
+        self._late = {}
+
+    def request(self, packet):
+        """
+        Return a new Request for a packet
+        """
+        return Request(self, packet, self.future(), self.future())
+
+    def register(self, request):
+        """
+        Register a request, just before its packet is written
+        """
+        with self.mutex:
+            self._unacked.setdefault(request.address, deque()).append(request)
+        return request
+
+    def forget(self, request, exception=None):
+        """
+        Stop waiting for the replies of a request
+            :exception is given to its waiters, they are cancelled if None
+        """
+        with self.mutex:
+            unacked = self._unacked.get(request.address)
+            if unacked and request in unacked:
+                unacked.remove(request)
+                if request.written is not None:
+                    # the camera may still answer it
+                    late = self._late.setdefault(request.address, [0, 0])
+                    late[0] += 1
+                    late[1] = max(late[1], monotonic() + request.ack_timeout)
+            if self._sockets.get((request.address, request.socket)) is request:
+                del self._sockets[(request.address, request.socket)]
+        # nothing will resolve them now
+        for future in (request.ack, request.done):
+            if exception is None:
+                future.cancel()
+            elif not future.done():
+                future.set_exception(exception)
+
+    def feed(self, frame):
+        """
+        Route a frame received from the transport
+        """
+        if len(frame) < 3 or frame[-1:] != b'\xff':
+            logger.error("ERROR 41 - received packet not terminated correctly: %s", hexlify(frame))
+            return
+        header, kind = bytearray(frame[0:2])
+        if header == 0x88:
+            address = BROADCAST
+        else:
+            address = (header >> 4) & 0b111
+        socket = kind & 0x0f
+        kind = kind & 0xf0
+        ack = done = frame
+        with self.mutex:
+            unacked = self._unacked.get(address)
+            # the replies going to the oldest request waiting for its first reply
+            first = address == BROADCAST or kind == 0x40 or (kind == 0x50 and socket == 0) \
+                    or (kind == 0x60 and (address, socket) not in self._sockets)
+            if first and self._drop_late(address):
+                logger.debug('late reply dropped : %s', hexlify(frame))
+                return
+            if address == BROADCAST or (kind == 0x50 and socket == 0):
+                # broadcast or inquiry answer
+                request = self._pop(unacked)
+            elif kind == 0x40:
+                request = self._pop(unacked)
+                done = None
+                if request:
+                    request.socket = socket
+                    self._sockets[(address, socket)] = request
+            elif kind == 0x50:
+                request = self._sockets.pop((address, socket), None)
+                ack = None
+            elif kind == 0x60:
+                # an error about an executing command, or instead of an ack
+                request = self._sockets.pop((address, socket), None)
+                if request is None:
+                    request = self._pop(unacked)
+            else:
+                request = None
+        if request is None:
+            logger.error("ERROR 43 - no request is waiting for %s", hexlify(frame))
+            return
+        # futures are resolved out of the lock, their callbacks may use the router
+        if ack is not None and not request.ack.done():
+            request.ack.set_result(ack)
+        if done is not None and not request.done.done():
+            request.done.set_result(done)
+
+    def fail(self, exception):
+        """
+        Fail every pending request, when the transport is closed
+        """
+        with self.mutex:
+            requests = list(self._sockets.values())
+            for unacked in self._unacked.values():
+                requests.extend(unacked)
+            self._unacked.clear()
+            self._sockets.clear()
+        for request in requests:
+            for future in (request.ack, request.done):
+                if not future.done():
+                    future.set_exception(exception)
+
+    def late_until(self, address):
+        """
+        Return the time the late replies to a camera are given up (monotonic),
+        None if no late reply is expected
+        """
+        with self.mutex:
+            late = self._late.get(address)
+            if late is None:
+                return None
+            if late[1] <= monotonic():
+                del self._late[address]
+                return None
+            return late[1]
+
+    def _drop_late(self, address):
+        """
+        Return True if a reply is the late reply of a request given up
+        """
+        late = self._late.get(address)
+        if late is None:
+            return False
+        if late[1] <= monotonic():
+            del self._late[address]
+            return False
+        late[0] -= 1
+        if not late[0]:
+            del self._late[address]
+        return True
+
+    def _pop(self, unacked):
+        if unacked:
+            return unacked.popleft()
+        return None
+
+
+class Dispatcher(object):
+    """
+    Owns a transport : a reader thread routes every reply to its request
+        :timeouts replaces some of the TIMEOUTS of the requests
+    """
+    def __init__(self, transport, timeouts=None):
+        super(Dispatcher, self).__init__()
+        self.transport = transport
+        self.router = Router(timeouts=timeouts)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._read, name='pyviscam-reader')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+        self.router.fail(IOError('dispatcher stopped'))
+
+    def submit(self, packet):
+        """
+        Write a packet and return its Request
+        """
+        request = self.router.request(packet)
+        self._write(request)
+        return request
+
+    def _write(self, request):
+        self.transport.mutex.acquire()
+        try:
+            self.router.register(request)
+            request.written = monotonic()
+            if not self.transport.write_packet(request.packet):
+                # never on the wire, no late reply to expect
+                request.written = None
+                self.router.forget(request)
+        finally:
+            self.transport.mutex.release()
+            request.sent.set()
+
+    def _read(self):
+        while self._running:
+            frame = self.transport.recv_packet()
+            if frame is False:
+                # the transport is closed
+                break
+            if frame:
+                self.router.feed(frame)
@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Drive module contains the DriveChannel Class
+A DriveChannel moves a camera from a joystick.
+
+post() can be called as often as the joystick moves, it never blocks.
+A worker thread sends the latest vector posted as soon as the previous drive
+command is over, the vectors posted in between are dropped.
+So the camera stops as soon as the operator releases the stick,
+instead of playing a backlog of old positions.
+
+cam.drive(-10, 0)   # go left
+cam.drive(0, 0)     # stop
+"""
+
+import logging
+import threading
+
+from pyviscam.exceptions import ViscaTimeout
+
+logger = logging.getLogger(__name__)
+
+
+# maximum speeds of the pan/tilt drive command
+PAN_SPEED_MAX = 0x18
+TILT_SPEED_MAX = 0x14
+
+
+def drive_packet(pan, tilt):
+    """
+    Return the pan/tilt drive command for a speed vector
+        :pan -24..24, negative is left, positive is right, 0 is stop
+        :tilt -20..20, negative is down, positive is up, 0 is stop
+    """
+    pan = max(-PAN_SPEED_MAX, min(PAN_SPEED_MAX, int(pan)))
+    tilt = max(-TILT_SPEED_MAX, min(TILT_SPEED_MAX, int(tilt)))
+    if pan > 0:
+        pan_direction = 0x02
+    elif pan < 0:
+        pan_direction = 0x01
+    else:
+        pan_direction = 0x03
+    if tilt > 0:
+        tilt_direction = 0x01
+    elif tilt < 0:
+        tilt_direction = 0x02
+    else:
+        tilt_direction = 0x03
+    return bytes(bytearray([0x01, 0x06, 0x01, max(abs(pan), 1), max(abs(tilt), 1),
+                            pan_direction, tilt_direction]))
+
+
+class DriveChannel(object):
+    """
+    Send the latest pan/tilt speed vector to a camera
+    """
+    def __init__(self, camera):
+        super(DriveChannel, self).__init__()
+        self.camera = camera
+        self._condition = threading.Condition()
+        # latest vector posted, not sent yet
+        self._vector = None
+        self.dropped = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._drive, name='pyviscam-drive')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def post(self, pan, tilt):
+        """
+        Post the wanted speed vector, replacing the one not sent yet
+            :pan -24..24, negative is left, positive is right
+            :tilt -20..20, negative is down, positive is up
+        """
+        with self._condition:
+            if self._vector is not None:
+                self.dropped += 1
+            self._vector = (pan, tilt)
+            self._condition.notify()
+
+    def stop(self):
+        """
+        Stop the pan/tilt movement
+        """
+        self.post(0, 0)
+
+    def close(self):
+        """
+        Stop the worker thread
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _drive(self):
+        while True:
+            with self._condition:
+                while self._vector is None and self._running:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                vector, self._vector = self._vector, None
+            try:
+                self.camera.send_command(drive_packet(*vector)).wait()
+            except IOError:
+                # the bus has been closed
+                logger.debug('drive channel closed')
+                return
+            except ViscaTimeout as error:
+                # the next vector may go through
+                logger.error('%s', error)
@@ -0,0 +1,211 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Estimator module contains the Estimator Class
+An Estimator follows the position of a camera from the commands sent to it
+(dead reckoning), so the position can be read at frame rate without
+polling pan_tilt on the bus.
+
+The estimate drifts while the camera moves : the uncertainty grows with
+the distance travelled. It is set back when an absolute move is completed
+and corrected by every pan_tilt / zoom answer read from the camera.
+
+cam.estimator = Estimator()
+cam.pan_tilt      # an inquiry now and then keeps the estimate honest
+cam.estimated_position    # {'pan': (12.5, 0.3), 'tilt': (0.0, 0.0), 'zoom': (None, None)}
+"""
+
+import threading
+from math import copysign
+
+from pyviscam.cache import monotonic
+from pyviscam.codec import read_nibbles
+from pyviscam.drive import PAN_SPEED_MAX, TILT_SPEED_MAX
+from pyviscam.pan_tilt_utils import visca_to_degree, visca_to_delta
+
+ZOOM_SPEED_MAX = 7
+
+
+class Axis(object):
+    """
+    Position of an axis, moving at a velocity or towards a target
+        :limits are the (min, max) positions
+        :drift is the uncertainty added per unit travelled
+    """
+    def __init__(self, limits, drift):
+        super(Axis, self).__init__()
+        self.limits = limits
+        self.drift = drift
+        # None until the position is known
+        self.value = None
+        self.uncertainty = None
+        self.velocity = 0
+        self.target = None
+        self.speed = 0
+        self.time = monotonic()
+
+    def advance(self, now):
+        """
+        Move the axis until now
+        """
+        elapsed = max(now - self.time, 0)
+        self.time = now
+        if self.value is None:
+            return
+        moved = 0
+        if self.target is not None:
+            distance = self.target - self.value
+            moved = min(abs(distance), self.speed * elapsed)
+            self.value += copysign(moved, distance)
+        elif self.velocity:
+            value = min(max(self.value + self.velocity * elapsed, self.limits[0]), self.limits[1])
+            moved = abs(value - self.value)
+            self.value = value
+        self.uncertainty += self.drift * moved
+
+    def move(self, velocity):
+        self.target = None
+        self.velocity = velocity
+
+    def go(self, target, speed):
+        if self.value is not None:
+            self.value, target = min(max(self.value, self.limits[0]), self.limits[1]), \
+                                 min(max(target, self.limits[0]), self.limits[1])
+        self.target = target
+        self.speed = speed
+        self.velocity = 0
+
+    def arrived(self, accuracy):
+        if self.target is not None:
+            self.value = self.target
+            self.uncertainty = accuracy
+            self.target = None
+
+    def correct(self, value, since):
+        """
+        Set the position read at since
+        """
+        self.value = value
+        self.uncertainty = 0
+        self.time = since
+
+
+class Estimator(object):
+    """
+    Estimate the pan, tilt and zoom of a camera from its commands
+        :pan_rate, tilt_rate are the degrees per second at the maximum speed
+        :zoom_rate is the zoom positions per second at the maximum speed
+        :drift is the uncertainty added per degree (or zoom position) travelled
+        :accuracy is the uncertainty after an absolute move is completed
+    """
+    def __init__(self, pan_rate=100, tilt_rate=90, zoom_rate=8000, drift=0.05, accuracy=0.1):
+        super(Estimator, self).__init__()
+        self.pan_rate = pan_rate
+        self.tilt_rate = tilt_rate
+        self.zoom_rate = zoom_rate
+        self.accuracy = accuracy
+        self.mutex = threading.Lock()
+        self.pan = Axis((-170, 170), drift)
+        self.tilt = Axis((-20, 90), drift)
+        self.zoom = Axis((0, 0x7ac0), drift)
+
+    def _advance(self, now):
+        for axis in (self.pan, self.tilt, self.zoom):
+            axis.advance(now)
+
+    def position(self, now=None):
+        """
+        Return the estimated position
+            :Return a dict axis -> (value, uncertainty), (None, None) if unknown
+        """
+        if now is None:
+            now = monotonic()
+        with self.mutex:
+            self._advance(now)
+            return dict((name, (axis.value, axis.uncertainty)) for name, axis in
+                        (('pan', self.pan), ('tilt', self.tilt), ('zoom', self.zoom)))
+
+    def command(self, message, now=None):
+        """
+        Follow a command message (without header), when it is sent
+        """
+        message = bytearray(message)
+        if now is None:
+            now = monotonic()
+        with self.mutex:
+            self._advance(now)
+            prefix = bytes(message[:3])
+            if prefix == b'\x01\x06\x01' and len(message) >= 7:
+                # drive : speeds then directions (03 is stop)
+                pan = self.pan_rate * float(message[3]) / PAN_SPEED_MAX
+                tilt = self.tilt_rate * float(message[4]) / TILT_SPEED_MAX
+                self.pan.move({0x01: -pan, 0x02: pan}.get(message[5], 0))
+                self.tilt.move({0x01: tilt, 0x02: -tilt}.get(message[6], 0))
+            elif prefix in (b'\x01\x06\x02', b'\x01\x06\x03') and len(message) >= 13:
+                if prefix == b'\x01\x06\x02':
+                    pan = visca_to_degree(read_nibbles(message[5:9]), 'pan')
+                    tilt = visca_to_degree(read_nibbles(message[9:13]), 'tilt')
+                else:
+                    pan = visca_to_delta(read_nibbles(message[5:9]), 'pan')
+                    tilt = visca_to_delta(read_nibbles(message[9:13]), 'tilt')
+                pan_speed = self.pan_rate * float(message[3]) / PAN_SPEED_MAX
+                tilt_speed = self.tilt_rate * float(message[4]) / TILT_SPEED_MAX
+                if prefix == b'\x01\x06\x03':
+                    # relative, from where the camera is
+                    if self.pan.value is None or self.tilt.value is None:
+                        return
+                    pan += self.pan.target if self.pan.target is not None else self.pan.value
+                    tilt += self.tilt.target if self.tilt.target is not None else self.tilt.value
+                self.pan.go(pan, pan_speed)
+                self.tilt.go(tilt, tilt_speed)
+            elif prefix == b'\x01\x06\x04':
+                # home
+                self.pan.go(0, self.pan_rate)
+                self.tilt.go(0, self.tilt_rate)
+            elif prefix == b'\x01\x06\x05':
+                # reset : the camera calibrates, the position is unknown
+                for axis in (self.pan, self.tilt):
+                    axis.value = axis.uncertainty = axis.target = None
+                    axis.velocity = 0
+            elif prefix == b'\x01\x04\x47' and len(message) >= 7:
+                self.zoom.go(read_nibbles(message[3:7]), self.zoom_rate)
+            elif prefix == b'\x01\x04\x07' and len(message) >= 4:
+                self._zoom_drive(message[3])
+
+    def _zoom_drive(self, code):
+        # 00 stop, 02/03 tele/wide at the standard speed, 2p/3p at speed p
+        if code in (0x02, 0x03):
+            direction, speed = code, 3
+        else:
+            direction, speed = code >> 4, code & 0x0f
+        rate = self.zoom_rate * float(speed + 1) / (ZOOM_SPEED_MAX + 1)
+        self.zoom.move({2: rate, 3: -rate}.get(direction, 0))
+
+    def completed(self, message, now=None):
+        """
+        Follow the completion of a command message
+        """
+        if now is None:
+            now = monotonic()
+        prefix = bytes(bytearray(message[:3]))
+        with self.mutex:
+            self._advance(now)
+            if prefix in (b'\x01\x06\x02', b'\x01\x06\x03', b'\x01\x06\x04'):
+                self.pan.arrived(self.accuracy)
+                self.tilt.arrived(self.accuracy)
+            elif prefix == b'\x01\x04\x47':
+                self.zoom.arrived(0)
+
+    def correct(self, function, value, since):
+        """
+        Correct the estimate with the answer to a query sent at since
+        """
+        if not value and value != 0:
+            return
+        with self.mutex:
+            if function == 'pan_tilt':
+                self.pan.correct(value[0], since)
+                self.tilt.correct(value[1], since)
+            elif function == 'zoom':
+                self.zoom.correct(value, since)
@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Exceptions module contains the errors raised by pyviscam
+
+ViscaTimeout is raised when a request is not answered before its deadline
+(see pyviscam.demux.TIMEOUTS) :
+    - AckTimeout : no ack, no answer. The camera is off, unplugged or busy
+    - CompletionTimeout : the command has been acked but is not over
+
+try:
+    cam.home()
+except AckTimeout:
+    print('camera %i is gone' % cam.address)
+"""
+
+from binascii import hexlify
+
+
+class ViscaError(Exception):
+    """
+    Base class of the errors raised by pyviscam
+    """
+    pass
+
+
+class ViscaTimeout(ViscaError):
+    """
+    A request has not been answered before its deadline
+        :request is the pyviscam.demux.Request
+        :timeout is the time it had (seconds)
+    """
+    waiting = 'reply'
+
+    def __init__(self, request, timeout):
+        self.request = request
+        self.timeout = timeout
+        super(ViscaTimeout, self).__init__('ERROR 12 - no %s to %s within %.2f s' % (
+            self.waiting, hexlify(request.packet).decode('ascii'), timeout))
+
+
+class AckTimeout(ViscaTimeout):
+    """
+    Neither ack nor answer before the deadline
+    """
+    waiting = 'ack'
+
+
+class CompletionTimeout(ViscaTimeout):
+    """
+    A command acked but not completed before its deadline
+    """
+    waiting = 'completion'
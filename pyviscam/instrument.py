@@ -0,0 +1,175 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Instrument module contains the Instruments Class
+Instruments time every packet sent to the cameras : the time it waits
+for its turn (queue), the time the camera takes to ack it (ack) and the
+whole round trip until the completion or the answer (done).
+
+The durations go to fixed size histograms, for each camera and each
+command or parameter name, and to the sinks given, as events.
+Without instruments, a camera only tests that there are none.
+
+cams.instruments = Instruments(sinks=[print])
+cams.get_instances()[0].zoom = 2000
+cams.instruments.report()     # {1: {'zoom': {'done': {'p50': ..., 'p99': ...}, ...}}}
+"""
+
+import threading
+from binascii import hexlify
+from bisect import bisect_left
+
+from pyviscam.cache import monotonic
+from pyviscam.constants import settings, value_commands
+from pyviscam.convert import to_bytes
+
+# upper bounds of the buckets : 10 a decade, from 0.1 ms to 10 s
+BOUNDS = [10 ** (exponent / 10.0) for exponent in range(-40, 11)]
+
+# first bytes of a command -> name
+_names = dict((to_bytes(prefix), name) for name, prefix in settings.items())
+_names.update((to_bytes(prefix), name) for name, prefix in value_commands.items())
+_names.update({b'\x01\x06\x01': 'drive', b'\x01\x06\x02': 'pan_tilt', b'\x01\x06\x03': 'pan_tilt_relative',
+               b'\x01\x06\x04': 'home', b'\x01\x06\x05': 'reset', b'\x01\x04\x07': 'zoom_drive',
+               b'\x01\x04\x08': 'focus_drive', b'\x01\x04\x3F': 'memory'})
+
+
+def command_name(message):
+    """
+    Return the name of a command message (without header), its first bytes if unknown
+    """
+    message = bytes(message)
+    for size in (5, 4, 3):
+        name = _names.get(message[:size])
+        if name is not None:
+            return name
+    return hexlify(message[:3]).decode('ascii')
+
+
+class Histogram(object):
+    """
+    Durations counted in fixed buckets (see BOUNDS)
+    """
+    def __init__(self):
+        super(Histogram, self).__init__()
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Return the upper bound of the bucket holding a percentile
+        """
+        rank = self.count * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return BOUNDS[index] if index < len(BOUNDS) else self.max
+        return 0
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {'count': self.count, 'mean': self.total / self.count, 'p50': self.percentile(50),
+                'p99': self.percentile(99), 'max': self.max}
+
+
+class _Entry(object):
+    """
+    Histograms of a name on a camera
+    """
+    def __init__(self):
+        self.queue = Histogram()
+        self.ack = Histogram()
+        self.done = Histogram()
+        self.errors = 0
+        self.timeouts = 0
+
+
+class Instruments(object):
+    """
+    Time the requests of the cameras
+        :sinks are called with an event (dict) for each request over
+    """
+    def __init__(self, sinks=None):
+        super(Instruments, self).__init__()
+        self.sinks = list(sinks or [])
+        self.mutex = threading.Lock()
+        # (address, name) -> _Entry
+        self._entries = {}
+
+    def watch(self, request, name):
+        """
+        Time a request (see pyviscam.demux) from now on
+        """
+        times = [monotonic(), None]
+
+        def acked(future):
+            times[1] = monotonic()
+
+        def done(future):
+            self._record(request, name, times[0], times[1], monotonic(), future)
+
+        request.ack.add_done_callback(acked)
+        request.done.add_done_callback(done)
+
+    def _record(self, request, name, submitted, acked, done, future):
+        written = request.written
+        reply = None
+        if not future.cancelled() and future.exception() is None:
+            reply = future.result()
+        error = reply is not None and bytearray(reply)[1] & 0xf0 == 0x60
+        with self.mutex:
+            entry = self._entries.get((request.address, name))
+            if entry is None:
+                entry = self._entries[(request.address, name)] = _Entry()
+            if reply is None:
+                entry.timeouts += 1
+            else:
+                if error:
+                    entry.errors += 1
+                if written is not None:
+                    entry.queue.add(written - submitted)
+                    if acked is not None:
+                        entry.ack.add(acked - written)
+                entry.done.add(done - submitted)
+        if self.sinks:
+            event = {'address': request.address, 'name': name, 'submitted': submitted,
+                     'written': written, 'acked': acked, 'done': done, 'reply': reply}
+            for sink in self.sinks:
+                sink(event)
+
+    def report(self):
+        """
+        Return the summaries : address -> name -> queue, ack, done, errors, timeouts
+        """
+        result = {}
+        with self.mutex:
+            for (address, name), entry in self._entries.items():
+                result.setdefault(address, {})[name] = {
+                    'queue': entry.queue.summary(), 'ack': entry.ack.summary(),
+                    'done': entry.done.summary(), 'errors': entry.errors, 'timeouts': entry.timeouts}
+        return result
+
+    def slowest(self, count=5, percent=99):
+        """
+        Return the slowest (address, name, duration) by their round trip percentile
+        """
+        with self.mutex:
+            durations = [(address, name, entry.done.percentile(percent))
+                         for (address, name), entry in self._entries.items()]
+        return sorted(durations, key=lambda duration: -duration[2])[:count]
+
+    def clear(self):
+        with self.mutex:
+            self._entries.clear()
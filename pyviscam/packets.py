@@ -0,0 +1,129 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Packets module contains the packets compiled when pyviscam is imported
+
+Every inquiry and every command without parameter is framed once
+for each address of the bus (1..7), so sending it is a dict lookup :
+
+packets.inquiries[1]['zoom']              # b'\\x81\\x09\\x04\\x47\\xff'
+packets.commands[1][b'\\x01\\x06\\x04']     # b'\\x81\\x01\\x06\\x04\\xff' (home)
+
+Commands with parameters fill a Template, a bytearray allocated once
+with the header, the fixed bytes and the terminator.
+"""
+
+import threading
+
+from pyviscam.convert import to_bytes
+from pyviscam.constants import queries, answers, block_queries, settings, fixed_commands, \
+                               value_commands
+
+# addresses of the cameras on a bus
+ADDRESSES = range(1, 8)
+BROADCAST = -1
+TERMINATOR = b'\xff'
+
+# commands moving pan/tilt to an absolute or relative position : speeds then positions
+PAN_TILT_ABSOLUTE = b'\x01\x06\x02'
+PAN_TILT_RELATIVE = b'\x01\x06\x03'
+PAN_TILT_FIELDS = ((1, 8), (1, 8), (4, 4), (4, 4))
+
+
+def header(address, sender=0):
+    """
+    according to the documentation:
+
+    header:
+    1 s2 s1 s0 0 r2 r1 r0
+    with r,s = recipient, sender msb first
+
+    for broadcast the header is 0x88!
+    """
+    if address == BROADCAST:
+        rbits = 0x8
+    else:
+        # the recipient (address = 3 bits)
+        rbits = address & 0b111
+    return 0b10000000 | ((sender & 0b111) << 4) | rbits
+
+
+def frame(address, message):
+    """
+    Return the packet sending a message to an address (-1 for broadcast)
+    """
+    return bytes(bytearray([header(address)])) + to_bytes(message) + TERMINATOR
+
+
+def _compile(messages):
+    """
+    Return the framed messages for each address
+        :messages is a dict key -> message
+    """
+    return dict((address, dict((key, frame(address, message)) for key, message in messages.items()))
+                for address in ADDRESSES)
+
+
+def _inquiry_messages():
+    messages = dict((name, b'\x09' + to_bytes(query)) for name, query in queries.items())
+    for name, query in block_queries.items():
+        messages['block_' + name] = b'\x09' + to_bytes(query)
+    return messages
+
+
+def _command_messages():
+    messages = [to_bytes(message) for message in fixed_commands]
+    # every value of the enumerated parameters
+    for name, prefix in settings.items():
+        for code in answers[name]:
+            messages.append(to_bytes(prefix) + bytes(bytearray([code])))
+    return dict((message, message) for message in messages)
+
+# address -> parameter name -> packet ('block_lens' for the lens block)
+inquiries = _compile(_inquiry_messages())
+
+# address -> message -> packet
+commands = _compile(_command_messages())
+
+
+class Template(object):
+    """
+    A command with parameters, allocated once for a camera
+        :fields gives (size in bytes, bits per byte) for each parameter,
+         parameters are written msb first, a nibble or a byte per byte
+    """
+    def __init__(self, address, message, fields=((4, 4),)):
+        super(Template, self).__init__()
+        size = sum(field[0] for field in fields)
+        self.buffer = bytearray(frame(address, to_bytes(message) + b'\x00' * size))
+        self.offset = 1 + len(to_bytes(message))
+        self.fields = fields
+        self.mutex = threading.Lock()
+
+    def packet(self, *values):
+        """
+        Return the packet with these parameters
+        """
+        buffer = self.buffer
+        with self.mutex:
+            index = self.offset
+            for (size, bits), value in zip(self.fields, values):
+                value = int(value)
+                mask = (1 << bits) - 1
+                for position in range(index + size - 1, index - 1, -1):
+                    buffer[position] = value & mask
+                    value >>= bits
+                index += size
+            return bytes(buffer)
+
+
+def templates(address):
+    """
+    Return the templates of the commands with parameters for a camera
+        :Return a dict parameter name -> Template
+    """
+    result = dict((name, Template(address, message)) for name, message in value_commands.items())
+    result['pan_tilt'] = Template(address, PAN_TILT_ABSOLUTE, PAN_TILT_FIELDS)
+    result['pan_tilt_relative'] = Template(address, PAN_TILT_RELATIVE, PAN_TILT_FIELDS)
+    return result
@@ -1,71 +1,97 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import logging
+
 from pyviscam.convert import scale
 
+try:
+    import numpy
+except ImportError:
+    # the sequence conversions fall back to pure python
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# (degrees min, degrees max, visca min, visca max) of the positive and negative sides
+ranges = {'pan': ((0, 170, 0, 7708), (-170, 0, 57829, 65535)),
+          'tilt': ((0, 90, 0, 4080), (-20, 0, 61455, 65535))}
+
 def degree_to_visca(value, what, flip=False):
-    if what == 'pan':
-        # value must be between -170 & 170
-        if value >= 0:
-            old_min = 0
-            old_max = 170
-            new_min = 0
-            new_max = 7708
-        else:
-            old_min = -170
-            old_max = 0
-            new_min = 57829
-            new_max = 65535
-    elif what == 'tilt':
-        # value must be between -20 & 90
-        if value >= 0:
-            old_min = 0
-            old_max = 90
-            new_min = 0
-            new_max = 4080
-        else:
-            old_min = -20
-            old_max = 0
-            new_min = 61455
-            new_max = 65535
-        if flip:
-            # value must be between -90 & 20
-            pass
-            print('flip function is not yet implemented for tilt')
+    # pan must be between -170 & 170, tilt between -20 & 90
+    positive, negative = ranges[what]
+    if value >= 0:
+        old_min, old_max, new_min, new_max = positive
+    else:
+        old_min, old_max, new_min, new_max = negative
+    if what == 'tilt' and flip:
+        # value must be between -90 & 20
+        logger.warning('flip function is not yet implemented for tilt')
     return int(scale(value, old_min, old_max, new_min, new_max))
 
 def visca_to_degree(value, what, flip=False):
-    if what == 'pan':
-        # value must be between -170 & 170
-        # value must be between -170 & 170
-        if value <= 7708:
-            old_min = 0
-            old_max = 7708
-            new_min = 0
-            new_max = 170
-        else:
-            old_min = 57829
-            old_max = 65535
-            new_min = -170
-            new_max = 0
-    elif what == 'tilt':
-        # value must be between -20 & 90
-        if value <= 4080:
-            old_min = 0
-            old_max = 4080
-            new_min = 0
-            new_max = 90
-        else:
-            old_min = 61455
-            old_max = 65535
-            new_min = -20
-            new_max = 0
-        if flip:
-            # value must be between -90 & 20
-            print('flip function is not yet implemented for tilt')
+    positive, negative = ranges[what]
+    if value <= positive[3]:
+        new_min, new_max, old_min, old_max = positive
+    else:
+        new_min, new_max, old_min, old_max = negative
+    if what == 'tilt' and flip:
+        # value must be between -90 & 20
+        logger.warning('flip function is not yet implemented for tilt')
     value = scale(value, old_min, old_max, new_min, new_max)
     return round(value, 1)
 
+def delta_to_visca(value, what):
+    """
+    Convert a relative move in degrees, with the counts per degree of the positive side
+        :Return the 16 bits two's complement of the counts
+    """
+    positive = ranges[what][0]
+    return int(round(value * float(positive[3] - positive[2]) / (positive[1] - positive[0]))) & 0xffff
+
+def visca_to_delta(value, what):
+    """
+    Convert the counts of a relative move (16 bits two's complement) to degrees
+    """
+    positive = ranges[what][0]
+    if value & 0x8000:
+        value -= 0x10000
+    return round(value * float(positive[1] - positive[0]) / (positive[3] - positive[2]), 1)
+
+def degrees_to_visca(values, what):
+    """
+    Convert a sequence of degrees (a trajectory) to visca positions
+        :Return a numpy array of int if numpy is available, else a list
+    """
+    (p_min, p_max, p_new_min, p_new_max), (n_min, n_max, n_new_min, n_new_max) = ranges[what]
+    # same operations as scale(), so the results are the ones of degree_to_visca
+    p_span, p_width = float(p_new_max - p_new_min), p_max - p_min
+    n_span, n_width = float(n_new_max - n_new_min), n_max - n_min
+    if numpy is None:
+        return [int((value - p_min) * p_span / p_width + p_new_min) if value >= 0
+                else int((value - n_min) * n_span / n_width + n_new_min) for value in values]
+    values = numpy.asarray(values, dtype=float)
+    visca = numpy.where(values >= 0, (values - p_min) * p_span / p_width + p_new_min,
+                        (values - n_min) * n_span / n_width + n_new_min)
+    # int() truncation, positions are positive
+    return visca.astype(int)
+
+def visca_to_degrees(values, what):
+    """
+    Convert a sequence of visca positions to degrees
+        :Return a numpy array of float if numpy is available, else a list
+    """
+    (p_new_min, p_new_max, p_min, p_max), (n_new_min, n_new_max, n_min, n_max) = ranges[what]
+    p_span, p_width = float(p_new_max - p_new_min), p_max - p_min
+    n_span, n_width = float(n_new_max - n_new_min), n_max - n_min
+    if numpy is None:
+        return [round((value - p_min) * p_span / p_width + p_new_min if value <= p_max
+                      else (value - n_min) * n_span / n_width + n_new_min, 1) for value in values]
+    values = numpy.asarray(values, dtype=float)
+    degrees = numpy.where(values <= p_max, (values - p_min) * p_span / p_width + p_new_min,
+                          (values - n_min) * n_span / n_width + n_new_min)
+    return numpy.round(degrees, 1)
+
 
 """
 # test
@@ -73,4 +99,4 @@ translation = degree_to_visca(22.2, 'pan')
 print(visca_to_degree(translation, 'pan')
 translation = degree_to_visca(-20, 'tilt')
 print(visca_to_degree(translation, 'tilt')
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,233 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Poller module contains the Poller Class
+A Poller reads the parameters watched by the applications (tally, overlays...)
+with a single schedule for the whole chain, instead of a loop per application.
+
+A subscription asks for a parameter of a camera no older than max_staleness.
+A parameter is polled fast (max_staleness / fast) while it changes, while
+a drive moves it and just after a command sets it, then the poll backs off,
+doubling its interval up to max_staleness. When the chain asks for more
+inquiries than the budget of the bus, every interval is stretched, the
+inquiries never take the whole bus away from the commands.
+
+def changed(camera, param, value):
+    print(camera.address, param, value)
+
+cams.subscribe(cam, 'pan', 0.5, changed)
+cams.subscribe(cam, 'zoom', 0.5, changed)
+"""
+
+import logging
+import threading
+
+from pyviscam.cache import MISSING, monotonic, commands, drives
+from pyviscam.exceptions import ViscaError
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription(object):
+    """
+    A parameter of a camera watched by a callback
+        :callback is called with (camera, param, value) when the value changes
+    """
+    def __init__(self, camera, param, max_staleness, callback):
+        super(Subscription, self).__init__()
+        self.camera = camera
+        self.param = param
+        self.max_staleness = max_staleness
+        self.callback = callback
+        # pan and tilt are read together
+        self.function = 'pan_tilt' if param in ('pan', 'tilt') else param
+        self.value = MISSING
+
+    def extract(self, value):
+        if self.param == 'pan':
+            return value[0]
+        elif self.param == 'tilt':
+            return value[1]
+        return value
+
+
+class _Entry(object):
+    """
+    A parameter polled, shared by its subscriptions
+    """
+    def __init__(self, camera, function):
+        self.camera = camera
+        self.function = function
+        self.subscriptions = []
+        self.interval = 0
+        self.due = 0
+        self.moving = False
+        self.value = MISSING
+
+    @property
+    def staleness(self):
+        return min(subscription.max_staleness for subscription in self.subscriptions)
+
+
+class Poller(object):
+    """
+    Poll the parameters subscribed on a chain of cameras
+        :budget is the number of inquiries per second the bus can spare
+        :fast divides max_staleness while a parameter changes
+    """
+    def __init__(self, budget=20, fast=4):
+        super(Poller, self).__init__()
+        self.budget = budget
+        self.fast = fast
+        self._condition = threading.Condition()
+        # (address, function) -> _Entry
+        self._entries = {}
+        self._running = False
+        self._thread = None
+        self.polls = 0
+        # inquiries asked by the schedule / budget, above 1 the intervals are stretched
+        self.load = 0
+
+    def subscribe(self, camera, param, max_staleness, callback):
+        """
+        Watch a parameter of a camera
+            :Return the Subscription, to unsubscribe
+            :Raise ValueError if max_staleness is not positive
+        """
+        if not max_staleness > 0:
+            raise ValueError('max_staleness must be positive, not %r' % (max_staleness,))
+        subscription = Subscription(camera, param, max_staleness, callback)
+        key = (camera.address, subscription.function)
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(camera, subscription.function)
+            entry.subscriptions.append(subscription)
+            # start fast, the first value is awaited
+            entry.interval = entry.staleness / self.fast
+            entry.due = monotonic()
+            if entry.value is not MISSING:
+                subscription.value = subscription.extract(entry.value)
+            if self.command not in camera.listeners:
+                camera.listeners.append(self.command)
+            self._condition.notify()
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        key = (subscription.camera.address, subscription.function)
+        with self._condition:
+            entry = self._entries.get(key)
+            if entry is not None and subscription in entry.subscriptions:
+                entry.subscriptions.remove(subscription)
+                if not entry.subscriptions:
+                    del self._entries[key]
+
+    def command(self, camera, message):
+        """
+        Poll fast the parameters changed by a command sent to a camera
+        """
+        message = bytes(message)
+        names = commands.get(message[:4], MISSING)
+        if names is MISSING:
+            names = commands.get(message[:3], ())
+        drive = drives.get(message[:3])
+        now = monotonic()
+        with self._condition:
+            for (address, function), entry in self._entries.items():
+                if address != camera.address or (names is not None and function not in names):
+                    continue
+                if drive is not None and drive[0] == function:
+                    entry.moving = not message.endswith(drive[1])
+                entry.interval = entry.staleness / self.fast
+                entry.due = min(entry.due, now + entry.interval)
+            self._condition.notify()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self.run, name='pyviscam-poller')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def run(self):
+        """
+        Poll the entries in turn, as they are due
+        """
+        last = 0
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                if not self._entries:
+                    self._condition.wait()
+                    continue
+                entry = min(self._entries.values(), key=lambda entry: entry.due)
+                # keep the inquiries within the budget
+                due = max(entry.due, last + 1.0 / self.budget)
+                delay = due - monotonic()
+                if delay > 0:
+                    # a subscription or a command may come meanwhile
+                    self._condition.wait(delay)
+                    continue
+                entry.due = float('inf')
+            last = monotonic()
+            value = self._poll(entry)
+            with self._condition:
+                self._schedule(entry, value, last)
+                subscriptions = list(entry.subscriptions)
+            if value is not None:
+                self._push(subscriptions, value)
+
+    def _poll(self, entry):
+        try:
+            # the cache may hold the value the subscribers already have
+            value = entry.camera._query(entry.function, fresh=True)
+        except IOError:
+            # the bus has been closed
+            self._running = False
+            return None
+        except (ViscaError, ValueError, IndexError, TypeError) as error:
+            logger.error("ERROR 46 - cannot poll %s: %s", entry.function, error)
+            return None
+        self.polls += 1
+        if value is False or value is None:
+            return None
+        return value
+
+    def _schedule(self, entry, value, now):
+        """
+        Set the next poll of an entry, fast while it changes, backing off when idle
+        """
+        if self._entries.get((entry.camera.address, entry.function)) is not entry:
+            # unsubscribed meanwhile
+            return
+        staleness = entry.staleness
+        if entry.moving or (value is not None and value != entry.value):
+            entry.interval = staleness / self.fast
+        else:
+            entry.interval = min(entry.interval * 2, staleness)
+        if value is not None:
+            entry.value = value
+        self.load = sum(1.0 / other.interval for other in self._entries.values()) / self.budget
+        entry.due = min(entry.due, now + entry.interval * max(1, self.load))
+
+    def _push(self, subscriptions, value):
+        for subscription in subscriptions:
+            extracted = subscription.extract(value)
+            if extracted == subscription.value:
+                continue
+            subscription.value = extracted
+            try:
+                subscription.callback(subscription.camera, subscription.param, extracted)
+            except Exception as error:
+                logger.error("ERROR 47 - subscriber of %s failed: %s", subscription.param, error)
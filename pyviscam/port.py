@@ -1,22 +1,81 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import logging
 import sys
 import glob
 import serial
-try:
-    # python 2
-    from thread import allocate_lock
-except:
-    # python 3
-    from _thread import allocate_lock
-
-from pyviscam import debug
-
-class Serial(object):
-    def __init__(self):
-        self.mutex = allocate_lock()
+
+from pyviscam.cache import monotonic
+from pyviscam.convert import to_bytes
+from pyviscam.transport import Transport
+
+logger = logging.getLogger(__name__)
+
+# baud rates of the visca cameras, tried in this order by detect_baudrate
+BAUDRATES = (9600, 38400, 19200, 115200)
+
+# interface clear broadcast, it comes back through the whole chain
+IF_CLEAR = b'\x88\x01\x00\x01\xff'
+
+# port name -> baud rate found by detect_baudrate
+_detected = {}
+
+
+def pop_packet(buffer):
+    """
+    Remove the first packet (terminated by 0xff) from a bytearray
+        :Return the packet as bytes
+        :Return None if the buffer does not hold a complete packet
+    """
+    end = buffer.find(b'\xff')
+    if end < 0:
+        if len(buffer) < 16:
+            return None
+        # a packet is never longer than 16 bytes
+        end = 15
+    packet = bytes(buffer[:end + 1])
+    del buffer[:end + 1]
+    return packet
+
+
+def detect_baudrate(port, rates=BAUDRATES, timeout=0.2):
+    """
+    Find the baud rate of the cameras on an open pyserial port
+    An IF_Clear broadcast is sent at each rate, until it comes back
+        :timeout is the time to wait for the broadcast at each rate (seconds)
+        :Return the baud rate, None if nobody answers
+    """
+    previous = port.timeout
+    port.timeout = timeout
+    try:
+        for rate in rates:
+            port.baudrate = rate
+            port.reset_input_buffer()
+            port.write(IF_CLEAR)
+            # at a wrong rate, the reply is garbage or nothing
+            if port.read_until(b'\xff', 16).endswith(IF_CLEAR):
+                return rate
+        return None
+    finally:
+        port.timeout = previous
+
+
+class Serial(Transport):
+    """
+    Serial transport, for cameras daisy-chained on a RS-232 / RS-422 port
+        :baudrate is the speed of the port, set on the cameras
+        :baudrate 'auto' finds it when the port is opened (see detect_baudrate),
+         and keeps it for the next time this port is opened
+        :timeout is the time a packet has to arrive once its first byte is read (seconds)
+    """
+    def __init__(self, baudrate=9600, timeout=0.1):
+        super(Serial, self).__init__()
+        self.baudrate = baudrate
+        self.timeout = timeout
         self.port = None
+        # bytes read from the port but not yet returned as a packet
+        self._buffer = bytearray()
 
     def listports(self):
         """ Lists serial port names
@@ -33,8 +92,7 @@ class Serial(object):
         elif sys.platform.startswith('darwin'):
             ports = glob.glob('/dev/tty.*')
         else:
-            if debug:
-                print('ERROR 11 - Unsupported platform')
+            logger.error('ERROR 11 - Unsupported platform')
             sys.exit(1)
         result = []
         for item in ports:
@@ -45,9 +103,9 @@ class Serial(object):
             try:
                 result = ports[0]
             except IndexError:
-                print('There is no available ports')
+                logger.error('There is no available ports')
                 quit()
-        print('serial port opening : ' + str(result))
+        logger.info('serial port opening : %s', result)
         # this is too long, takes 10/20 secondes to happend
         """
         for port in ports:
@@ -62,52 +120,79 @@ class Serial(object):
 
     def open(self, portname):
         self.mutex.acquire()
-        self.portname = portname
-        if (self.port == None):
-            try:
-                self.port = serial.Serial(self.portname, 9600, timeout=1, stopbits=1, \
-                                          bytesize=8, rtscts=False, dsrdtr=False)
-                self.port.flushInput()
-                self.mutex.release()
-                return True
-            except:
-                self.port = None
-                self.mutex.release()
-                return False
+        try:
+            self.portname = portname
+            if self.port is None:
+                auto = self.baudrate == 'auto'
+                rate = _detected.get(portname, BAUDRATES[0]) if auto else self.baudrate
+                try:
+                    self.port = serial.Serial(self.portname, rate, timeout=self.timeout, stopbits=1, \
+                                              bytesize=8, rtscts=False, dsrdtr=False)
+                    self.port.flushInput()
+                except (OSError, ValueError, serial.SerialException):
+                    self.port = None
+                    return False
+                if auto and portname not in _detected:
+                    rate = detect_baudrate(self.port)
+                    if rate is None:
+                        logger.error('ERROR 13 - no camera answers on %s', portname)
+                        self.port.baudrate = BAUDRATES[0]
+                    else:
+                        logger.info('cameras of %s talk at %i bauds', portname, rate)
+                        _detected[portname] = rate
+                    self.port.reset_input_buffer()
+            return True
+        finally:
+            self.mutex.release()
 
-    def recv_packet(self, extra_title=None):
+    def close(self):
         if self.port:
-            # read up to 16 bytes until 0xff
-            packet=''
-            count=0
-            while count<16:
-                s=self.port.read(1)
-                if s:
-                    byte = ord(s)
-                    count+=1
-                    packet=packet+chr(byte)
-                else:
-                    print("ERROR 12 - Timeout waiting for reply")
-                    break
-                if byte==0xff:
-                    break
-            return packet
+            self.port.close()
+            self.port = None
+        del self._buffer[:]
+
+    def recv_packet(self, extra_title=None):
+        """
+        Return the next packet received (terminated by 0xff)
+            :Read everything waiting in the port at once
+            :Keep bytes following the terminator for the next call
+            :Return the bytes read if the packet is not over in time
+            :Return False if the port is not open
+        """
+        port = self.port
+        if port:
+            buf = self._buffer
+            deadline = None
+            while True:
+                packet = pop_packet(buf)
+                if packet:
+                    return packet
+                if buf and deadline is None:
+                    deadline = monotonic() + self.timeout
+                chunk = None
+                if deadline is None or monotonic() < deadline:
+                    # block for the first byte, then drain all that is waiting
+                    try:
+                        chunk = port.read(port.in_waiting or 1)
+                    except (OSError, TypeError, serial.SerialException):
+                        # the port has been closed or unplugged
+                        return False
+                if not chunk:
+                    # timeout
+                    packet = bytes(buf)
+                    del buf[:]
+                    return packet
+                buf += chunk
         else:
             return False
 
-    def _write_packet(self, packet):
+    def write_packet(self, packet):
         if self.port:
             if not self.port.isOpen():
-                if debug:
-                    print("ERROR 14 - no serial port cannot be opened")
+                logger.error('ERROR 14 - no serial port cannot be opened')
                 return False
-            # lets see if a completion message or someting
-            # else waits in the buffer. If yes dump it.
-            elif self.port.inWaiting():
-                self.recv_packet("ignored")
-            self.port.write(packet)
+            self.port.write(to_bytes(packet))
             return True
         else:
-            if debug:
-                print("ERROR 15 - no serial port")
+            logger.error('ERROR 15 - no serial port')
             return False
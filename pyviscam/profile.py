@@ -0,0 +1,149 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Profile module contains the Profile Class
+A Profile tells what a model of camera supports : its parameters, its setters,
+its block inquiries, the answers that differ from the constants and the ranges of
+its values (pan/tilt limits in degrees, zoom, focus...).
+
+The profiles are JSON files of pyviscam/profiles, read on the first lookup.
+A profile is compiled once, when a camera uses it, into its Decoder,
+its Encoder and the packets of its inquiries and setters : a camera does
+not send what its model does not support, it fails locally.
+
+{
+    "name": "EVI-H100",
+    "vendor": 1,                   # vendor and model codes of the version inquiry
+    "models": [],
+    "default": true,               # used when no profile matches
+    "params": null,                # parameters of constants.queries, null for all
+    "setters": null,               # setters of constants.settings and value_commands, null for all
+    "blocks": ["lens", "camera"],
+    "answers": {"WB": {"0": "auto"}},
+    "ranges": {"pan": [-170, 170], "tilt": [-20, 90]}
+}
+
+profile = find(1, 0x0513)
+cam.use_profile(profile)
+"""
+
+import json
+import os
+import threading
+
+from pyviscam.codec import Decoder, Encoder
+from pyviscam.constants import queries, answers, high_res_params, very_high_res_params, settings, \
+                               value_commands
+from pyviscam.packets import inquiries, templates
+
+PROFILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+
+# every setter : enumerated settings, value commands and pan/tilt moves
+SETTERS = set(settings) | set(value_commands) | set(['pan_tilt', 'pan_tilt_relative'])
+
+
+class Profile(object):
+    """
+    Capabilities of a model of camera
+        :data is the content of a profile file
+    """
+    def __init__(self, data):
+        super(Profile, self).__init__()
+        self.name = data['name']
+        self.vendor = data.get('vendor')
+        self.models = set(data.get('models', []))
+        self.default = data.get('default', False)
+        params = data.get('params')
+        if params is None:
+            params = queries
+        self.params = set(name for name in params if name in queries)
+        # some setters have no inquiry (power_auto...), they have their own list
+        setters = data.get('setters')
+        if setters is None:
+            setters = SETTERS
+        self.setters = set(name for name in setters if name in SETTERS)
+        self.blocks = set(data.get('blocks', []))
+        # the codes are the keys of the answers, written as strings in json
+        self.answers = dict(answers)
+        for name, codes in data.get('answers', {}).items():
+            self.answers[name] = dict((int(code), value) for code, value in codes.items())
+        self.ranges = dict((name, tuple(limits)) for name, limits in data.get('ranges', {}).items())
+        self.mutex = threading.Lock()
+        self.decoder = None
+        self.encoder = None
+        self._inquiries = {}
+
+    def __repr__(self):
+        return 'Profile(%s)' % self.name
+
+    def matches(self, vendor, model):
+        return vendor == self.vendor and model in self.models
+
+    def compile(self):
+        """
+        Build the Decoder and the Encoder, once
+        """
+        with self.mutex:
+            if self.decoder is None:
+                params = dict((name, queries[name]) for name in self.params)
+                self.decoder = Decoder(self.answers, high_res_params, very_high_res_params, params)
+                self.encoder = Encoder(self.answers, dict((name, message) for name, message in settings.items()
+                                                          if name in self.setters))
+        return self
+
+    def inquiries(self, address):
+        """
+        Return the query packets supported, for an address
+        """
+        with self.mutex:
+            packets = self._inquiries.get(address)
+            if packets is None:
+                packets = self._inquiries[address] = dict(
+                    (name, packet) for name, packet in inquiries.get(address, {}).items()
+                    if name in self.params or name[len('block_'):] in self.blocks)
+            return packets
+
+    def templates(self, address):
+        """
+        Return the templates of the setters supported, for an address
+        """
+        return dict((name, template) for name, template in templates(address).items()
+                    if name in self.setters)
+
+
+_profiles = None
+_mutex = threading.Lock()
+
+
+def load(directory=PROFILES):
+    """
+    Return the profiles of a directory, read on the first call
+    """
+    global _profiles
+    with _mutex:
+        if _profiles is None or directory != PROFILES:
+            profiles = []
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('.json'):
+                    with open(os.path.join(directory, filename)) as data:
+                        profiles.append(Profile(json.load(data)))
+            if directory != PROFILES:
+                return profiles
+            _profiles = profiles
+        return _profiles
+
+
+def find(vendor, model, directory=PROFILES):
+    """
+    Return the compiled profile of a model, the default profile if none matches
+    """
+    default = None
+    for profile in load(directory):
+        if profile.matches(vendor, model):
+            return profile.compile()
+        if profile.default and default is None:
+            default = profile
+    if default is not None:
+        return default.compile()
+    return None
@@ -0,0 +1,183 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scheduler module contains the Scheduler Class
+The Scheduler shares a bus between the cameras of a daisy chain.
+
+Each camera has its own queue of packets. A writer thread takes the cameras
+in turn and writes the first packet of a camera only when this camera can
+take it :
+    - its previous packet has been answered (acked)
+    - no late reply of a packet given up is expected
+    - one of its sockets is free, for a command
+
+A camera waiting for a long completion keeps its packets in its queue,
+while the packets to the other cameras go on the bus.
+
+The writer thread gives up the requests over their deadline (see
+pyviscam.demux.TIMEOUTS), even if nobody waits for them, so the socket
+of a command never completed (unplugged camera...) is free again.
+"""
+
+import threading
+from collections import deque
+
+from pyviscam.cache import monotonic
+from pyviscam.demux import Dispatcher
+
+
+class Scheduler(Dispatcher):
+    """
+    Dispatcher writing the packets in turn for each camera
+        :timeouts replaces some of the TIMEOUTS of the requests (see pyviscam.demux)
+        :sockets is the number of commands a camera can execute at the same time
+    """
+    def __init__(self, transport, timeouts=None, sockets=2):
+        super(Scheduler, self).__init__(transport, timeouts)
+        self.sockets = sockets
+        self._condition = threading.Condition()
+        # address -> requests waiting to be written
+        self._queues = {}
+        # addresses, in turn
+        self._turn = deque()
+        # address -> packets written and not answered
+        self._unacked = {}
+        # address -> commands acked and not completed
+        self._executing = {}
+        # requests written and not over
+        self._written = set()
+        self._writer = None
+
+    def start(self):
+        super(Scheduler, self).start()
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._schedule, name='pyviscam-writer')
+            self._writer.daemon = True
+            self._writer.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._writer is not None:
+            if self._writer is not threading.current_thread():
+                self._writer.join()
+            self._writer = None
+        super(Scheduler, self).stop()
+        with self._condition:
+            queued = [request for queue in self._queues.values() for request in queue]
+            self._queues.clear()
+        for request in queued:
+            request.ack.set_exception(IOError('scheduler stopped'))
+            request.done.set_exception(IOError('scheduler stopped'))
+            request.sent.set()
+
+    def submit(self, packet):
+        """
+        Queue a packet and return its Request
+        """
+        request = self.router.request(packet)
+        with self._condition:
+            queue = self._queues.get(request.address)
+            if queue is None:
+                queue = self._queues[request.address] = deque()
+                self._turn.append(request.address)
+                self._unacked[request.address] = 0
+                self._executing[request.address] = 0
+            queue.append(request)
+            self._condition.notify()
+        return request
+
+    def pending(self, address):
+        """
+        Return the number of requests of a camera not over yet
+        """
+        with self._condition:
+            return len(self._queues.get(address, ())) + self._unacked.get(address, 0) \
+                   + self._executing.get(address, 0)
+
+    def _ready(self, request):
+        address = request.address
+        if self._unacked[address] or self.router.late_until(address) is not None:
+            return False
+        if request.inquiry:
+            return True
+        return self._executing[address] < self.sockets
+
+    def _next(self):
+        """
+        Return the next request to write, the cameras are taken in turn
+        """
+        for _ in range(len(self._turn)):
+            address = self._turn[0]
+            self._turn.rotate(-1)
+            queue = self._queues[address]
+            while queue and queue[0].ack.cancelled():
+                # forgotten while it was waiting for its turn
+                queue.popleft().sent.set()
+            if queue and self._ready(queue[0]):
+                return queue.popleft()
+        return None
+
+    def _expired(self):
+        """
+        Return the requests over their deadline with their timeout,
+        and the time to wait for the next deadline (None if there is none)
+        """
+        now = monotonic()
+        expired = []
+        wake = None
+        for request in self._written:
+            error = request.expired(now)
+            if error is not None:
+                expired.append((request, error))
+            elif request.written is not None:
+                deadline = request.deadline() - now
+                if wake is None or deadline < wake:
+                    wake = deadline
+        for address, queue in self._queues.items():
+            late = self.router.late_until(address) if queue else None
+            if late is not None and (wake is None or late - now < wake):
+                wake = late - now
+        return expired, wake
+
+    def _schedule(self):
+        while True:
+            with self._condition:
+                expired, wake = self._expired()
+                request = None if expired else self._next()
+                while request is None and not expired and self._running:
+                    self._condition.wait(wake)
+                    expired, wake = self._expired()
+                    if not expired:
+                        request = self._next()
+                if not self._running:
+                    return
+                if request is not None:
+                    self._unacked[request.address] += 1
+                    self._written.add(request)
+            for expired_request, error in expired:
+                # the waiters get the timeout, the callbacks free the socket
+                self.router.forget(expired_request, error)
+            if request is not None:
+                request.ack.add_done_callback(lambda future, request=request: self._acked(request))
+                request.done.add_done_callback(lambda future, request=request: self._over(request))
+                self._write(request)
+
+    def _acked(self, request):
+        with self._condition:
+            self._unacked[request.address] -= 1
+            if request.socket is not None and not request.done.done():
+                self._executing[request.address] += 1
+                request.done.add_done_callback(lambda future: self._completed(request))
+            self._condition.notify()
+
+    def _completed(self, request):
+        with self._condition:
+            self._executing[request.address] -= 1
+            self._condition.notify()
+
+    def _over(self, request):
+        with self._condition:
+            self._written.discard(request)
@@ -0,0 +1,273 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Simulator module contains the Simulator Class
+A Simulator is a Transport playing a daisy chain of visca cameras in process,
+so v_cams, the scheduler and the applications run without any hardware.
+
+The chain answers :
+    - the address set and the IF_Clear broadcasts
+    - every inquiry of constants.queries and the block inquiries
+    - the commands, with an ack and a completion on one of two sockets,
+      a full buffer error when both sockets are busy
+
+The packets take their time on the wire (9600 bauds by default) and
+pan/tilt/zoom move over time : an absolute move is completed when the head
+reaches its target, and the inquiries give the position at this time.
+
+from pyviscam.simulator import Simulator
+cams = v_cams('sim', transport=Simulator(cameras=3))
+"""
+
+import heapq
+import threading
+from time import sleep
+
+from pyviscam.cache import monotonic
+from pyviscam.constants import queries, answers, high_res_params, very_high_res_params, settings, \
+                               value_commands, block_queries, block_values, block_flags
+from pyviscam.convert import to_bytes
+from pyviscam.estimator import Estimator
+from pyviscam.pan_tilt_utils import degree_to_visca
+from pyviscam.transport import Transport
+
+
+def nibbles(value, size=4):
+    """
+    Return a value written a nibble per byte, msb first
+    """
+    return bytes(bytearray((int(value) >> (4 * shift)) & 0x0f for shift in range(size - 1, -1, -1)))
+
+
+def _default(name):
+    codes = answers.get(name)
+    if not codes:
+        return 0
+    for code, value in sorted(codes.items()):
+        if value is True:
+            return code
+    return min(codes)
+
+
+class SimulatedCamera(object):
+    """
+    State of a camera of the chain
+        :latency is the time to complete a command that does not move the head (seconds)
+        :model is the model code given by the version inquiry
+    """
+    def __init__(self, address, latency=0.03, model=0x0000):
+        super(SimulatedCamera, self).__init__()
+        self.address = address
+        self.latency = latency
+        self.model = model
+        # parameter -> raw code, as written in the reply
+        self.codes = dict((name, _default(name)) for name in queries)
+        # pan/tilt/zoom follow the commands, without any drift
+        self.motion = Estimator(drift=0, accuracy=0)
+        self.motion.correct('pan_tilt', [0, 0], monotonic())
+        self.motion.correct('zoom', 0, monotonic())
+        # socket -> completion time
+        self.sockets = {}
+
+    def data(self, name, now):
+        """
+        Return the data of the reply to an inquiry
+        """
+        if name == 'pan_tilt':
+            position = self.motion.position(now)
+            return nibbles(degree_to_visca(position['pan'][0], 'pan')) + \
+                   nibbles(degree_to_visca(position['tilt'][0], 'tilt'))
+        elif name == 'zoom':
+            return nibbles(round(self.motion.position(now)['zoom'][0]))
+        elif name == 'version':
+            # sony, model, rom version, 2 sockets
+            return bytes(bytearray([0x00, 0x01, self.model >> 8, self.model & 0xff, 0x01, 0x00, 0x02]))
+        elif name in ('color_gain', 'color_hue'):
+            return b'\x00\x00\x00' + bytes(bytearray([self.codes[name]]))
+        elif name in high_res_params or name in very_high_res_params:
+            return nibbles(self.codes[name])
+        return bytes(bytearray([self.codes[name]]))
+
+    def block(self, name, now):
+        """
+        Return the data of the reply to a block inquiry
+        """
+        self.codes['zoom'] = round(self.motion.position(now)['zoom'][0])
+        data = bytearray(13)
+        for function, offset, size, shift in block_values[name]:
+            code = self.codes[function] >> (4 * shift)
+            if size == 1:
+                data[offset] = code & 0xff
+            else:
+                data[offset:offset + size] = nibbles(code, size)
+        for function, offset, mask, codes in block_flags[name]:
+            bits = self.codes[function]
+            if codes is not None:
+                bits = dict((code, bit) for bit, code in codes.items()).get(bits, 0)
+            shift = 0
+            while not (mask >> shift) & 1:
+                shift += 1
+            data[offset] |= (bits << shift) & mask
+        return bytes(data)
+
+    def command(self, message, now):
+        """
+        Execute a command message (without header)
+            :Return the time it takes
+        """
+        for size in (5, 4, 3):
+            setter = _setters.get(message[:size])
+            if setter is not None:
+                break
+        if setter is not None:
+            name, kind = setter
+            if kind == 'code' and len(message) > size:
+                self.codes['video_next' if name == 'video' else name] = bytearray(message)[size]
+            elif len(message) >= size + 4:
+                self.codes[name] = int(''.join('%x' % (byte & 0x0f) for byte in bytearray(message[size:size + 4])), 16)
+        if message[:3] == b'\x01\x06\x05':
+            # reset calibrates the head and brings it home
+            message = b'\x01\x06\x04'
+        self.motion.command(message, now)
+        # moves are completed when the head reaches its target
+        duration = self.latency
+        for axis in (self.motion.pan, self.motion.tilt, self.motion.zoom):
+            if axis.target is not None and axis.speed:
+                duration = max(duration, abs(axis.target - axis.value) / axis.speed)
+        return duration
+
+
+# first bytes of a setter -> (parameter, 'code' or 'value')
+_setters = dict((to_bytes(prefix), (name, 'code')) for name, prefix in settings.items())
+_setters.update((to_bytes(prefix), (name, 'value')) for name, prefix in value_commands.items())
+
+# inquiry message -> parameter
+_inquiries = dict((b'\x09' + to_bytes(query), name) for name, query in queries.items())
+_blocks = dict((b'\x09' + to_bytes(query), name) for name, query in block_queries.items())
+
+
+class Simulator(Transport):
+    """
+    Transport to a simulated daisy chain of cameras
+        :cameras is the number of cameras on the chain
+        :latency is the time to complete a command that does not move the head (seconds)
+        :inquiry_latency is the time to answer an inquiry (seconds)
+        :baudrate paces the packets on the wire, None for no pacing
+    """
+    def __init__(self, cameras=1, latency=0.03, inquiry_latency=0.005, baudrate=9600):
+        super(Simulator, self).__init__()
+        self.cameras = [SimulatedCamera(address, latency) for address in range(1, cameras + 1)]
+        self.inquiry_latency = inquiry_latency
+        self.baudrate = baudrate
+        self._condition = threading.Condition()
+        # (time, order, packet) of the replies
+        self._replies = []
+        self._order = 0
+        # time the reply line is free
+        self._line = 0
+        self._open = False
+        # packets written and replies read
+        self.written = 0
+        self.read = 0
+
+    def _wire(self, packet):
+        """
+        Return the time to send a packet : 10 bits a byte
+        """
+        if not self.baudrate:
+            return 0
+        return len(packet) * 10.0 / self.baudrate
+
+    def open(self, address):
+        with self._condition:
+            self._open = True
+        return True
+
+    def close(self):
+        with self._condition:
+            self._open = False
+            self._replies = []
+            self._condition.notify_all()
+
+    def _reply(self, packet, ready):
+        with self._condition:
+            heapq.heappush(self._replies, (ready, self._order, packet))
+            self._order += 1
+            self._condition.notify_all()
+
+    def write_packet(self, packet):
+        if not self._open:
+            return False
+        packet = bytes(packet)
+        wire = self._wire(packet)
+        if wire:
+            sleep(wire)
+        self.written += 1
+        now = monotonic()
+        if packet == b'\x88\x30\x01\xff':
+            # address set : the cameras take the next addresses
+            self._reply(bytes(bytearray([0x88, 0x30, len(self.cameras) + 1, 0xff])), now)
+            return True
+        elif packet == b'\x88\x01\x00\x01\xff':
+            # IF_Clear goes through the chain
+            self._reply(packet, now)
+            return True
+        address = bytearray(packet)[0] & 0x07
+        if address < 1 or address > len(self.cameras) or len(packet) < 3:
+            # nobody answers
+            return True
+        camera = self.cameras[address - 1]
+        header = bytes(bytearray([(8 + address) << 4]))
+        message = packet[1:-1]
+        if message[:1] == b'\x09':
+            name = _inquiries.get(message)
+            ready = now + self.inquiry_latency
+            if name is not None:
+                self._reply(header + b'\x50' + camera.data(name, ready) + b'\xff', ready)
+            elif message in _blocks:
+                self._reply(header + b'\x50' + camera.block(_blocks[message], ready) + b'\xff', ready)
+            else:
+                # syntax error
+                self._reply(header + b'\x60\x02\xff', ready)
+            return True
+        # a command takes one of the two sockets until its completion
+        for socket, done in list(camera.sockets.items()):
+            if done <= now:
+                del camera.sockets[socket]
+        free = set([1, 2]) - set(camera.sockets)
+        if not free:
+            self._reply(header + b'\x60\x03\xff', now)
+            return True
+        socket = min(free)
+        done = now + camera.command(message, now)
+        camera.sockets[socket] = done
+        self._reply(header + bytes(bytearray([0x40 | socket, 0xff])), now)
+        self._reply(header + bytes(bytearray([0x50 | socket, 0xff])), done)
+        return True
+
+    def recv_packet(self):
+        """
+        Return the next reply, when it has been sent on the wire
+        """
+        deadline = monotonic() + 0.05
+        with self._condition:
+            while True:
+                if not self._open:
+                    return False
+                now = monotonic()
+                if self._replies:
+                    ready, order, packet = self._replies[0]
+                    # replies share the line back to the controller
+                    arrival = max(ready, self._line) + self._wire(packet)
+                    if arrival <= now:
+                        heapq.heappop(self._replies)
+                        self._line = arrival
+                        self.read += 1
+                        return packet
+                    wake = min(arrival, deadline)
+                else:
+                    wake = deadline
+                if now >= deadline:
+                    return b''
+                self._condition.wait(wake - now)
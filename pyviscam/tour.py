@@ -0,0 +1,226 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tour module contains the Tour Class
+A Tour runs a camera along keyframes : the poses between two keyframes
+are interpolated and streamed as absolute positions at a fixed rate.
+
+Each frame has a deadline on a monotonic clock. A clock thread posts each
+frame when its deadline is reached, it never waits for the camera.
+A sender thread writes the latest frame posted as soon as the camera has
+acked the previous one, the frames posted in between are skipped (like
+pyviscam.drive.DriveChannel), so the camera never plays a backlog of old poses.
+
+# (time, pan, tilt, zoom, focus), None leaves an axis alone
+tour = Tour(cam, [(0, -30, 0, 0, None), (4, 30, 10, 2000, None), (6, 0, 0, 0, None)])
+tour.start()
+tour.join()
+print(tour.report())
+"""
+
+import logging
+import threading
+from bisect import bisect_right
+from time import sleep
+
+from pyviscam.cache import monotonic
+from pyviscam.exceptions import ViscaTimeout
+from pyviscam.pan_tilt_utils import degrees_to_visca
+
+logger = logging.getLogger(__name__)
+
+AXES = ('pan', 'tilt', 'zoom', 'focus')
+
+
+def interpolate(keyframes, times, axis):
+    """
+    Return the values of an axis at some times, linear between the keyframes
+        :keyframes are (time, pan, tilt, zoom, focus) sorted by time
+    """
+    index = AXES.index(axis) + 1
+    keys = [keyframe[0] for keyframe in keyframes]
+    values = [keyframe[index] for keyframe in keyframes]
+    result = []
+    for time in times:
+        right = bisect_right(keys, time)
+        if right == 0:
+            result.append(values[0])
+        elif right == len(keys):
+            result.append(values[-1])
+        else:
+            left = right - 1
+            ratio = float(time - keys[left]) / (keys[right] - keys[left])
+            result.append(values[left] + (values[right] - values[left]) * ratio)
+    return result
+
+
+class Tour(object):
+    """
+    Run a camera along keyframes
+        :keyframes are (time, pan, tilt, zoom, focus), time in seconds from the start,
+         pan/tilt in degrees, zoom/focus in visca positions, None leaves an axis alone
+        :rate is the number of poses sent per second
+        :pan_speed 1..24, tilt_speed 1..20 default to the speeds of the camera
+    """
+    def __init__(self, camera, keyframes, rate=10, pan_speed=None, tilt_speed=None):
+        super(Tour, self).__init__()
+        self.camera = camera
+        self.keyframes = sorted(keyframes, key=lambda keyframe: keyframe[0])
+        self.rate = rate
+        self.pan_speed = pan_speed or camera.pan_speed
+        self.tilt_speed = tilt_speed or camera.tilt_speed
+        self.frames = self._compile()
+        # lateness of each frame sent, when it is written (seconds)
+        self.jitter = []
+        self.skipped = 0
+        # poses the camera has not acked in time
+        self.timeouts = 0
+        self._running = False
+        self._thread = None
+        self._condition = threading.Condition()
+        # latest frame posted, not sent yet : (deadline, pose)
+        self._frame = None
+        # True while the clock posts frames
+        self._ticking = False
+
+    def _compile(self):
+        """
+        Return the frames : (time, template -> values)
+        """
+        duration = self.keyframes[-1][0] - self.keyframes[0][0]
+        count = int(duration * self.rate) + 1
+        start = self.keyframes[0][0]
+        times = [start + float(index) / self.rate for index in range(count)]
+        if times[-1] < start + duration:
+            times.append(start + duration)
+        # an axis is driven if every keyframe gives it
+        axes = dict((axis, interpolate(self.keyframes, times, axis)) for axis in AXES
+                    if all(keyframe[AXES.index(axis) + 1] is not None for keyframe in self.keyframes))
+        if 'pan' in axes and 'tilt' in axes:
+            axes['pan'] = degrees_to_visca(axes['pan'], 'pan')
+            axes['tilt'] = degrees_to_visca(axes['tilt'], 'tilt')
+        else:
+            axes.pop('pan', None)
+            axes.pop('tilt', None)
+        frames = []
+        for index, time in enumerate(times):
+            pose = {}
+            if 'pan' in axes:
+                pose['pan_tilt'] = (self.pan_speed, self.tilt_speed,
+                                    int(axes['pan'][index]), int(axes['tilt'][index]))
+            for axis in ('zoom', 'focus'):
+                if axis in axes:
+                    pose[axis] = (int(axes[axis][index]),)
+            frames.append((time - start, pose))
+        return frames
+
+    def start(self):
+        """
+        Run the tour in a thread
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._running = True
+            self._thread = threading.Thread(target=self.run, name='pyviscam-tour')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the tour, the camera stays where it is
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self.join()
+
+    def join(self, timeout=None):
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def run(self):
+        """
+        Run the tour, return when it is over
+        """
+        self._running = True
+        self.jitter = []
+        self.skipped = 0
+        self.timeouts = 0
+        self._frame = None
+        self._ticking = True
+        sender = threading.Thread(target=self._send, name='pyviscam-tour-sender')
+        sender.daemon = True
+        sender.start()
+        start = monotonic()
+        index = 0
+        while self._running and index < len(self.frames):
+            deadline = start + self.frames[index][0]
+            delay = deadline - monotonic()
+            if delay > 0:
+                sleep(delay)
+            now = monotonic()
+            # skip the frames already late, but never the last one
+            while index + 1 < len(self.frames) and start + self.frames[index + 1][0] <= now:
+                index += 1
+                self.skipped += 1
+            self._post(start + self.frames[index][0], self.frames[index][1])
+            index += 1
+        with self._condition:
+            self._ticking = False
+            self._condition.notify()
+        sender.join()
+        self._running = False
+
+    def _post(self, deadline, pose):
+        """
+        Post the frame due, replacing the one not sent yet
+        """
+        with self._condition:
+            if self._frame is not None:
+                self.skipped += 1
+            self._frame = (deadline, pose)
+            self._condition.notify()
+
+    def _send(self):
+        # values sent for each template, only the changes are sent
+        sent = {}
+        while True:
+            with self._condition:
+                while self._frame is None and self._ticking and self._running:
+                    self._condition.wait()
+                if self._frame is None or not self._running:
+                    return
+                (deadline, pose), self._frame = self._frame, None
+            written = None
+            for name, values in pose.items():
+                if sent.get(name) == values:
+                    continue
+                sent[name] = values
+                try:
+                    request = self.camera.send_value(name, *values).request
+                except IOError:
+                    # the bus has been closed
+                    logger.debug('tour stopped, bus closed')
+                    self._running = False
+                    return
+                except ViscaTimeout as error:
+                    # the next frame sends it again
+                    logger.error('%s', error)
+                    self.timeouts += 1
+                    del sent[name]
+                    request = error.request
+                if written is None:
+                    written = request.written
+            if written is None:
+                # nothing has changed
+                written = monotonic()
+            self.jitter.append(written - deadline)
+
+    def report(self):
+        """
+        Return the timing of the last run
+            :sent frames, skipped frames, poses not acked, mean and max jitter (seconds)
+        """
+        jitter = self.jitter or [0]
+        return {'sent': len(self.jitter), 'skipped': self.skipped, 'timeouts': self.timeouts,
+                'mean_jitter': sum(jitter) / len(jitter), 'max_jitter': max(jitter)}
@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Transport module contains the Transport Class
+A transport carries visca packets between the controller and the cameras.
+
+pyviscam.port.Serial (RS-232 / RS-422 daisy chain)
+and pyviscam.udp.UDP (VISCA over IP) are the available backends.
+v_cams and Camera only talk to the transport through this interface.
+"""
+
+from _thread import allocate_lock
+
+
+class Transport(object):
+    """
+    Base class for every transport
+    Subclasses must implement open, close, write_packet and recv_packet
+    """
+    def __init__(self):
+        self.mutex = allocate_lock()
+
+    def open(self, address):
+        """
+        Open the communication with the device(s) at address
+            :Return True if the transport is ready
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the communication
+        """
+        raise NotImplementedError
+
+    def write_packet(self, packet):
+        """
+        Write a complete visca packet (header to terminator)
+            :Return True if the packet has been written
+        """
+        raise NotImplementedError
+
+    def recv_packet(self):
+        """
+        Return the next visca packet received
+            :Return an empty packet on timeout
+            :Return False if the transport is not open
+        """
+        raise NotImplementedError
+
+    def send_packet(self, packet):
+        """
+        Write a packet and return the first reply
+            :Return None if the packet cannot be written
+        """
+        self.mutex.acquire()
+        try:
+            if not self.write_packet(packet):
+                return None
+            return self.recv_packet()
+        finally:
+            self.mutex.release()
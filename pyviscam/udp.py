@@ -0,0 +1,231 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+UDP module contains the VISCA over IP transport
+
+Each visca packet is sent in a single datagram, prefixed by an 8 bytes header:
+
+| payload type | payload length | sequence number | payload (visca packet) |
+|   2 bytes    |    2 bytes     |     4 bytes     |      1-16 bytes        |
+
+The camera replies with the sequence number of the message it answers.
+A message left unanswered is sent again with the same sequence number.
+"""
+
+import logging
+import socket
+import struct
+import threading
+from time import time
+
+from pyviscam.convert import to_bytes
+from pyviscam.transport import Transport
+
+logger = logging.getLogger(__name__)
+
+VISCA_PORT = 52381
+
+# payload types
+VISCA_COMMAND = 0x0100
+VISCA_INQUIRY = 0x0110
+VISCA_REPLY = 0x0111
+VISCA_DEVICE_SETTING = 0x0120
+CONTROL_COMMAND = 0x0200
+CONTROL_REPLY = 0x0201
+
+# control payloads
+CONTROL_RESET = b'\x01'
+CONTROL_SEQUENCE_ERROR = b'\x0f\x01'
+CONTROL_MESSAGE_ERROR = b'\x0f\x02'
+
+header = struct.Struct('>HHI')
+
+
+def parse_address(address):
+    """
+    Return the (host, port) of a camera
+        :address is 'host', 'host:port' or a (host, port) tuple
+    """
+    if isinstance(address, tuple):
+        return address
+    if ':' in address:
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address, VISCA_PORT
+
+
+def payload_type(packet):
+    """
+    Return the payload type to use for a visca packet
+    """
+    if packet[0:1] == b'\x88':
+        # address set, IF_Clear, ...
+        return VISCA_DEVICE_SETTING
+    if packet[1:2] == b'\x09':
+        return VISCA_INQUIRY
+    return VISCA_COMMAND
+
+
+class UDP(Transport):
+    """
+    VISCA over IP transport
+        :timeout is the time to wait for a reply (seconds)
+        :retransmit is the time to wait before sending a message again
+        :retries is the number of times a message is sent again
+    """
+    def __init__(self, timeout=1, retransmit=0.1, retries=5):
+        super(UDP, self).__init__()
+        self.timeout = timeout
+        self.retransmit = retransmit
+        self.retries = retries
+        self.port = None
+        self.sequence = 0
+        # sequence -> [message, tries, last send time]
+        self._unanswered = {}
+        # the reader and the writer threads both use the sequence and the unanswered messages
+        self._lock = threading.Lock()
+
+    def open(self, address):
+        """
+        Open the communication with the camera
+            :address is 'host', 'host:port' or a (host, port) tuple
+        """
+        host, port = parse_address(address)
+        self.mutex.acquire()
+        try:
+            if self.port is None:
+                try:
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    sock.settimeout(self.retransmit)
+                    sock.connect((host, port))
+                except (OSError, socket.error):
+                    logger.error('ERROR 16 - cannot reach %s:%s', host, port)
+                    return False
+                self.port = sock
+                self.portname = (host, port)
+            self._reset_sequence()
+            return True
+        finally:
+            self.mutex.release()
+
+    def close(self):
+        if self.port:
+            self.port.close()
+            self.port = None
+        with self._lock:
+            self._unanswered.clear()
+
+    def _reset_sequence(self, wait=True):
+        """
+        Ask the camera to reset its sequence number
+            :wait for the camera to acknowledge the reset
+        """
+        with self._lock:
+            self.sequence = 0
+            self._unanswered.clear()
+            self._send(CONTROL_COMMAND, CONTROL_RESET)
+        deadline = time() + self.timeout
+        while wait and time() < deadline:
+            try:
+                message = self.port.recv(1024)
+            except socket.timeout:
+                self._retransmit()
+                continue
+            except (OSError, socket.error):
+                continue
+            payload_type, length, sequence = header.unpack(message[:header.size])
+            if payload_type == CONTROL_REPLY and message[header.size:] == CONTROL_RESET:
+                break
+        with self._lock:
+            self._unanswered.clear()
+
+    def _send(self, payload_type, payload):
+        """
+        Send a message with the current sequence number, the lock must be held
+        """
+        message = header.pack(payload_type, len(payload), self.sequence) + payload
+        self._unanswered[self.sequence] = [message, 0, time()]
+        self.port.send(message)
+
+    def write_packet(self, packet):
+        if not self.port:
+            logger.error('ERROR 15 - no udp socket')
+            return False
+        packet = to_bytes(packet)
+        with self._lock:
+            self.sequence = (self.sequence + 1) & 0xffffffff
+            self._send(payload_type(packet), packet)
+        return True
+
+    def _retransmit(self):
+        """
+        Send again the messages left unanswered
+            :Return False when there is nothing left to wait for
+        """
+        now = time()
+        with self._lock:
+            for sequence in list(self._unanswered):
+                pending = self._unanswered[sequence]
+                if now - pending[2] < self.retransmit:
+                    continue
+                if pending[1] >= self.retries:
+                    del self._unanswered[sequence]
+                    logger.error('ERROR 17 - message %i has not been answered', sequence)
+                    continue
+                pending[1] += 1
+                pending[2] = now
+                self.port.send(pending[0])
+            return bool(self._unanswered)
+
+    def recv_packet(self, extra_title=None):
+        if not self.port:
+            return False
+        deadline = time() + self.timeout
+        while True:
+            try:
+                message = self.port.recv(1024)
+            except socket.timeout:
+                if self._retransmit() or time() < deadline:
+                    continue
+                return b''
+            except (OSError, socket.error):
+                if self.port is None:
+                    # closed
+                    return False
+                # the camera is not listening (ICMP port unreachable)
+                if time() < deadline:
+                    continue
+                return b''
+            if len(message) < header.size:
+                continue
+            payload_type, length, sequence = header.unpack(message[:header.size])
+            payload = message[header.size:header.size + length]
+            if payload_type == CONTROL_REPLY:
+                if payload == CONTROL_SEQUENCE_ERROR:
+                    logger.error('ERROR 18 - sequence number refused, reset it')
+                    self._resend()
+                    continue
+                with self._lock:
+                    self._unanswered.pop(sequence, None)
+                if payload == CONTROL_MESSAGE_ERROR:
+                    logger.error('ERROR 19 - message %i has been refused', sequence)
+                continue
+            with self._lock:
+                self._unanswered.pop(sequence, None)
+            return payload
+
+    def _resend(self):
+        """
+        Reset the sequence number and send again the messages left unanswered
+        The transport mutex keeps the writer away until they are all sent
+        """
+        self.mutex.acquire()
+        try:
+            with self._lock:
+                unanswered = [pending[0] for pending in self._unanswered.values()]
+            self._reset_sequence(wait=False)
+            for message in unanswered:
+                self.write_packet(message[header.size:])
+        finally:
+            self.mutex.release()
@@ -5,6 +5,7 @@ from distutils.core import setup
 setup(
   name = 'pyviscam',
   packages = ['pyviscam'], 
+  package_data = {'pyviscam': ['profiles/*.json']},
   version = '0.0.5',
   description = 'Control camera through Visca protocol',
   author = 'Pixel Stereo',
@@ -16,8 +17,8 @@ setup(
     'License :: OSI Approved :: GNU General Public License v3 or later (GPLv3+)',
     'Natural Language :: English',
     'Operating System :: OS Independent',
-    'Programming Language :: Python :: 2.7',
-    'Programming Language :: Python :: 3.4',
+    'Programming Language :: Python :: 3',
+    'Programming Language :: Python :: 3 :: Only',
     'Topic :: Software Development :: Libraries :: Python Modules'
     ],
 )
@@ -0,0 +1,122 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+
+from pyviscam.aio import AsyncBus, AsyncTransport, AsyncUDP
+from pyviscam.demux import Router
+from pyviscam.exceptions import AckTimeout
+
+from test_udp import StandIn
+
+
+class TestAsyncUDP(unittest.TestCase):
+    def setUp(self):
+        self.camera = StandIn()
+        self.camera.start()
+
+    def tearDown(self):
+        self.camera.running = False
+        self.camera.join()
+
+    def test_set_and_query(self):
+        async def scenario():
+            bus = AsyncBus(AsyncUDP(retransmit=0.02))
+            cams = await bus.reset(self.camera.address)
+            cam = cams[0]
+            power = await cam.query('power')
+            zoom = await cam.set('zoom', 2000)
+            home = await cam.home()
+            bus.close()
+            return power, zoom, home
+        self.assertEqual(asyncio.run(scenario()), (True, True, True))
+        self.assertIn(b'\x81\x01\x04\x47\x00\x07\x0d\x00\xff', self.camera.received)
+
+
+    def test_snapshot(self):
+        async def scenario():
+            bus = AsyncBus(AsyncUDP(retransmit=0.02))
+            cam = (await bus.reset(self.camera.address))[0]
+            snapshot = await cam.snapshot(['power', 'zoom', 'nothing'])
+            bus.close()
+            return cam, snapshot
+        cam, snapshot = asyncio.run(scenario())
+        self.assertEqual(dict(snapshot), {'power': True})
+        # the stand-in answers a single byte to the zoom
+        self.assertEqual(snapshot.errors, {'zoom': 'cannot translate', 'nothing': 'not implemented'})
+        self.assertRaises(TypeError, cam.send_value, 'zoom', 2000)
+        self.assertRaises(TypeError, cam.drive, 1, 0)
+
+    def test_cache_and_listeners(self):
+        async def scenario():
+            bus = AsyncBus(AsyncUDP(retransmit=0.02), cache_ttl=10)
+            cam = (await bus.reset(self.camera.address))[0]
+            heard = []
+            cam.listeners.append(lambda cam, message: heard.append(message))
+            values = [await cam.query('power'), await cam.query('power')]
+            await cam.set('power', True)
+            # the command makes the answer stale
+            values.append(await cam.query('power'))
+            bus.close()
+            return values, heard
+        values, heard = asyncio.run(scenario())
+        self.assertEqual(values, [True, True, True])
+        self.assertEqual(heard, [b'\x01\x04\x00\x02'])
+        self.assertEqual(self.camera.received.count(b'\x81\x09\x04\x00\xff'), 2)
+
+
+class Recorder(AsyncTransport):
+    """
+    Keeps the written packets, the replies are fed by the test
+    """
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.written = []
+
+    def write_packet(self, packet):
+        self.written.append(packet)
+        return True
+
+
+class TestFlowControl(unittest.TestCase):
+    def test_one_unacked_packet(self):
+        power, zoom, other = b'\x81\x09\x04\x00\xff', b'\x81\x09\x04\x47\xff', b'\x82\x09\x04\x00\xff'
+
+        async def scenario():
+            bus = AsyncBus(Recorder())
+            bus.router = bus.transport.router = Router(asyncio.get_running_loop().create_future)
+            tasks = [asyncio.ensure_future(bus.submit(packet)) for packet in (power, zoom, other)]
+            await asyncio.sleep(0.01)
+            # the zoom waits for the answer to the power
+            before = list(bus.transport.written)
+            bus.router.feed(b'\x90\x50\x02\xff')
+            await asyncio.gather(*tasks)
+            return before, bus.transport.written
+        before, after = asyncio.run(scenario())
+        self.assertEqual(before, [power, other])
+        self.assertEqual(after, [power, other, zoom])
+
+    def test_late_reply(self):
+        bright, aperture = b'\x81\x09\x04\x4d\xff', b'\x81\x09\x04\x42\xff'
+
+        async def scenario():
+            bus = AsyncBus(Recorder())
+            bus.router = bus.transport.router = Router(asyncio.get_running_loop().create_future,
+                                                        {'ack': 0.05, 'inquiry': 0.05})
+            request = await bus.submit(bright)
+            with self.assertRaises(AckTimeout):
+                await bus.wait(request, request.done)
+            task = asyncio.ensure_future(bus.submit(aperture))
+            await asyncio.sleep(0.01)
+            # the answer to bright may still come, aperture waits
+            before = list(bus.transport.written)
+            await task
+            return before, bus.transport.written
+        before, after = asyncio.run(scenario())
+        self.assertEqual(before, [bright])
+        self.assertEqual(after, [bright, aperture])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import tempfile
+import unittest
+
+from pyviscam.bench import main, percentiles
+
+
+class TestBench(unittest.TestCase):
+    def test_percentiles(self):
+        stats = percentiles([float(value) for value in range(1, 101)])
+        self.assertEqual(stats['p50'], 51)
+        self.assertEqual(stats['p99'], 100)
+        self.assertEqual(percentiles([]), {'count': 0})
+
+    def test_run(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        try:
+            main(['--cameras', '2', '--baudrate', '0', '--count', '5', '--duration', '0.2',
+                  '--output', path])
+            with open(path) as output:
+                results = json.load(output)
+        finally:
+            os.remove(path)
+        self.assertEqual(results['command']['count'], 5)
+        self.assertEqual(results['inquiries']['inquiries'], 10)
+        self.assertEqual(results['snapshot']['errors'], 0)
+        self.assertGreater(results['drive']['sent'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,306 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+from time import sleep, time
+
+from queue import Queue, Empty
+
+from pyviscam import packets
+from pyviscam.broadcast import v_cams
+from pyviscam.cache import QueryCache, MISSING, monotonic
+from pyviscam.exceptions import AckTimeout
+from pyviscam.transport import Transport
+
+
+class FakeChain(Transport):
+    """
+    a daisy chain of cameras : commands are acked at once
+    and completed after the delay of the camera
+    """
+    def __init__(self, delays=(0.1,)):
+        super(FakeChain, self).__init__()
+        self.delays = delays
+        self.replies = Queue()
+        self.sockets = dict((address, set()) for address in range(1, len(delays) + 1))
+        self.busiest = 0
+        self.written = []
+        # inquiry (without header) -> data of the reply
+        self.inquiries = {}
+
+    def open(self, address):
+        return True
+
+    def close(self):
+        pass
+
+    def complete(self, address, socket):
+        self.sockets[address].discard(socket)
+        self.replies.put(bytes(bytearray([(8 + address) << 4, 0x50 | socket, 0xff])))
+
+    def write_packet(self, packet):
+        self.written.append(packet)
+        if packet == b'\x88\x30\x01\xff':
+            self.replies.put(bytes(bytearray([0x88, 0x30, len(self.delays) + 1, 0xff])))
+            return True
+        elif packet == b'\x88\x01\x00\x01\xff':
+            self.replies.put(packet)
+            return True
+        address = bytearray(packet)[0] & 0x07
+        header = (8 + address) << 4
+        if packet[1:2] == b'\x09':
+            data = self.inquiries.get(packet[1:-1], b'\x02')
+            self.replies.put(bytes(bytearray([header, 0x50])) + data + b'\xff')
+            return True
+        sockets = self.sockets[address]
+        free = set([1, 2]) - sockets
+        if not free:
+            self.replies.put(bytes(bytearray([header, 0x60, 0x03, 0xff])))
+            return True
+        socket = min(free)
+        sockets.add(socket)
+        self.busiest = max(self.busiest, len(sockets))
+        self.replies.put(bytes(bytearray([header, 0x40 | socket, 0xff])))
+        threading.Timer(self.delays[address - 1], self.complete, (address, socket)).start()
+        return True
+
+    def recv_packet(self):
+        try:
+            return self.replies.get(timeout=0.05)
+        except Empty:
+            return b''
+
+
+class TestSockets(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain()
+        self.cams = v_cams('fake', transport=self.transport)
+        self.cam = self.cams.get_instances()[0]
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_blocking_command(self):
+        self.assertTrue(self.cam.home())
+
+    def test_settings(self):
+        self.cam.WB = 'outdoor'
+        self.assertEqual(self.transport.written[-1], b'\x81\x01\x04\x35\x02\xff')
+        self.cam.shutter = '1/100'
+        self.assertEqual(self.transport.written[-1], b'\x81\x01\x04\x4a\x00\x00\x00\x08\xff')
+        written = len(self.transport.written)
+        self.assertFalse(self.cam._cmd_setting('WB', 'sunset'))
+        self.assertEqual(len(self.transport.written), written)
+
+    def test_move(self):
+        self.assertTrue(self.cam.move_to(0, 0, pan_speed=0x18))
+        self.assertEqual(self.transport.written[-1], b'\x81\x01\x06\x02\x18\x05' + b'\x00' * 8 + b'\xff')
+        self.assertTrue(self.cam.move_by(-10, 0))
+        packet = bytearray(self.transport.written[-1])
+        self.assertEqual(packet[:6], bytearray(b'\x81\x01\x06\x03\x05\x05'))
+        self.assertEqual(packet[6:8], bytearray(b'\x0f\x0e'))
+        self.assertEqual(packet[10:14], bytearray(4))
+
+    def test_move_by_magnitude(self):
+        def counts(packet, offset):
+            value = int(''.join('%x' % byte for byte in bytearray(packet[offset:offset + 4])), 16)
+            return value - 0x10000 if value & 0x8000 else value
+        for pan, tilt in ((5, 5), (-5, -5)):
+            self.assertTrue(self.cam.move_by(pan, tilt))
+            packet = self.transport.written[-1]
+            # 7708 counts for 170 degrees, 4080 for 90, on both sides
+            self.assertEqual(counts(packet, 6), 227 * pan // 5)
+            self.assertEqual(counts(packet, 10), 227 * tilt // 5)
+
+    def test_concurrent_commands(self):
+        start = time()
+        with self.cam.concurrent() as commands:
+            self.cam.zoom = 1000
+            self.cam.focus = 1000
+            self.cam.home()
+        elapsed = time() - start
+        self.assertEqual(len(commands), 3)
+        self.assertTrue(all(command.wait() for command in commands))
+        self.assertEqual(set(command.socket for command in commands[:2]), set([1, 2]))
+        # the third command waits for a free socket, it is never refused
+        self.assertEqual(self.transport.busiest, 2)
+        self.assertLess(elapsed, 0.3)
+
+
+class TestUnplugged(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.01, 0.01))
+        self.cams = v_cams('fake', transport=self.transport, timeouts={'ack': 0.1, 'inquiry': 0.1})
+        self.cams.get_instances()
+        write_packet = self.transport.write_packet
+        # the first camera is gone
+        self.transport.write_packet = lambda packet: packet[0:1] == b'\x81' or write_packet(packet)
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_timeouts(self):
+        cam, other = self.cams.get_instances()
+        start = time()
+        self.assertRaises(AckTimeout, cam.home)
+        self.assertRaises(AckTimeout, cam._query, 'power')
+        self.assertEqual(cam.snapshot(['power', 'zoom']).errors, {'power': 'no reply', 'zoom': 'no reply'})
+        self.assertLess(time() - start, 1)
+        # the other camera of the chain is still there
+        self.assertTrue(other.home())
+
+    def test_sockets_freed(self):
+        cams = v_cams('fake', transport=FakeChain(delays=(2,)),
+                      timeouts={'ack': 0.1, 'long': 0.3, 'queue': 1})
+        try:
+            cam = cams.get_instances()[0]
+            # both sockets busy, nobody waits for the completions
+            cam.send_value('pan_tilt', 0x18, 0x14, 0x100, 0x100)
+            cam.send_command(b'\x01\x06\x04')
+            cams.transport.write_packet = lambda packet: True
+            start = time()
+            self.assertRaises(AckTimeout, cam.home)
+            self.assertLess(time() - start, 1)
+        finally:
+            cams.close()
+
+
+class TestDrive(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.05,))
+        self.cams = v_cams('fake', transport=self.transport)
+        self.cam = self.cams.get_instances()[0]
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_latest_vector_wins(self):
+        for speed in range(1, 25):
+            self.cam.drive(-speed, 0)
+        self.cam.drive(0, 0)
+        sleep(0.3)
+        drives = [packet for packet in self.transport.written if packet[1:4] == b'\x01\x06\x01']
+        self.assertLess(len(drives), 5)
+        self.assertEqual(drives[-1], b'\x81\x01\x06\x01\x01\x01\x03\x03\xff')
+        self.assertGreater(self.cam._drive.dropped, 20)
+
+    def test_close(self):
+        self.cam.drive(1, 0)
+        thread = self.cam._drive._thread
+        self.cams.close()
+        self.assertFalse(thread.is_alive())
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.5, 0.01))
+        self.cams = v_cams('fake', transport=self.transport)
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_addresses(self):
+        slow, fast = self.cams.get_instances()
+        self.assertEqual((slow.address, fast.address), (1, 2))
+        self.assertTrue(fast.home())
+        self.assertEqual(self.transport.written[-1], b'\x82\x01\x06\x04\xff')
+
+    def test_compiled_packets(self):
+        slow, fast = self.cams.get_instances()
+        fast.zoom = 0x1234
+        self.assertEqual(self.transport.written[-1], b'\x82\x01\x04\x47\x01\x02\x03\x04\xff')
+        fast.home()
+        self.assertIs(self.transport.written[-1], packets.commands[2][b'\x01\x06\x04'])
+
+    def test_snapshot(self):
+        cam = self.cams.get_instances()[1]
+        snapshot = cam.snapshot(['power', 'focus_auto', 'pan_tilt', 'unknown'])
+        self.assertEqual(snapshot, {'power': True, 'focus_auto': True})
+        self.assertEqual(sorted(snapshot.errors), ['pan_tilt', 'unknown'])
+
+    def test_slow_camera_does_not_block_the_bus(self):
+        slow, fast = self.cams.get_instances()
+        with slow.concurrent():
+            slow.zoom = 1000
+            slow.focus = 1000
+            # both sockets of the slow camera are busy now
+            waiting = threading.Thread(target=slow.home)
+            waiting.start()
+            start = time()
+            for _ in range(5):
+                self.assertTrue(fast.home())
+            self.assertLess(time() - start, 0.3)
+            self.assertTrue(waiting.is_alive())
+        waiting.join()
+        self.assertEqual(self.transport.busiest, 2)
+
+    def test_reset_cannot_open(self):
+        dispatcher = self.cams.dispatcher
+        opened = []
+
+        def open(address):
+            # the old dispatcher does not read the transport anymore
+            opened.append(dispatcher._thread)
+            return False
+        self.transport.open = open
+        self.cams.reset('gone')
+        self.assertEqual(opened, [None])
+        self.assertIsNone(self.cams.dispatcher)
+        self.assertEqual(self.cams.get_instances(), [])
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.01,))
+        self.cams = v_cams('fake', transport=self.transport, cache_ttl=10)
+        self.cam = self.cams.get_instances()[0]
+
+    def tearDown(self):
+        self.cams.close()
+
+    def inquiries(self):
+        # the version is asked once by v_cams, to pick the profile
+        return len([packet for packet in self.transport.written
+                    if packet[1:2] == b'\x09' and packet[2:4] != b'\x00\x02'])
+
+    def test_answers_are_cached(self):
+        self.assertEqual(self.cam.power, True)
+        self.assertEqual(self.cam.power, True)
+        self.assertEqual(self.inquiries(), 1)
+        self.assertEqual(self.cam.cache.hits, 1)
+
+    def test_lens_block(self):
+        self.transport.inquiries[b'\x09\x7e\x7e\x00'] = \
+            b'\x01\x02\x03\x04\x0a\x0b\x00\x00\x02\x00\x00\x0b\x00'
+        lens = self.cam.block('lens')
+        self.assertEqual(lens['zoom'], 0x1234)
+        self.assertEqual(lens['focus_nearlimit'], 0xab00)
+        self.assertEqual(lens['focus'], 0x0020)
+        self.assertEqual(lens['focus_auto'], True)
+        self.assertEqual(lens['zoom_digital'], True)
+        self.assertEqual(lens['focus_auto_mode'], 'interval')
+        self.assertEqual(self.cam.zoom, 0x1234)
+        self.assertEqual(self.inquiries(), 1)
+
+    def test_setter_invalidates(self):
+        self.assertEqual(self.cam.power, True)
+        self.cam.power = True
+        self.assertEqual(self.cam.power, True)
+        self.assertEqual(self.inquiries(), 2)
+
+    def test_drive_holds_the_cache(self):
+        cache = QueryCache(10)
+        since = monotonic()
+        cache.command(b'\x01\x04\x07\x23')
+        cache.put('zoom', 100, since)
+        self.assertIs(cache.get('zoom'), MISSING)
+        cache.command(b'\x01\x04\x07\x00')
+        cache.put('zoom', 200, monotonic())
+        self.assertEqual(cache.get('zoom'), 200)
+        cache.command(b'\x01\x04\x00\x03')
+        self.assertIs(cache.get('zoom'), MISSING)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pyviscam.codec import decoder, encoder
+
+
+class TestDecoder(unittest.TestCase):
+    def test_answers(self):
+        self.assertEqual(decoder.decode('WB', b'\x90\x50\x00\xff'), 'auto')
+        self.assertEqual(decoder.decode('power', b'\x90\x50\x03\xff'), False)
+        self.assertEqual(decoder.decode('NR', b'\x90\x50\x04\xff'), 4)
+
+    def test_nibbles(self):
+        self.assertEqual(decoder.decode('zoom', b'\x90\x50\x01\x02\x03\x04\xff'), 0x1234)
+        self.assertEqual(decoder.decode('shutter', b'\x90\x50\x00\x00\x01\x05\xff'), '1/10000')
+
+    def test_pan_tilt(self):
+        reply = b'\x90\x50\x00\x00\x00\x00\x00\x00\x00\x00\xff'
+        self.assertEqual(decoder.decode('pan_tilt', reply), [0, 0])
+        self.assertRaises(ValueError, decoder.decode, 'pan_tilt', b'\x90\x50\x02\xff')
+
+
+class TestEncoder(unittest.TestCase):
+    def test_enumerated(self):
+        self.assertEqual(encoder.message('WB', 'outdoor'), b'\x01\x04\x35\x02')
+        self.assertEqual(encoder.message('video', 'PAL'), b'\x01\x06\x35\x00\x0c')
+        self.assertEqual(encoder.message('WB', 'sunset'), None)
+
+    def test_switches(self):
+        self.assertEqual(encoder.message('power', True), b'\x01\x04\x00\x02')
+        self.assertEqual(encoder.message('power', 0), b'\x01\x04\x00\x03')
+
+    def test_codes(self):
+        self.assertEqual(encoder.code('shutter', '1/100'), 8)
+        self.assertEqual(encoder.code('shutter', 8), None)
+        self.assertEqual(encoder.code('shutter', 8, raw=True), 8)
+        self.assertEqual(encoder.code('iris', '42'), None)
+
+    def test_numeric_values(self):
+        # values and codes are numbers, they are never mixed up
+        self.assertEqual(encoder.code('gain_limit', 6), 4)
+        self.assertEqual(encoder.code('gain_limit', 7), None)
+        self.assertEqual(encoder.code('gain_limit', 7, raw=True), 7)
+        self.assertEqual(encoder.code('expo_compensation_amount', 9), 13)
+        self.assertEqual(encoder.code('expo_compensation_amount', 7), None)
+        self.assertEqual(encoder.message('gain_limit', 12), b'\x01\x04\x2c\x07')
+        self.assertEqual(encoder.message('power', 2, raw=True), b'\x01\x04\x00\x02')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+from time import time
+
+from pyviscam.cache import monotonic
+from pyviscam.demux import Dispatcher, Router, TIMEOUTS
+from pyviscam.exceptions import AckTimeout, CompletionTimeout
+
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+
+    def register(self, packet):
+        request = self.router.register(self.router.request(packet))
+        request.written = monotonic()
+        request.sent.set()
+        return request
+
+    def test_interleaved_cameras(self):
+        home = self.register(b'\x81\x01\x06\x04\xff')
+        zoom = self.register(b'\x82\x09\x04\x47\xff')
+        power = self.register(b'\x81\x09\x04\x00\xff')
+        self.router.feed(b'\x90\x41\xff')
+        self.router.feed(b'\xa0\x50\x01\x02\x03\x04\xff')
+        self.router.feed(b'\x90\x50\x02\xff')
+        self.router.feed(b'\x90\x51\xff')
+        self.assertEqual(home.socket, 1)
+        self.assertEqual(home.wait_ack(0), b'\x90\x41\xff')
+        self.assertEqual(home.wait(0), b'\x90\x51\xff')
+        self.assertEqual(zoom.wait(0), b'\xa0\x50\x01\x02\x03\x04\xff')
+        self.assertEqual(power.wait(0), b'\x90\x50\x02\xff')
+
+    def test_both_sockets(self):
+        first = self.register(b'\x81\x01\x06\x02\xff')
+        second = self.register(b'\x81\x01\x04\x47\xff')
+        self.router.feed(b'\x90\x41\xff')
+        self.router.feed(b'\x90\x42\xff')
+        self.router.feed(b'\x90\x52\xff')
+        self.assertEqual(second.wait(0), b'\x90\x52\xff')
+        self.assertFalse(first.done.done())
+        self.router.feed(b'\x90\x61\x04\xff')
+        self.assertEqual(first.wait(0), b'\x90\x61\x04\xff')
+
+    def test_error_instead_of_ack(self):
+        request = self.register(b'\x81\x01\x04\x99\xff')
+        self.router.feed(b'\x90\x60\x02\xff')
+        self.assertEqual(request.wait_ack(0), b'\x90\x60\x02\xff')
+        self.assertEqual(request.wait(0), b'\x90\x60\x02\xff')
+
+    def test_broadcast(self):
+        request = self.register(b'\x88\x30\x01\xff')
+        self.router.feed(b'\x88\x30\x03\xff')
+        self.assertEqual(request.wait(0), b'\x88\x30\x03\xff')
+
+
+class TestDeadline(unittest.TestCase):
+    def setUp(self):
+        self.router = Router(timeouts={'ack': 0.05, 'inquiry': 0.05, 'long': 0.1})
+
+    def register(self, packet):
+        request = self.router.register(self.router.request(packet))
+        request.written = monotonic()
+        request.sent.set()
+        return request
+
+    def test_kinds(self):
+        self.assertEqual(self.register(b'\x81\x09\x04\x47\xff').timeout, 0.05)
+        self.assertEqual(self.register(b'\x88\x30\x01\xff').timeout, TIMEOUTS['broadcast'])
+        self.assertEqual(self.register(b'\x81\x01\x04\x35\x00\xff').timeout, TIMEOUTS['command'])
+        home = self.register(b'\x81\x01\x06\x04\xff')
+        self.assertEqual((home.ack_timeout, home.timeout), (0.05, 0.1))
+
+    def test_ack_timeout(self):
+        request = self.register(b'\x81\x09\x04\x47\xff')
+        start = time()
+        self.assertRaises(AckTimeout, request.wait_ack)
+        self.assertLess(time() - start, 0.1)
+        # forgotten, the late answer goes nowhere
+        self.assertTrue(request.done.cancelled())
+
+    def test_completion_timeout(self):
+        home = self.register(b'\x81\x01\x06\x04\xff')
+        self.router.feed(b'\x90\x41\xff')
+        self.assertEqual(home.wait_ack(), b'\x90\x41\xff')
+        with self.assertRaises(CompletionTimeout) as raised:
+            home.wait()
+        self.assertIs(raised.exception.request, home)
+        self.assertIn('ERROR 12', str(raised.exception))
+
+    def test_late_reply(self):
+        bright = self.register(b'\x81\x09\x04\x4d\xff')
+        self.assertRaises(AckTimeout, bright.wait_ack)
+        aperture = self.register(b'\x81\x09\x04\x42\xff')
+        self.assertIsNotNone(self.router.late_until(1))
+        # the answer to bright comes after its deadline
+        self.router.feed(b'\x90\x50\x07\xff')
+        self.assertFalse(aperture.ack.done())
+        self.router.feed(b'\x90\x50\x03\xff')
+        self.assertEqual(aperture.wait(0), b'\x90\x50\x03\xff')
+        self.assertIsNone(self.router.late_until(1))
+
+    def test_failed_write(self):
+        class Unplugged(object):
+            mutex = threading.Lock()
+
+            def write_packet(self, packet):
+                return False
+        dispatcher = Dispatcher(Unplugged())
+        request = dispatcher.submit(b'\x81\x09\x04\x47\xff')
+        self.assertTrue(request.ack.cancelled())
+        # nothing has been written, no reply will come late
+        self.assertIsNone(request.written)
+        self.assertIsNone(dispatcher.router.late_until(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from time import sleep
+
+from pyviscam.broadcast import v_cams
+from pyviscam.estimator import Estimator
+from pyviscam.pan_tilt_utils import visca_to_degree
+from test_camera import FakeChain
+
+
+class TestEstimator(unittest.TestCase):
+    def setUp(self):
+        self.estimator = Estimator(pan_rate=100, tilt_rate=90, drift=0.1)
+        self.estimator.correct('pan_tilt', [0, 0], 0)
+
+    def test_drive(self):
+        # right at full speed, tilt stopped
+        self.estimator.command(b'\x01\x06\x01\x18\x14\x02\x03', now=0)
+        position = self.estimator.position(now=0.5)
+        self.assertAlmostEqual(position['pan'][0], 50)
+        self.assertAlmostEqual(position['pan'][1], 5)
+        self.assertEqual(position['tilt'], (0, 0))
+        self.estimator.command(b'\x01\x06\x01\x18\x14\x03\x03', now=1)
+        self.assertAlmostEqual(self.estimator.position(now=2)['pan'][0], 100)
+        # the head stops at its limit
+        self.estimator.command(b'\x01\x06\x01\x18\x14\x02\x03', now=2)
+        self.assertAlmostEqual(self.estimator.position(now=10)['pan'][0], 170)
+
+    def test_absolute_and_home(self):
+        # pan 0x0100 at full speed
+        self.estimator.command(b'\x01\x06\x02\x18\x14\x00\x01\x00\x00\x00\x00\x00\x00', now=0)
+        pan = self.estimator.position(now=10)['pan']
+        self.assertAlmostEqual(pan[0], visca_to_degree(0x0100, 'pan'))
+        self.estimator.completed(b'\x01\x06\x02', now=10)
+        self.assertEqual(self.estimator.position(now=10)['pan'][1], 0.1)
+        self.estimator.command(b'\x01\x06\x04', now=10)
+        self.assertEqual(self.estimator.position(now=20)['pan'][0], 0)
+
+    def test_zoom_and_correction(self):
+        self.assertEqual(self.estimator.position()['zoom'], (None, None))
+        self.estimator.correct('zoom', 0, 0)
+        self.estimator.command(b'\x01\x04\x07\x27', now=0)
+        self.assertAlmostEqual(self.estimator.position(now=0.5)['zoom'][0], 4000)
+        self.estimator.correct('zoom', 3000, 0.5)
+        self.assertEqual(self.estimator.position(now=0.5)['zoom'], (3000, 0))
+        # a reset makes the pan tilt unknown
+        self.estimator.command(b'\x01\x06\x05', now=1)
+        self.assertEqual(self.estimator.position(now=1)['pan'], (None, None))
+
+
+class TestCameraEstimator(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.01,))
+        self.cams = v_cams('fake', transport=self.transport)
+        self.cam = self.cams.get_instances()[0]
+        self.cam.estimator = Estimator()
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_estimated_position(self):
+        self.transport.inquiries[b'\x09\x06\x12'] = b'\x00\x00\x00\x00\x00\x00\x00\x00'
+        self.assertEqual(self.cam.estimated_position['pan'], (None, None))
+        self.assertEqual(self.cam.pan, 0)
+        self.assertEqual(self.cam.estimated_position['pan'], (0, 0))
+        self.cam.move_to(30, 0)
+        sleep(0.05)
+        self.assertEqual(self.cam.estimated_position['pan'], (30, 0.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
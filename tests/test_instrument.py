@@ -0,0 +1,51 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pyviscam.broadcast import v_cams
+from pyviscam.instrument import Histogram, Instruments, command_name
+from pyviscam.simulator import Simulator
+
+
+class TestInstruments(unittest.TestCase):
+    def setUp(self):
+        self.cams = v_cams('sim', transport=Simulator(cameras=2, latency=0.02, baudrate=None))
+        self.events = []
+        self.cams.instruments = Instruments(sinks=[self.events.append])
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for value in [0.001] * 98 + [0.5, 2]:
+            histogram.add(value)
+        self.assertAlmostEqual(histogram.percentile(50), 0.001)
+        self.assertAlmostEqual(histogram.percentile(99), 10 ** -0.3)
+        self.assertEqual(histogram.summary()['max'], 2)
+
+    def test_command_name(self):
+        self.assertEqual(command_name(b'\x01\x04\x35\x00'), 'WB')
+        self.assertEqual(command_name(b'\x01\x04\x47\x00\x00\x00\x00'), 'zoom')
+        self.assertEqual(command_name(b'\x01\x06\x04'), 'home')
+        self.assertEqual(command_name(b'\x01\x7e\x7e\x7e'), '017e7e')
+
+    def test_report(self):
+        first, second = self.cams.get_instances()
+        first.WB = 'indoor'
+        second.zoom = 4000
+        self.assertEqual(first.power, True)
+        first.snapshot(['WB', 'AE'])
+        report = self.cams.instruments.report()
+        self.assertEqual(report[1]['WB']['done']['count'], 2)
+        self.assertEqual(report[1]['power']['errors'], 0)
+        self.assertEqual(report[1]['AE']['done']['count'], 1)
+        self.assertGreater(report[2]['zoom']['done']['p50'], 0.3)
+        self.assertEqual(self.cams.instruments.slowest(1)[0][:2], (2, 'zoom'))
+        self.assertEqual(len(self.events), 5)
+        self.assertTrue(all(event['written'] >= event['submitted'] for event in self.events))
+
+
+if __name__ == '__main__':
+    unittest.main()
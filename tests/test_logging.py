@@ -0,0 +1,39 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import unittest
+
+from pyviscam import TRACE
+from pyviscam.broadcast import v_cams
+from pyviscam.simulator import Simulator
+
+
+class TestLogging(unittest.TestCase):
+    def setUp(self):
+        self.cams = v_cams('sim', transport=Simulator(latency=0.01))
+        self.cam = self.cams.get_instances()[0]
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_trace(self):
+        with self.assertLogs('pyviscam', level=TRACE) as logs:
+            self.cam._query('power')
+        self.assertTrue(any('send power query' in line for line in logs.output))
+
+    def test_debug(self):
+        with self.assertLogs('pyviscam', level=logging.DEBUG) as logs:
+            self.cam._query('power')
+        # the frames are dumped below debug only
+        self.assertFalse(any('send power query' in line for line in logs.output))
+        self.assertTrue(any('power is' in line for line in logs.output))
+
+    def test_error(self):
+        with self.assertLogs('pyviscam', level=logging.ERROR) as logs:
+            self.assertFalse(self.cam._cmd_value('unknown', 1))
+        self.assertIn('ERROR 45', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pyviscam import pan_tilt_utils
+from pyviscam.pan_tilt_utils import degree_to_visca, visca_to_degree, degrees_to_visca, visca_to_degrees
+
+
+class TestSequences(unittest.TestCase):
+    pans = [-170, -90.5, -0.1, 0, 12.3, 170]
+    tilts = [-20, -3.3, 0, 45.6, 90]
+
+    def check(self):
+        for what, values in (('pan', self.pans), ('tilt', self.tilts)):
+            visca = [degree_to_visca(value, what) for value in values]
+            self.assertEqual(list(degrees_to_visca(values, what)), visca)
+            degrees = [visca_to_degree(value, what) for value in visca]
+            self.assertEqual(list(visca_to_degrees(visca, what)), degrees)
+
+    def test_sequences(self):
+        self.check()
+
+    def test_without_numpy(self):
+        numpy, pan_tilt_utils.numpy = pan_tilt_utils.numpy, None
+        try:
+            self.check()
+        finally:
+            pan_tilt_utils.numpy = numpy
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from time import sleep
+
+from pyviscam.broadcast import v_cams
+from test_camera import FakeChain
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.01,))
+        self.cams = v_cams('fake', transport=self.transport, poll_budget=50)
+        self.cam = self.cams.get_instances()[0]
+        self.changes = []
+
+    def tearDown(self):
+        self.cams.close()
+
+    def changed(self, camera, param, value):
+        self.changes.append((param, value))
+
+    def inquiries(self, query):
+        return len([packet for packet in self.transport.written if packet[1:-1] == query])
+
+    def test_changes_are_pushed(self):
+        self.transport.inquiries[b'\x09\x04\x47'] = b'\x00\x00\x00\x00'
+        self.transport.inquiries[b'\x09\x06\x12'] = b'\x00\x00\x00\x00\x00\x00\x00\x00'
+        self.cams.subscribe(self.cam, 'zoom', 0.1, self.changed)
+        self.cams.subscribe(self.cam, 'pan', 0.1, self.changed)
+        sleep(0.1)
+        self.transport.inquiries[b'\x09\x04\x47'] = b'\x00\x01\x00\x00'
+        sleep(0.2)
+        self.assertEqual(sorted(self.changes), [('pan', 0), ('zoom', 0), ('zoom', 0x100)])
+
+    def test_backs_off_when_idle(self):
+        self.cams.subscribe(self.cam, 'power', 0.2, self.changed)
+        sleep(1)
+        # fast polls at first, then one poll every max_staleness
+        self.assertLess(self.inquiries(b'\x09\x04\x00'), 10)
+        self.assertEqual(self.changes, [('power', True)])
+        before = self.inquiries(b'\x09\x04\x00')
+        # a command setting the parameter polls it fast again
+        self.cam.power = True
+        sleep(0.1)
+        self.assertGreater(self.inquiries(b'\x09\x04\x00'), before)
+
+    def test_bypasses_the_cache(self):
+        cams = v_cams('fake', transport=FakeChain(delays=(0.01,)), cache_ttl=10)
+        try:
+            cam = cams.get_instances()[0]
+            cams.transport.inquiries[b'\x09\x04\x47'] = b'\x00\x00\x00\x00'
+            self.assertEqual(cam.zoom, 0)
+            cams.transport.inquiries[b'\x09\x04\x47'] = b'\x00\x01\x00\x00'
+            cams.subscribe(cam, 'zoom', 0.1, self.changed)
+            sleep(0.1)
+            self.assertEqual(self.changes, [('zoom', 0x100)])
+            # the fresh value is kept for the other readers
+            self.assertEqual(cam.zoom, 0x100)
+        finally:
+            cams.close()
+
+    def test_staleness_must_be_positive(self):
+        self.assertRaises(ValueError, self.cams.subscribe, self.cam, 'zoom', 0, self.changed)
+        self.assertRaises(ValueError, self.cams.subscribe, self.cam, 'zoom', -1, self.changed)
+
+    def test_budget(self):
+        for param in ('power', 'WB', 'AE', 'focus_auto', 'backlight', 'IR', 'FX', 'gamma'):
+            self.cams.subscribe(self.cam, param, 0.02, self.changed)
+        sleep(0.5)
+        self.assertGreater(self.cams.poller.load, 1)
+        self.assertLessEqual(self.cams.poller.polls, 0.5 * 50 + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
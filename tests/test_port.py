@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from time import sleep, time
+from unittest import mock
+
+from pyviscam import port
+from pyviscam.port import Serial, detect_baudrate
+
+
+class FakePort(object):
+    """
+    stands for a pyserial port, giving back the chunks it is fed with
+    """
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    @property
+    def in_waiting(self):
+        if self.chunks:
+            return len(self.chunks[0])
+        return 0
+
+    def read(self, size=1):
+        self.reads += 1
+        if not self.chunks:
+            return b''
+        chunk = self.chunks.pop(0)
+        if len(chunk) > size:
+            self.chunks.insert(0, chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
+
+class TestRecvPacket(unittest.TestCase):
+    def make_serial(self, chunks):
+        serial = Serial()
+        serial.port = FakePort(chunks)
+        return serial
+
+    def test_split_frames(self):
+        serial = self.make_serial([b'\x90\x41\xff\x90\x51\xff\x90\x50\x02'])
+        self.assertEqual(serial.recv_packet(), b'\x90\x41\xff')
+        self.assertEqual(serial.recv_packet(), b'\x90\x51\xff')
+        self.assertEqual(serial.port.reads, 1)
+
+    def test_frame_across_reads(self):
+        serial = self.make_serial([b'\x90\x50\x00', b'\x01\x02\x03\xff'])
+        self.assertEqual(serial.recv_packet(), b'\x90\x50\x00\x01\x02\x03\xff')
+
+    def test_timeout(self):
+        serial = self.make_serial([b'\x90\x50'])
+        self.assertEqual(serial.recv_packet(), b'\x90\x50')
+        self.assertEqual(serial.recv_packet(), b'')
+
+    def test_deadline(self):
+        serial = self.make_serial([b'\x90\x50'] + [b'\x00'] * 12)
+        # a byte every 30 ms, the packet is given up after 100 ms
+        read = serial.port.read
+        serial.port.read = lambda size: sleep(0.03) or read(1)
+        start = time()
+        self.assertEqual(serial.recv_packet()[:2], b'\x90\x50')
+        self.assertLess(time() - start, 0.2)
+        self.assertTrue(serial.port.chunks)
+
+
+class CameraPort(object):
+    """
+    stands for a pyserial port to cameras set to 38400 bauds
+    """
+    def __init__(self, *args, **kwargs):
+        self.baudrate = kwargs.get('baudrate', args[1] if len(args) > 1 else 9600)
+        self.timeout = kwargs.get('timeout')
+        self.rates = []
+        self.reply = b''
+
+    def write(self, packet):
+        self.rates.append(self.baudrate)
+        self.reply = packet if self.baudrate == 38400 else b'\x00\xf8'
+
+    def read_until(self, expected, size):
+        reply, self.reply = self.reply, b''
+        return reply
+
+    def reset_input_buffer(self):
+        self.reply = b''
+
+    flushInput = reset_input_buffer
+
+
+class TestBaudrate(unittest.TestCase):
+    def tearDown(self):
+        port._detected.clear()
+
+    def test_detect(self):
+        camera = CameraPort(timeout=1)
+        self.assertEqual(detect_baudrate(camera), 38400)
+        self.assertEqual(camera.rates, [9600, 38400])
+        self.assertEqual(camera.timeout, 1)
+        self.assertIsNone(detect_baudrate(camera, (9600, 19200)))
+
+    def test_auto(self):
+        with mock.patch('serial.Serial', CameraPort):
+            serial = Serial('auto')
+            self.assertTrue(serial.open('/dev/visca'))
+            self.assertEqual(serial.port.baudrate, 38400)
+            serial.port = None
+            # the rate of the port is kept
+            self.assertTrue(serial.open('/dev/visca'))
+            self.assertEqual(serial.port.baudrate, 38400)
+            self.assertEqual(serial.port.rates, [])
+            serial.port = None
+            serial = Serial(19200)
+            self.assertTrue(serial.open('/dev/visca'))
+            self.assertEqual(serial.port.baudrate, 19200)
+
+
+if __name__ == '__main__':
+    unittest.main()
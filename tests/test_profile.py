@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyviscam.broadcast import v_cams
+from pyviscam.profile import find, load
+from test_camera import FakeChain
+
+SMALL = {'name': 'small', 'vendor': 1, 'models': [0x0999],
+         'params': ['power', 'zoom', 'WB', 'pan_tilt'], 'blocks': [],
+         'setters': ['power', 'zoom', 'WB', 'pan_tilt'],
+         'answers': {'WB': {'0': 'automatic', '1': 'indoor'}},
+         'ranges': {'pan': [-100, 100], 'tilt': [-20, 20], 'zoom': [0, 0x4000]}}
+
+
+class TestProfile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'small.json'), 'w') as data:
+            json.dump(SMALL, data)
+        self.transport = FakeChain(delays=(0.01,))
+        self.cams = v_cams('fake', transport=self.transport)
+        self.cam = self.cams.get_instances()[0]
+
+    def tearDown(self):
+        self.cams.close()
+        shutil.rmtree(self.directory)
+
+    def test_default_profile(self):
+        self.assertEqual([profile.name for profile in load()], ['EVI-H100'])
+        self.assertEqual(self.cam.profile.name, 'EVI-H100')
+        self.assertIs(find(1, 0x0999), self.cam.profile)
+        # setters without inquiry
+        self.cam.power_auto = 10
+        self.assertEqual(self.transport.written[-1], b'\x81\x01\x04\x40\x00\x00\x00\x0a\xff')
+        self.assertIn('focus_auto_active', self.cam._templates)
+
+    def test_model_profile(self):
+        profile = find(1, 0x0999, self.directory)
+        self.assertEqual(profile.name, 'small')
+        self.assertIsNone(find(1, 0x0998, self.directory))
+        self.cam.use_profile(profile)
+        self.transport.inquiries[b'\x09\x04\x35'] = b'\x00'
+        self.assertEqual(self.cam.WB, 'automatic')
+        written = len(self.transport.written)
+        # not supported by the model, nothing is sent
+        self.assertFalse(self.cam.focus)
+        self.assertFalse(self.cam.block('lens'))
+        self.assertFalse(self.cam.move_to(150, 0))
+        self.assertFalse(self.cam._cmd_value('zoom', 0x5000))
+        self.assertFalse(self.cam._cmd_value('focus', 0x1000))
+        self.assertEqual(len(self.transport.written), written)
+        self.cam.WB = 'automatic'
+        self.assertEqual(self.transport.written[-1], b'\x81\x01\x04\x35\x00\xff')
+
+
+class TestIdentify(unittest.TestCase):
+    def test_no_version(self):
+        transport = FakeChain(delays=(0.01, 0.01))
+        write_packet = transport.write_packet
+        # the second camera misses the version inquiry
+        transport.write_packet = lambda packet: packet == b'\x82\x09\x00\x02\xff' or write_packet(packet)
+        cams = v_cams('fake', transport=transport, timeouts={'inquiry': 0.1})
+        try:
+            self.assertEqual([cam.profile.name for cam in cams.get_instances()], ['EVI-H100'] * 2)
+        finally:
+            cams.close()
+
+if __name__ == '__main__':
+    unittest.main()
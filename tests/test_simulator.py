@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from time import time
+
+from pyviscam.broadcast import v_cams
+from pyviscam.exceptions import AckTimeout
+from pyviscam.simulator import Simulator
+
+
+class TestSimulator(unittest.TestCase):
+    def setUp(self):
+        self.simulator = Simulator(cameras=2, latency=0.02)
+        self.cams = v_cams('sim', transport=self.simulator)
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_chain(self):
+        cams = self.cams.get_instances()
+        self.assertEqual([cam.address for cam in cams], [1, 2])
+        self.assertEqual(cams[0].profile.name, 'EVI-H100')
+        snapshot = cams[1].snapshot()
+        self.assertEqual(snapshot.errors, {})
+        self.assertEqual(snapshot['power'], True)
+
+    def test_settings(self):
+        cam = self.cams.get_instances()[0]
+        cam.WB = 'indoor'
+        cam.gain = '+6'
+        self.assertEqual(cam.WB, 'indoor')
+        self.assertEqual(cam.gain, '+6')
+        self.assertEqual(cam.block('camera')['WB'], 'indoor')
+
+    def test_movement(self):
+        cam = self.cams.get_instances()[0]
+        start = time()
+        self.assertTrue(cam.move_to(20, 0, 0x18, 0x14))
+        # 20 degrees at 100 degrees per second
+        self.assertGreater(time() - start, 0.18)
+        self.assertEqual(cam.pan, 20)
+        cam.zoom = 4000
+        self.assertEqual(cam.zoom, 4000)
+
+    def test_sockets(self):
+        cam = self.cams.get_instances()[0]
+        commands = [cam.send_value('zoom', 8000), cam.send_value('focus', 0x1000),
+                    cam.send_value('iris', 5)]
+        # the third command waits for a free socket
+        self.assertTrue(all(command.wait() for command in commands))
+        self.assertEqual(cam.zoom, 8000)
+
+    def test_pacing(self):
+        cam = self.cams.get_instances()[0]
+        start = time()
+        for index in range(10):
+            cam._query('power')
+        # 5 bytes out and 4 bytes back at 9600 bauds
+        self.assertGreater(time() - start, 10 * 9 * 10.0 / 9600)
+
+
+    def test_late_answer(self):
+        cams = v_cams('sim', transport=Simulator(latency=0.01, inquiry_latency=0.01),
+                      timeouts={'inquiry': 0.2})
+        try:
+            cam = cams.get_instances()[0]
+            camera = cams.transport.cameras[0]
+            camera.codes['bright'], camera.codes['aperture'] = 7, 3
+            cams.transport.inquiry_latency = 0.3
+            self.assertRaises(AckTimeout, cam._query, 'bright')
+            cams.transport.inquiry_latency = 0.15
+            # the late answer to bright comes first, it is not the aperture
+            self.assertEqual(cam._query('aperture'), 3)
+        finally:
+            cams.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+import unittest
+from time import sleep
+
+from pyviscam.broadcast import v_cams
+from pyviscam.cache import monotonic
+from pyviscam.camera import Command
+from pyviscam.demux import Router
+from pyviscam.tour import Tour, interpolate
+from test_camera import FakeChain
+
+
+class TestTour(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeChain(delays=(0.01,))
+        self.cams = v_cams('fake', transport=self.transport)
+        self.cam = self.cams.get_instances()[0]
+
+    def tearDown(self):
+        self.cams.close()
+
+    def test_interpolate(self):
+        keyframes = [(0, 0, 0, 0, None), (2, 10, 0, 1000, None)]
+        self.assertEqual(interpolate(keyframes, [-1, 0, 0.5, 2, 3], 'zoom'), [0, 0, 250, 1000, 1000])
+
+    def test_tour(self):
+        tour = Tour(self.cam, [(0, -10, 0, 0, None), (0.4, 10, 0, 1000, None)], rate=20)
+        self.assertEqual(len(tour.frames), 9)
+        tour.start()
+        tour.join()
+        report = tour.report()
+        self.assertEqual(report['sent'] + report['skipped'], 9)
+        self.assertLess(report['max_jitter'], 0.1)
+        zooms = [packet for packet in self.transport.written if packet[1:4] == b'\x01\x04\x47']
+        self.assertEqual(zooms[-1], b'\x81\x01\x04\x47\x00\x03\x0e\x08\xff')
+        moves = [packet for packet in self.transport.written if packet[1:4] == b'\x01\x06\x02']
+        self.assertEqual(moves[-1][6:10], b'\x00\x01\x0c\x05')
+
+    def test_slow_camera(self):
+        # both sockets are busy 0.3 s, the poses posted meanwhile are replaced
+        cams = v_cams('fake', transport=FakeChain(delays=(0.3,)))
+        try:
+            tour = Tour(cams.get_instances()[0], [(0, -10, 0, 0, None), (0.4, 10, 0, 1000, None)], rate=20)
+            tour.start()
+            tour.join()
+            report = tour.report()
+            self.assertGreater(report['skipped'], 0)
+            self.assertEqual(report['sent'] + report['skipped'], 9)
+            zooms = [packet for packet in cams.transport.written if packet[1:4] == b'\x01\x04\x47']
+            self.assertLess(len(zooms), 9)
+            self.assertEqual(zooms[-1], b'\x81\x01\x04\x47\x00\x03\x0e\x08\xff')
+        finally:
+            cams.close()
+
+    def test_never_waits(self):
+        class Stuck(object):
+            """
+            a camera that does not ack until it is released
+            """
+            pan_speed = tilt_speed = 1
+
+            def __init__(self):
+                self.release = threading.Event()
+                self.zooms = []
+
+            def send_value(self, name, *values):
+                self.release.wait()
+                self.zooms.append(values)
+                request = Router().request(b'\x81\x01\x04\x47\xff')
+                request.written = monotonic()
+                request.sent.set()
+                request.ack.set_result(b'\x90\x41\xff')
+                return Command(request)
+        cam = Stuck()
+        tour = Tour(cam, [(0, None, None, 0, None), (0.4, None, None, 1000, None)], rate=20)
+        tour.start()
+        sleep(0.5)
+        # the clock goes on while the first pose waits, the newest frame replaces the others
+        self.assertEqual(tour.skipped, 7)
+        cam.release.set()
+        tour.join()
+        self.assertEqual(cam.zooms, [(0,), (1000,)])
+        report = tour.report()
+        self.assertEqual(report['sent'], 2)
+        # measured when the pose is written
+        self.assertGreater(report['max_jitter'], 0.05)
+
+    def test_timeouts(self):
+        cams = v_cams('fake', transport=FakeChain(delays=(0.01,)), timeouts={'ack': 0.02})
+        try:
+            write_packet = cams.transport.write_packet
+            dropped = []
+
+            def write(packet):
+                # the first zooms are lost
+                if packet[1:4] == b'\x01\x04\x47' and len(dropped) < 3:
+                    dropped.append(packet)
+                    return True
+                return write_packet(packet)
+            cams.transport.write_packet = write
+            tour = Tour(cams.get_instances()[0], [(0, None, None, 0, None), (0.4, None, None, 1000, None)],
+                        rate=20)
+            tour.start()
+            tour.join()
+            report = tour.report()
+            self.assertEqual(report['timeouts'], 3)
+            self.assertEqual(report['sent'] + report['skipped'], 9)
+        finally:
+            cams.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import socket
+import threading
+import unittest
+
+from pyviscam.broadcast import v_cams
+from pyviscam.udp import UDP, header, VISCA_REPLY, CONTROL_COMMAND, CONTROL_REPLY, \
+                         CONTROL_SEQUENCE_ERROR
+
+
+class StandIn(threading.Thread):
+    """
+    a local stand-in for a VISCA over IP camera
+    the first copy of every message is dropped to exercise retransmission
+    """
+    def __init__(self):
+        super(StandIn, self).__init__()
+        self.daemon = True
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.05)
+        self.address = '127.0.0.1:%i' % self.sock.getsockname()[1]
+        self.seen = set()
+        self.received = []
+        self.running = True
+
+    def reply(self, client, payload_type, sequence, payload):
+        self.sock.sendto(header.pack(payload_type, len(payload), sequence) + payload, client)
+
+    def run(self):
+        while self.running:
+            try:
+                message, client = self.sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            payload_type, length, sequence = header.unpack(message[:8])
+            payload = message[8:]
+            if payload_type == CONTROL_COMMAND:
+                self.reply(client, CONTROL_REPLY, sequence, b'\x01')
+                continue
+            if sequence not in self.seen:
+                self.seen.add(sequence)
+                continue
+            self.received.append(payload)
+            if payload == b'\x88\x30\x01\xff':
+                self.reply(client, VISCA_REPLY, sequence, b'\x88\x30\x02\xff')
+            elif payload == b'\x88\x01\x00\x01\xff':
+                self.reply(client, VISCA_REPLY, sequence, payload)
+            elif payload[1:2] == b'\x09':
+                self.reply(client, VISCA_REPLY, sequence, b'\x90\x50\x02\xff')
+            else:
+                self.reply(client, VISCA_REPLY, sequence, b'\x90\x41\xff')
+                self.reply(client, VISCA_REPLY, sequence, b'\x90\x51\xff')
+
+
+class TestUDP(unittest.TestCase):
+    def setUp(self):
+        self.camera = StandIn()
+        self.camera.start()
+
+    def tearDown(self):
+        self.camera.running = False
+        self.camera.join()
+
+    def test_v_cams_over_udp(self):
+        transport = UDP(retransmit=0.02)
+        cams = v_cams(self.camera.address, transport=transport)
+        cam = cams.get_instances()[0]
+        self.assertEqual(cam.power, True)
+        self.assertTrue(cam.home())
+        self.assertEqual(self.camera.received[-1], b'\x81\x01\x06\x04\xff')
+        cams.close()
+
+
+class Socket(object):
+    """
+    a connected socket, the messages received are given by the test
+    """
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def recv(self, size):
+        if self.messages:
+            return self.messages.pop(0)
+        raise socket.timeout()
+
+
+class TestSequenceError(unittest.TestCase):
+    def test_resend_under_mutex(self):
+        transport = UDP(timeout=0.05, retransmit=0.05, retries=0)
+        transport.port = Socket([header.pack(CONTROL_REPLY, 2, 0) + CONTROL_SEQUENCE_ERROR])
+        transport.write_packet(b'\x81\x09\x04\x00\xff')
+        reader = threading.Thread(target=transport.recv_packet)
+        # a writer holds the transport
+        transport.mutex.acquire()
+        reader.start()
+        reader.join(0.1)
+        self.assertEqual(len(transport.port.sent), 1)
+        transport.mutex.release()
+        reader.join()
+        # the reset, then the inquiry again with the next sequence number
+        self.assertEqual(transport.port.sent[1:], [header.pack(CONTROL_COMMAND, 1, 0) + b'\x01',
+                                                   header.pack(0x0110, 5, 1) + b'\x81\x09\x04\x00\xff'])
+
+
+if __name__ == '__main__':
+    unittest.main()